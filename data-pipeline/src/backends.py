@@ -0,0 +1,40 @@
+import importlib
+
+# Бэкенды исполнения пайплайна: имя -> {функция этапа: (модуль, функция)}.
+# Функции разных бэкендов принимают одинаковые аргументы; модуль импортируется
+# только при выборе бэкенда. sqlite - встроенная замена PostgreSQL и MySQL для
+# быстрых локальных запусков, тестов и профилирования Python-части
+BACKENDS = {
+    'postgres': {
+        'init_database': ('init_database', 'init_database'),
+        'load_data_to_db': ('load_data_to_db', 'load_data_to_db'),
+        'fill_structured_table': ('fill_structured_table', 'fill_structured_table'),
+        'etl': ('etl', 'etl'),
+        'fill_dm_table': ('fill_dm_table', 'fill_dm_table'),
+        'reset_dm_facts': ('fill_dm_table', 'reset_dm_facts'),
+        'run_data_quality_checks': ('run_data_quality_checks', 'run_data_quality_checks'),
+        'migrate': ('migrate_to_mysql', 'migrate_to_mysql'),
+        'close_all': ('db_pool', 'close_all'),
+    },
+    'sqlite': {
+        'init_database': ('sqlite_backend', 'init_database'),
+        'load_data_to_db': ('sqlite_backend', 'load_data_to_db'),
+        'fill_structured_table': ('sqlite_backend', 'fill_structured_table'),
+        'etl': ('sqlite_backend', 'etl'),
+        'fill_dm_table': ('sqlite_backend', 'fill_dm_table'),
+        'reset_dm_facts': ('sqlite_backend', 'reset_dm_facts'),
+        'run_data_quality_checks': ('sqlite_backend', 'run_data_quality_checks'),
+        'migrate': ('sqlite_backend', 'migrate'),
+        'close_all': ('sqlite_backend', 'close_all'),
+    },
+}
+
+def backend_function(backend, name):
+    """
+    Функция этапа name выбранного бэкенда
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}. Available: {', '.join(sorted(BACKENDS))}")
+    
+    module_name, function_name = BACKENDS[backend][name]
+    return getattr(importlib.import_module(module_name), function_name)
\ No newline at end of file
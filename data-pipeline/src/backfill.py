@@ -0,0 +1,187 @@
+import time
+import threading
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import PG_POOL_MAX
+from checkpoint import start_pipeline_run, finish_pipeline_run, completed_units, mark_done
+from fill_structured_table import fill_structured_table
+from fill_dm_table import fill_dm_table
+from run_data_quality_checks import run_data_quality_checks
+from migrate_to_mysql import migrate_window_to_mysql
+from metrics import span
+
+# Бэкфилл диапазона дат (main.py backfill): диапазон делится на непересекающиеся окна,
+# для каждого окна выполняется цепочка transform -> dm -> dq -> migrate. Окна обрабатываются
+# параллельно, не больше concurrency одновременно; упавший шаг окна повторяется с
+# нарастающей паузой, после каждого окна печатается прогресс.
+# Окно - строки с effective_from в нем (by_start в SQL-функциях этапов): период строки
+# бывает длиннее окна, и по вложенности периода она не попала бы ни в одно окно.
+# Шаг окна перезаписывает только свое окно, поэтому повтор безопасен. Выполненные шаги
+# отмечаются в t_pipeline_checkpoints: повторный запуск с --resume и теми же параметрами
+# продолжается с невыполненных шагов
+#   python main.py backfill --start-date=2023-01-01 --end-date=2023-12-31 --concurrency=4
+#   python main.py backfill --start-date=2023-01-01 --end-date=2023-03-31 --window=7 --skip=migrate
+
+STEPS = ['transform', 'dm', 'dq', 'migrate']
+
+def split_windows(start_date, end_date, window='month'):
+    """
+    Непересекающиеся окна (начало, конец) с границами включительно, покрывающие
+    диапазон целиком. window - 'month' (календарные месяцы) или число дней
+    """
+    start = date.fromisoformat(str(start_date))
+    end = date.fromisoformat(str(end_date))
+    if start > end:
+        raise ValueError(f"Start date {start} is after end date {end}")
+    if window != 'month' and int(window) < 1:
+        raise ValueError(f"Window must be 'month' or a positive number of days, got {window}")
+    
+    windows = []
+    while start <= end:
+        if window == 'month':
+            next_start = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        else:
+            next_start = start + timedelta(days=int(window))
+        windows.append((start, min(next_start - timedelta(days=1), end)))
+        start = next_start
+    return windows
+
+def window_label(window):
+    return f"{window[0].isoformat()}..{window[1].isoformat()}"
+
+class BackfillProgress:
+    """
+    Счетчики окон бэкфилла, обновляются из потоков окон
+    """
+    
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+    
+    def finish_window(self, ok, rows=0):
+        """
+        Отмечает завершенное окно и возвращает строку прогресса
+        """
+        with self._lock:
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+            self.rows += rows
+            return self.format()
+    
+    def format(self):
+        finished = self.done + self.failed
+        elapsed = time.perf_counter() - self.started
+        line = (f"{finished}/{self.total} windows ({self.failed} failed), "
+                f"{self.rows} rows, {elapsed:.1f}s elapsed")
+        # Оценка по средней скорости завершения окон, с учетом параллельности
+        if 0 < finished < self.total:
+            line += f", ETA {elapsed / finished * (self.total - finished):.0f}s"
+        return line
+
+def run_window_step(step, start_dt, end_dt, dq_mode='per_check'):
+    """
+    Один шаг цепочки для окна; возвращает число обработанных строк (для dq - None)
+    """
+    if step == 'transform':
+        return fill_structured_table(start_dt, end_dt, by_start=True)
+    if step == 'dm':
+        return fill_dm_table(start_dt, end_dt, by_start=True)['fact_insert']
+    if step == 'dq':
+        run_data_quality_checks(start_dt, end_dt, mode=dq_mode, by_start=True)
+        return None
+    if step == 'migrate':
+        return migrate_window_to_mysql(start_dt, end_dt)
+    raise ValueError(f"Unknown backfill step: {step}")
+
+def run_step_with_retries(step, window, retries=3, dq_mode='per_check'):
+    label = window_label(window)
+    for attempt in range(1, retries + 1):
+        try:
+            with span(f"backfill.{step}", window=label, attempt=attempt) as current:
+                rows = run_window_step(step, window[0], window[1], dq_mode)
+                current.set(rows=rows)
+            return rows
+        except Exception as e:
+            print(f"[{label}] {step} failed on attempt {attempt}/{retries}: {e}")
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+
+def process_window(window, steps, run_id, completed, progress, retries=3, dq_mode='per_check'):
+    """
+    Цепочка шагов одного окна. Упавший после всех попыток шаг останавливает
+    цепочку окна, остальные окна продолжают выполняться
+    """
+    label = window_label(window)
+    started = time.perf_counter()
+    rows = 0
+    try:
+        for step in steps:
+            if label in completed[step]:
+                continue
+            processed = run_step_with_retries(step, window, retries, dq_mode)
+            if step == 'transform':
+                rows = processed
+            mark_done(run_id, f"backfill.{step}", label, {'rows': processed})
+    except Exception as e:
+        print(f"[{label}] failed: {e}. Progress: {progress.finish_window(False)}")
+        return False
+    print(f"[{label}] done in {time.perf_counter() - started:.1f}s. Progress: {progress.finish_window(True, rows)}")
+    return True
+
+def run_backfill(start_date, end_date, window='month', concurrency=2, retries=3, skip=(),
+                 dq_mode='per_check', resume=False):
+    """
+    Бэкфилл диапазона окнами. Возвращает {окно: True/False}; если окна
+    не выполнились и после повторов, в конце выбрасывает RuntimeError
+    """
+    for step in skip:
+        if step not in STEPS:
+            raise ValueError(f"Unknown backfill step: {step}. Available: {', '.join(STEPS)}")
+    if dq_mode == 'incremental':
+        raise ValueError("Backfill windows do not support --dq-mode=incremental")
+    steps = [step for step in STEPS if step not in skip]
+    windows = split_windows(start_date, end_date, window)
+    # Шаг окна занимает подключение из общего пула: лишние окна только ждали бы подключения
+    concurrency = max(1, min(concurrency, PG_POOL_MAX))
+    
+    # Схема приводится к текущей версии при открытии запуска (см. checkpoint.py)
+    run_id, _ = start_pipeline_run({
+        'command': 'backfill',
+        'start_date': windows[0][0].isoformat(),
+        'end_date': windows[-1][1].isoformat(),
+        'window': str(window),
+        'steps': steps,
+        'dq_mode': dq_mode,
+    }, resume=resume)
+    completed = {step: completed_units(run_id, f"backfill.{step}") for step in steps}
+    
+    print(f"Backfill {window_label((windows[0][0], windows[-1][1]))}: {len(windows)} windows "
+          f"({window}), steps: {' -> '.join(steps)}, concurrency {concurrency}")
+    
+    progress = BackfillProgress(len(windows))
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(process_window, item, steps, run_id, completed, progress, retries, dq_mode): item
+                for item in windows
+            }
+            for future in as_completed(futures):
+                results[window_label(futures[future])] = future.result()
+    except BaseException:
+        finish_pipeline_run(run_id, 'failed')
+        raise
+    
+    failed = [label for label in sorted(results) if not results[label]]
+    finish_pipeline_run(run_id, 'failed' if failed else 'success')
+    print(f"\nBackfill finished: {progress.format()}")
+    if failed:
+        raise RuntimeError(f"Backfill windows failed: {', '.join(failed)}")
+    return results
\ No newline at end of file
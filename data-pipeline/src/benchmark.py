@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+from datetime import datetime
+from config import BENCHMARK_DIR, BENCHMARK_DATABASE, BENCHMARK_MYSQL_DATABASE, PG_CONFIG, MYSQL_CONFIG, SQLITE_PATH
+from backends import backend_function
+from metrics import RssSampler
+from get_dataset import get_dataset
+
+# Нагрузочные замеры этапов пайплайна на разных объемах данных.
+# Запуск заменяет данные в таблицах источника и витрины, поэтому выполняется только
+# на базе BENCHMARK_DATABASE (SQLite - только в памяти) или с --i-know-this-truncates.
+# Этап migrate перезаписывает витрину MySQL и выполняется только на базе BENCHMARK_MYSQL_DATABASE.
+# Результаты пишутся в BENCHMARK_DIR/results_<время>.json и сравниваются с сохраненным baseline:
+#   DB_NAME=etl_benchmark MYSQL_DB=etl_benchmark python benchmark.py --sizes=1k,100k --repeat=3
+#   DB_NAME=etl_benchmark python benchmark.py --sizes=1k,100k,1m,10m --save-baseline
+#   python benchmark.py --threshold=0.3 --skip-mysql --i-know-this-truncates
+#   SQLITE_PATH=:memory: python benchmark.py --backend=sqlite --baseline=benchmarks/baseline_sqlite.json
+
+SIZES = {
+    '1k': 1000,
+    '100k': 100000,
+    '1m': 1000000,
+    '10m': 10000000,
+}
+
+STAGES = ['generate', 'load', 'cleanse', 'dm_load', 'dq', 'migrate']
+
+# Отклонения меньше этих значений считаются шумом, а не регрессией
+MIN_DURATION_DELTA_S = 0.05
+MIN_MEMORY_DELTA_BYTES = 16 * 1024 * 1024
+
+def measure(func):
+    """
+    Выполняет func, возвращает (результат, секунды, прирост пикового RSS в байтах)
+    """
+    sampler = RssSampler()
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        duration = time.perf_counter() - started
+        memory = sampler.stop()
+    return result, duration, memory
+
+def run_size(rows, seed=42, skip_mysql=False, backend='postgres'):
+    """
+    Один проход всех этапов на rows строках: {stage: {rows, duration_s, memory_bytes}}
+    """
+    sample = {}
+    
+    def run(name):
+        return backend_function(backend, name)
+    
+    def record(stage, func, count=None):
+        result, duration, memory = measure(func)
+        processed = count(result) if count else rows
+        sample[stage] = {'rows': processed, 'duration_s': duration, 'memory_bytes': memory}
+        print(f"  {stage:<10} {processed:>10} rows {duration:>9.3f}s")
+        return result
+    
+    df = record('generate', lambda: get_dataset(rows=rows, seed=seed), len)
+    # Построчная вставка на 1m-10m строк измеряла бы накладные расходы на запрос, а не загрузку
+    loaded = record('load', lambda: run('load_data_to_db')(df, chunk_size=10000, bulk=True), lambda count: count)
+    if loaded == 0:
+        raise RuntimeError("Unstructured load failed, see the log above")
+    del df
+    
+    record('cleanse', lambda: run('fill_structured_table')('2023-01-01', '2023-12-31'), lambda count: count)
+    # Витрина накапливает факты между запусками; для сопоставимых замеров очищаем
+    run('reset_dm_facts')()
+    record('dm_load', run('fill_dm_table'), lambda steps: steps['fact_insert'])
+    facts = sample['dm_load']['rows']
+    record('dq', lambda: run('run_data_quality_checks')(mode='per_check'), lambda _: facts)
+    
+    if skip_mysql:
+        sample['migrate'] = {'skipped': True}
+    else:
+        try:
+            record('migrate', run('migrate'), lambda _: facts)
+        except Exception as e:
+            # MySQL может быть не поднят - остальные замеры сохраняются
+            print(f"  migrate    failed: {e}")
+            sample['migrate'] = {'error': str(e)}
+    
+    return sample
+
+def check_target_database(backend='postgres', allow_truncate=False):
+    """
+    Отказывает в запуске на базе, которая не выделена под бенчмарк:
+    замеры очищают таблицы источника и витрины
+    """
+    if allow_truncate:
+        return
+    if backend == 'postgres' and PG_CONFIG['database'] != BENCHMARK_DATABASE:
+        raise RuntimeError(
+            f"Benchmark truncates pipeline tables, refusing to run on database {PG_CONFIG['database']!r}. "
+            f"Point DB_NAME at {BENCHMARK_DATABASE!r} or pass --i-know-this-truncates"
+        )
+    if backend == 'sqlite' and SQLITE_PATH != ':memory:':
+        raise RuntimeError(
+            f"Benchmark truncates pipeline tables, refusing to run on {SQLITE_PATH}. "
+            f"Set SQLITE_PATH=:memory: or pass --i-know-this-truncates"
+        )
+
+def mysql_target_allowed(backend='postgres'):
+    """
+    Этап migrate бэкенда postgres загружает факты в MySQL: только в базу,
+    выделенную под бенчмарк. Флаг --i-know-this-truncates на MySQL не действует
+    """
+    if backend != 'postgres' or MYSQL_CONFIG['database'] == BENCHMARK_MYSQL_DATABASE:
+        return True
+    print(f"MySQL database {MYSQL_CONFIG['database']!r} is not dedicated to the benchmark, "
+          f"skipping migrate. Point MYSQL_DB at {BENCHMARK_MYSQL_DATABASE!r} to measure it")
+    return False
+
+def summarize(samples):
+    """
+    Сводка повторов одного этапа: медиана длительности, пропускная способность и память
+    """
+    measured = [sample for sample in samples if 'duration_s' in sample]
+    if not measured:
+        return samples[-1]
+    durations = sorted(sample['duration_s'] for sample in measured)
+    rows = measured[-1]['rows']
+    duration = statistics.median(durations)
+    memory = [sample['memory_bytes'] for sample in measured if sample['memory_bytes'] is not None]
+    return {
+        'rows': rows,
+        'duration_s': round(duration, 6),
+        'duration_max_s': round(durations[-1], 6),
+        'rows_per_s': round(rows / duration, 1) if duration > 0 else None,
+        'memory_bytes': max(memory) if memory else None,
+        'repeats': len(measured),
+    }
+
+def compare_results(results, baseline, threshold=0.2):
+    """
+    Регрессии относительно baseline: медианная длительность или память этапа выросли
+    больше чем на threshold (доля) и больше порога шума
+    """
+    regressions = []
+    for size, stages in results.items():
+        for stage_name, current in stages.items():
+            previous = baseline.get(size, {}).get(stage_name)
+            if not previous or 'duration_s' not in previous or 'duration_s' not in current:
+                continue
+            
+            if (current['duration_s'] > previous['duration_s'] * (1 + threshold)
+                    and current['duration_s'] - previous['duration_s'] > MIN_DURATION_DELTA_S):
+                regressions.append({
+                    'size': size, 'stage': stage_name, 'metric': 'duration_s',
+                    'baseline': previous['duration_s'], 'current': current['duration_s'],
+                })
+            
+            if (current.get('memory_bytes') is not None and previous.get('memory_bytes') is not None
+                    and current['memory_bytes'] > previous['memory_bytes'] * (1 + threshold)
+                    and current['memory_bytes'] - previous['memory_bytes'] > MIN_MEMORY_DELTA_BYTES):
+                regressions.append({
+                    'size': size, 'stage': stage_name, 'metric': 'memory_bytes',
+                    'baseline': previous['memory_bytes'], 'current': current['memory_bytes'],
+                })
+    return regressions
+
+def run_benchmarks(sizes=('1k', '100k'), repeat=1, threshold=0.2, baseline_path=None,
+                   save_baseline=False, skip_mysql=False, backend='postgres', allow_truncate=False):
+    """
+    Замеры по всем объемам, запись результатов и сравнение с baseline.
+    Возвращает список регрессий
+    """
+    for size in sizes:
+        if size not in SIZES:
+            raise ValueError(f"Unknown size: {size}. Available: {', '.join(SIZES)}")
+    check_target_database(backend, allow_truncate)
+    skip_mysql = skip_mysql or not mysql_target_allowed(backend)
+    
+    baseline_path = baseline_path or os.path.join(BENCHMARK_DIR, 'baseline.json')
+    backend_function(backend, 'init_database')()
+    
+    results = {}
+    for size in sizes:
+        samples = []
+        for attempt in range(1, repeat + 1):
+            print(f"\n=== {size} rows, run {attempt}/{repeat} ===")
+            samples.append(run_size(SIZES[size], skip_mysql=skip_mysql, backend=backend))
+        results[size] = {stage_name: summarize([sample[stage_name] for sample in samples])
+                         for stage_name in STAGES}
+    
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'backend': backend,
+        'database': (f"{PG_CONFIG['host']}:{PG_CONFIG['port']}/{PG_CONFIG['database']}"
+                     if backend == 'postgres' else SQLITE_PATH),
+        'repeat': repeat,
+        'results': results,
+    }
+    
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    results_path = os.path.join(BENCHMARK_DIR, f"results_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {results_path}")
+    
+    print(f"\n{'size':<6} {'stage':<10} {'rows':>10} {'median s':>10} {'rows/s':>12} {'memory MB':>10}")
+    for size, stages in results.items():
+        for stage_name, summary in stages.items():
+            if 'duration_s' not in summary:
+                print(f"{size:<6} {stage_name:<10} {'skipped' if summary.get('skipped') else 'error':>10}")
+                continue
+            memory = f"{summary['memory_bytes'] / 1024 / 1024:.1f}" if summary['memory_bytes'] is not None else '-'
+            print(f"{size:<6} {stage_name:<10} {summary['rows']:>10} {summary['duration_s']:>10.3f} "
+                  f"{summary['rows_per_s'] or 0:>12.1f} {memory:>10}")
+    
+    regressions = []
+    if save_baseline:
+        # Новые объемы добавляются к сохраненному baseline, остальные остаются
+        baseline = {}
+        if os.path.exists(baseline_path):
+            with open(baseline_path, encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+        baseline.update(results)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(report, results=baseline), f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+    elif os.path.exists(baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare_results(results, baseline, threshold)
+        if regressions:
+            print(f"\nREGRESSIONS against {baseline_path} (threshold {threshold:.0%}):")
+            for item in regressions:
+                print(f"  {item['size']} {item['stage']} {item['metric']}: "
+                      f"{item['baseline']} -> {item['current']}")
+        else:
+            print(f"\nNo regressions against {baseline_path} (threshold {threshold:.0%})")
+    else:
+        print(f"\nBaseline {baseline_path} not found, run with --save-baseline to create it")
+    
+    return regressions
+
+def main(argv):
+    options = {
+        'sizes': ['1k', '100k'],
+        'repeat': 1,
+        'threshold': 0.2,
+        'baseline_path': None,
+        'save_baseline': '--save-baseline' in argv,
+        'skip_mysql': '--skip-mysql' in argv,
+        'backend': 'postgres',
+        'allow_truncate': '--i-know-this-truncates' in argv,
+    }
+    for arg in argv:
+        if arg.startswith('--sizes='):
+            options['sizes'] = arg.split('=', 1)[1].lower().split(',')
+        elif arg.startswith('--repeat='):
+            options['repeat'] = int(arg.split('=', 1)[1])
+        elif arg.startswith('--threshold='):
+            options['threshold'] = float(arg.split('=', 1)[1])
+        elif arg.startswith('--baseline='):
+            options['baseline_path'] = arg.split('=', 1)[1]
+        elif arg.startswith('--backend='):
+            options['backend'] = arg.split('=', 1)[1]
+    
+    try:
+        regressions = run_benchmarks(**options)
+    finally:
+        backend_function(options['backend'], 'close_all')()
+    # Ненулевой код возврата для CI
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,148 @@
+import json
+import hashlib
+import random
+from psycopg2.extras import Json
+from db_pool import get_pg_connection, release_pg_connection
+from schema_migrations import apply_migrations
+
+# Контрольные точки пайплайна: выполненные этапы и чанки внутри этапов.
+# Запуск с resume (main.py --resume) и теми же параметрами пропускает уже выполненные
+# единицы работы; обычный запуск всегда открывает новый
+
+def params_hash(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def start_pipeline_run(params, resume=False):
+    """
+    Открывает новый запуск, а с resume - продолжает последний незавершенный запуск
+    с теми же параметрами. Возвращает (run_id, params): для продолжаемого запуска
+    params содержат сохраненный seed, чтобы данные сгенерировались так же, как в первый раз
+    """
+    # Запуск начинается до init_database, поэтому схема приводится к текущей версии здесь
+    apply_migrations()
+    conn = None
+    try:
+        conn = get_pg_connection()
+        cursor = conn.cursor()
+
+        key = params_hash(params)
+        if resume:
+            cursor.execute("""
+                SELECT run_id, params, status
+                FROM s_sql_dds.t_pipeline_runs
+                WHERE params_hash = %s
+                ORDER BY run_id DESC
+                LIMIT 1
+            """, (key,))
+            row = cursor.fetchone()
+            if row and row[2] != 'success':
+                run_id, run_params, _ = row
+                cursor.execute("""
+                    UPDATE s_sql_dds.t_pipeline_runs
+                    SET status = 'running', finished_at = NULL
+                    WHERE run_id = %s
+                """, (run_id,))
+                conn.commit()
+                print(f"Resuming pipeline run {run_id}")
+                return run_id, run_params
+        
+        run_params = dict(params, seed=params.get('seed') or random.randint(1, 2 ** 31 - 1))
+        cursor.execute("""
+            INSERT INTO s_sql_dds.t_pipeline_runs (params_hash, params)
+            VALUES (%s, %s)
+            RETURNING run_id
+        """, (key, Json(run_params)))
+        run_id = cursor.fetchone()[0]
+        conn.commit()
+        print(f"Started pipeline run {run_id}")
+        return run_id, run_params
+
+    except Exception as e:
+        print(f"Ошибка при открытии запуска пайплайна: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+def finish_pipeline_run(run_id, status):
+    conn = None
+    try:
+        conn = get_pg_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE s_sql_dds.t_pipeline_runs
+            SET status = %s, finished_at = CURRENT_TIMESTAMP
+            WHERE run_id = %s
+        """, (status, run_id))
+        conn.commit()
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+def completed_units(run_id, stage):
+    """
+    Выполненные единицы этапа: {unit: details}
+    """
+    if run_id is None:
+        return {}
+    conn = None
+    try:
+        conn = get_pg_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT unit, details
+            FROM s_sql_dds.t_pipeline_checkpoints
+            WHERE run_id = %s AND stage = %s
+        """, (run_id, stage))
+        return dict(cursor.fetchall())
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+def mark_unit_done(cursor, run_id, stage, unit='', details=None):
+    """
+    Отмечает единицу работы на переданном курсоре: фиксируется вместе с данными
+    единицы одним COMMIT вызывающего кода
+    """
+    cursor.execute("""
+        INSERT INTO s_sql_dds.t_pipeline_checkpoints (run_id, stage, unit, details)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (run_id, stage, unit) DO UPDATE
+        SET details = EXCLUDED.details, completed_at = CURRENT_TIMESTAMP
+    """, (run_id, stage, unit, Json(details) if details is not None else None))
+
+def clear_units(cursor, run_id, stage):
+    cursor.execute("""
+        DELETE FROM s_sql_dds.t_pipeline_checkpoints
+        WHERE run_id = %s AND stage = %s AND unit != ''
+    """, (run_id, stage))
+
+def mark_done(run_id, stage, unit='', details=None):
+    """
+    Отмечает единицу работы отдельной транзакцией
+    """
+    if run_id is None:
+        return
+    conn = None
+    try:
+        conn = get_pg_connection()
+        cursor = conn.cursor()
+        mark_unit_done(cursor, run_id, stage, unit, details)
+        conn.commit()
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+def checkpointed_stage(run_id, stage, func):
+    """
+    Оборачивает функцию этапа: выполненный в этом запуске этап пропускается
+    """
+    def run():
+        if '' in completed_units(run_id, stage):
+            print(f"[{stage}] already completed in run {run_id}, skipping")
+            return
+        func()
+        mark_done(run_id, stage)
+    return run
\ No newline at end of file
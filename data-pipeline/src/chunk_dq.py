@@ -0,0 +1,151 @@
+import time
+import pandas as pd
+from db_pool import get_pg_connection, release_pg_connection
+from dq_runner import save_results
+
+# Категории, которые fn_etl_data_load не заменяет на 'Other'
+VALID_CATEGORIES = ['Electronics', 'Clothing', 'Books', 'Home', 'Sports']
+
+# Правила проверки чанков до загрузки в БД (те же, что проверяют fn_etl_data_load и fn_dq_checks_load).
+# violation - векторное условие по DataFrame, max_rate - допустимая доля нарушений в процентах:
+# сырые данные содержат ожидаемые аномалии, которые исправляет очистка, поэтому
+# загрузка прерывается только при доле заметно выше обычной
+CHUNK_RULES = [
+    {
+        'name': 'Null user_id',
+        'check_type': 'completeness',
+        'column': 'user_id',
+        'violation': lambda df: df['user_id'].isna(),
+        'max_rate': 0,
+    },
+    {
+        'name': 'Null age',
+        'check_type': 'completeness',
+        'column': 'age',
+        'violation': lambda df: df['age'].isna(),
+        'max_rate': 10,
+    },
+    {
+        'name': 'Negative salary',
+        'check_type': 'validity',
+        'column': 'salary',
+        'violation': lambda df: df['salary'] < 0,
+        'max_rate': 10,
+    },
+    {
+        'name': 'Salary above limit',
+        'check_type': 'validity',
+        'column': 'salary',
+        'violation': lambda df: df['salary'] > 1000000,
+        'max_rate': 1,
+    },
+    {
+        'name': 'Inverted date range',
+        'check_type': 'consistency',
+        'column': None,
+        'violation': lambda df: pd.to_datetime(df['effective_to']) < pd.to_datetime(df['effective_from']),
+        'max_rate': 10,
+    },
+    {
+        'name': 'Invalid product category',
+        'check_type': 'validity',
+        'column': 'product_category',
+        'violation': lambda df: ~df['product_category'].isin(VALID_CATEGORIES),
+        'max_rate': 10,
+    },
+]
+
+class DataQualityError(Exception):
+    """
+    Загрузка прервана: доля нарушений правила превысила порог
+    """
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+class BatchDQReport:
+    """
+    Накопительный отчет по чанкам одного батча загрузки
+    """
+    
+    def __init__(self, rules=None, min_rows=200):
+        self.rules = CHUNK_RULES if rules is None else rules
+        # Решение о прерывании принимается, когда накоплено хотя бы min_rows строк
+        self.min_rows = min_rows
+        self.rows = 0
+        self.chunks = 0
+        self.violations = {rule['name']: 0 for rule in self.rules}
+        self.duration_ms = 0.0
+    
+    def add_chunk(self, chunk):
+        """
+        Проверяет чанк и прерывает загрузку, если накопленная доля нарушений выше порога
+        """
+        started = time.perf_counter()
+        for rule in self.rules:
+            self.violations[rule['name']] += int(rule['violation'](chunk).sum())
+        self.rows += len(chunk)
+        self.chunks += 1
+        self.duration_ms += (time.perf_counter() - started) * 1000
+        
+        if self.rows >= self.min_rows:
+            failed = [rule for rule in self.rules if self.rate(rule['name']) > rule['max_rate']]
+            if failed:
+                details = ", ".join(f"{rule['name']} {self.rate(rule['name']):.2f}% > {rule['max_rate']}%"
+                                    for rule in failed)
+                raise DataQualityError(f"Загрузка прервана после {self.rows} строк: {details}", self)
+    
+    def rate(self, rule_name):
+        return self.violations[rule_name] * 100.0 / self.rows if self.rows else 0.0
+    
+    def to_results(self):
+        """
+        Результаты в формате dq_runner.save_results
+        """
+        results = []
+        for rule in self.rules:
+            rate = self.rate(rule['name'])
+            passed = rate <= rule['max_rate']
+            results.append({
+                'check': {
+                    'name': f"{rule['name']} (in-flight)",
+                    'check_type': rule['check_type'],
+                    'table': 't_sql_source_unstructured',
+                    'column': rule['column'],
+                    'threshold': rule['max_rate'],
+                },
+                'status': 'passed' if passed else 'failed',
+                'expected_value': self.rows,
+                'actual_value': round(rate, 4),
+                'error_message': f"{self.violations[rule['name']]} of {self.rows} rows in {self.chunks} chunks",
+                'duration_ms': round(self.duration_ms / len(self.rules), 3),
+            })
+        return results
+    
+    def print_summary(self):
+        print(f"DQ батча: {self.rows} строк, {self.chunks} чанков")
+        for result in self.to_results():
+            print(f"[{result['status'].upper()}] {result['check']['name']}: "
+                  f"{result['actual_value']}% ({result['error_message']})")
+
+def save_batch_report(report):
+    """
+    Сохраняет отчет батча как отдельный запуск DQ
+    """
+    conn = None
+    try:
+        conn = get_pg_connection('dq')
+        cursor = conn.cursor()
+        cursor.execute("SELECT s_sql_dds.fn_dq_start_run(%s, %s, %s)", ('in_flight', None, None))
+        run_id = cursor.fetchone()[0]
+        save_results(cursor, report.to_results())
+        cursor.execute("SELECT s_sql_dds.fn_dq_finish_run(%s)", (run_id,))
+        conn.commit()
+        return run_id
+    except Exception as e:
+        print(f"Ошибка при сохранении отчета DQ батча: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            release_pg_connection(conn)
\ No newline at end of file
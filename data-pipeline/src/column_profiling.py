@@ -0,0 +1,273 @@
+import sys
+import time
+import psycopg2
+from psycopg2.extras import Json
+from db_pool import get_pg_connection, release_pg_connection
+from sketches import HyperLogLog, KLLSketch, ColumnProfile, compare_profiles
+from dq_runner import save_results
+
+PROFILED_TABLES = ['t_sql_source_structured', 't_dm_task']
+
+NUMERIC_TYPES = ('smallint', 'integer', 'bigint', 'numeric', 'real', 'double precision')
+
+# Пороги дрейфа: статистика КС для числовых колонок и рост доли NULL
+KS_THRESHOLD = 0.1
+NULL_RATE_THRESHOLD = 0.05
+
+# Батч профилирует строки с effective_from в окне: у соседних окон нет общих строк,
+# поэтому скетчи батчей за разные окна объединяются без двойного счета
+WINDOW_FILTER = """
+    (%(start_dt)s::DATE IS NULL OR effective_from >= %(start_dt)s::DATE)
+    AND (%(end_dt)s::DATE IS NULL OR effective_from <= %(end_dt)s::DATE)
+"""
+
+def table_columns(cursor, table_name):
+    """
+    Колонки таблицы и признак числового типа
+    """
+    cursor.execute("""
+        SELECT column_name, data_type IN %s
+        FROM information_schema.columns
+        WHERE table_schema = 's_sql_dds' AND table_name = %s
+        ORDER BY ordinal_position
+    """, (NUMERIC_TYPES, table_name))
+    return cursor.fetchall()
+
+def profile_table(conn, table_name, start_dt=None, end_dt=None, batch_size=10000):
+    """
+    Строит профили всех колонок таблицы за один проход серверным курсором
+    """
+    cursor = conn.cursor()
+    columns = table_columns(cursor, table_name)
+    cursor.close()
+    
+    profiles = {name: ColumnProfile(numeric=is_numeric) for name, is_numeric in columns}
+    names = [name for name, _ in columns]
+    
+    read_cursor = conn.cursor(name=f"profile_{table_name}")
+    read_cursor.itersize = batch_size
+    read_cursor.execute(
+        f"SELECT {', '.join(names)} FROM s_sql_dds.{table_name} WHERE {WINDOW_FILTER}",
+        {'start_dt': start_dt, 'end_dt': end_dt}
+    )
+    for row in read_cursor:
+        for name, value in zip(names, row):
+            profiles[name].add(value)
+    read_cursor.close()
+    return profiles
+
+def save_profiles(cursor, batch_id, table_name, profiles):
+    for column_name, profile in profiles.items():
+        cursor.execute("""
+            INSERT INTO s_sql_dds.t_column_profiles
+            (batch_id, table_name, column_name, is_numeric, row_count, null_count,
+             min_value, max_value, distinct_estimate, hll, kll)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            batch_id, table_name, column_name, profile.numeric, profile.row_count, profile.null_count,
+            None if profile.min_value is None else str(profile.min_value)[:100],
+            None if profile.max_value is None else str(profile.max_value)[:100],
+            profile.distinct_estimate(), psycopg2.Binary(profile.hll.to_bytes()),
+            Json(profile.kll.to_dict()) if profile.kll is not None else None
+        ))
+
+def profile_from_row(is_numeric, row_count, null_count, min_value, max_value, hll, kll):
+    """
+    Восстанавливает ColumnProfile из строки t_column_profiles
+    """
+    profile = ColumnProfile(numeric=is_numeric)
+    profile.row_count = row_count
+    profile.null_count = null_count
+    convert = float if is_numeric else str
+    profile.min_value = None if min_value is None else convert(min_value)
+    profile.max_value = None if max_value is None else convert(max_value)
+    profile.hll = HyperLogLog.from_bytes(hll)
+    profile.kll = KLLSketch.from_dict(kll) if kll is not None else None
+    return profile
+
+def profile_batch(start_dt=None, end_dt=None, tables=None):
+    """
+    Этап профилирования: скетчи всех колонок PROFILED_TABLES по строкам окна загрузки
+    (effective_from в [start_dt, end_dt]). Возвращает batch_id
+    """
+    tables = PROFILED_TABLES if tables is None else tables
+    conn = None
+    try:
+        conn = get_pg_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO s_sql_dds.t_profile_batches (window_start, window_end)
+            VALUES (%s, %s)
+            RETURNING batch_id
+        """, (start_dt, end_dt))
+        batch_id = cursor.fetchone()[0]
+        
+        for table_name in tables:
+            started = time.perf_counter()
+            profiles = profile_table(conn, table_name, start_dt, end_dt)
+            save_profiles(cursor, batch_id, table_name, profiles)
+            rows = next(iter(profiles.values())).row_count if profiles else 0
+            print(f"Профиль {table_name}: {len(profiles)} колонок, {rows} строк "
+                  f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+        
+        conn.commit()
+        print(f"Батч профилирования {batch_id} сохранен")
+        return batch_id
+    
+    except Exception as e:
+        print(f"Ошибка при профилировании: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+def merged_profiles(cursor, table_name, batch_ids):
+    """
+    Объединяет сохраненные профили указанных батчей по колонкам
+    """
+    cursor.execute("""
+        SELECT column_name, is_numeric, row_count, null_count, min_value, max_value, hll, kll
+        FROM s_sql_dds.t_column_profiles
+        WHERE table_name = %s AND batch_id = ANY(%s)
+        ORDER BY batch_id
+    """, (table_name, list(batch_ids)))
+    merged = {}
+    for column_name, *fields in cursor.fetchall():
+        profile = profile_from_row(*fields)
+        if column_name in merged:
+            merged[column_name].merge(profile)
+        else:
+            merged[column_name] = profile
+    return merged
+
+def non_overlapping_batches(batches):
+    """
+    Батчи без пересечения окон: из пересекающихся (повторная загрузка окна) берется
+    последний. batches - [(batch_id, window_start, window_end)], None - открытая граница
+    """
+    selected = []
+    for batch_id, start, end in sorted(batches, key=lambda batch: batch[0], reverse=True):
+        overlaps = any(
+            (start is None or other_end is None or start <= other_end)
+            and (end is None or other_start is None or other_start <= end)
+            for _, other_start, other_end in selected
+        )
+        if not overlaps:
+            selected.append((batch_id, start, end))
+    return sorted(batch_id for batch_id, _, _ in selected)
+
+def window_profiles(table_name, start_dt=None, end_dt=None):
+    """
+    Статистика колонок за период по скетчам батчей, окна которых лежат внутри периода.
+    Каждая строка учитывается один раз: окна батчей не пересекаются
+    """
+    conn = None
+    try:
+        conn = get_pg_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT batch_id, window_start, window_end
+            FROM s_sql_dds.t_profile_batches
+            WHERE (%(start_dt)s::DATE IS NULL OR window_start >= %(start_dt)s::DATE)
+              AND (%(end_dt)s::DATE IS NULL OR window_end <= %(end_dt)s::DATE)
+        """, {'start_dt': start_dt, 'end_dt': end_dt})
+        batch_ids = non_overlapping_batches(cursor.fetchall())
+        return merged_profiles(cursor, table_name, batch_ids)
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+def drift_checks(table_name, current, baseline, ks_threshold=KS_THRESHOLD, null_rate_threshold=NULL_RATE_THRESHOLD):
+    """
+    Результаты проверок дрейфа в формате dq_runner.save_results
+    """
+    results = []
+    for column_name, profile in current.items():
+        if column_name not in baseline:
+            continue
+        started = time.perf_counter()
+        drift = compare_profiles(profile, baseline[column_name])
+        
+        metrics = [('null_rate_delta', 'Null rate drift', null_rate_threshold)]
+        # Распределение суррогатных ключей меняется при каждой перезагрузке
+        if profile.numeric and column_name != 'id' and not column_name.endswith('_id'):
+            metrics.append(('ks_distance', 'Distribution drift', ks_threshold))
+        
+        for metric, title, threshold in metrics:
+            value = drift[metric]
+            if value is None:
+                continue
+            status = 'passed' if value <= threshold else 'failed'
+            message = f"{metric}={value:.4f}"
+            if drift['median_shift'] is not None and metric == 'ks_distance':
+                message += f", median shift {drift['median_shift'] * 100:.2f}%"
+            results.append({
+                'check': {
+                    'name': f"{title}: {column_name}",
+                    'check_type': 'drift',
+                    'table': table_name,
+                    'column': column_name,
+                    'threshold': threshold,
+                },
+                'status': status,
+                'expected_value': None,
+                'actual_value': round(value, 6),
+                'error_message': message,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+    return results
+
+def detect_drift(table_name='t_dm_task', baseline_batches=5, ks_threshold=KS_THRESHOLD,
+                 null_rate_threshold=NULL_RATE_THRESHOLD):
+    """
+    Сравнивает последний батч с объединением baseline_batches предыдущих
+    только по скетчам и пишет результаты как проверки типа 'drift'
+    """
+    conn = None
+    try:
+        conn = get_pg_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT batch_id
+            FROM s_sql_dds.t_column_profiles
+            WHERE table_name = %s
+            ORDER BY batch_id DESC
+            LIMIT %s
+        """, (table_name, baseline_batches + 1))
+        batch_ids = [row[0] for row in cursor.fetchall()]
+        
+        if len(batch_ids) < 2:
+            print(f"Недостаточно батчей для сравнения {table_name}")
+            return []
+        
+        current = merged_profiles(cursor, table_name, batch_ids[:1])
+        baseline = merged_profiles(cursor, table_name, batch_ids[1:])
+        results = drift_checks(table_name, current, baseline, ks_threshold, null_rate_threshold)
+        
+        cursor.execute("SELECT s_sql_dds.fn_dq_start_run(%s, %s, %s)", ('drift', None, None))
+        run_id = cursor.fetchone()[0]
+        save_results(cursor, results)
+        cursor.execute("SELECT s_sql_dds.fn_dq_finish_run(%s)", (run_id,))
+        conn.commit()
+        
+        for result in results:
+            print(f"[{result['status'].upper()}] {result['check']['name']}: {result['error_message']}")
+        return results
+    
+    except Exception as e:
+        print(f"Ошибка при поиске дрейфа: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+if __name__ == "__main__":
+    start = sys.argv[1] if len(sys.argv) > 1 else None
+    end = sys.argv[2] if len(sys.argv) > 2 else None
+    profile_batch(start, end)
+    for table in PROFILED_TABLES:
+        detect_drift(table)
\ No newline at end of file
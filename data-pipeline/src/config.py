@@ -18,5 +18,37 @@ MYSQL_CONFIG = {
     'password': os.getenv('MYSQL_PASSWORD', 'password')
 }
 
+# Размеры общих пулов подключений (см. db_pool.py)
+PG_POOL_MIN = int(os.getenv('PG_POOL_MIN', '1'))
+PG_POOL_MAX = int(os.getenv('PG_POOL_MAX', '10'))
+MYSQL_POOL_MAX = int(os.getenv('MYSQL_POOL_MAX', '8'))
+
+# Каталог для выгрузки v_dm_task в колоночные файлы
+EXPORT_DIR = os.getenv('EXPORT_DIR', 'export')
+
+# Хранение результатов DQ: сколько полных месяцев держать и куда архивировать
+# удаляемые секции (пусто - без архива)
+DQ_RETENTION_MONTHS = int(os.getenv('DQ_RETENTION_MONTHS', '6'))
+DQ_ARCHIVE_DIR = os.getenv('DQ_ARCHIVE_DIR') or None
+
+# Каталог метрик этапов: spans.jsonl и etl_pipeline.prom для textfile collector
+# node_exporter (пусто - метрики только в памяти)
+METRICS_DIR = os.getenv('METRICS_DIR', 'metrics')
+
+# Бэкенд исполнения по умолчанию: postgres или sqlite (см. backends.py)
+PIPELINE_BACKEND = os.getenv('PIPELINE_BACKEND', 'postgres')
+
+# Встроенный бэкенд SQLite (main.py --backend=sqlite): файл базы и файл базы dwh,
+# заменяющей MySQL. ':memory:' - обе базы в памяти процесса
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'etl_local.db')
+SQLITE_DWH_PATH = os.getenv('SQLITE_DWH_PATH', 'etl_local_dwh.db')
+
+# Каталог результатов benchmark.py и сохраненного baseline
+BENCHMARK_DIR = os.getenv('BENCHMARK_DIR', 'benchmarks')
+# База PostgreSQL, которую benchmark.py может очищать без --i-know-this-truncates
+BENCHMARK_DATABASE = os.getenv('BENCHMARK_DATABASE', 'etl_benchmark')
+# База MySQL, в которую benchmark.py переносит витрину; с другой базой этап migrate пропускается
+BENCHMARK_MYSQL_DATABASE = os.getenv('BENCHMARK_MYSQL_DATABASE', 'etl_benchmark')
+
 # Для обратной совместимости
 DB_CONFIG = PG_CONFIG
\ No newline at end of file
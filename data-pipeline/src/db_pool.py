@@ -0,0 +1,203 @@
+import time
+import queue
+import threading
+import weakref
+from psycopg2 import pool
+from config import PG_CONFIG, MYSQL_CONFIG, PG_POOL_MIN, PG_POOL_MAX, MYSQL_POOL_MAX
+
+# Общие пулы подключений PostgreSQL и MySQL для всех этапов пайплайна.
+# get_*_connection выдает подключение из пула с настройками сессии этапа,
+# release_*_connection сбрасывает настройки и возвращает подключение в пул
+
+# Настройки сессии PostgreSQL по этапам
+PG_SESSION_SETTINGS = {
+    'init': {'lock_timeout': '30s'},
+    # Сырые данные перезагружаются, а чанк фиксируется вместе с контрольной точкой,
+    # поэтому потеря последних коммитов при сбое безопасна
+    'load': {'synchronous_commit': 'off'},
+    'transform': {'work_mem': '128MB'},
+    'dm_load': {'work_mem': '256MB'},
+    'dq': {'work_mem': '128MB', 'statement_timeout': '10min'},
+    'migrate': {'work_mem': '64MB'},
+}
+
+# Настройки сессии MySQL по этапам
+MYSQL_SESSION_SETTINGS = {
+    'migrate': {'innodb_lock_wait_timeout': 120},
+}
+
+# Подключение, простоявшее в пуле дольше, проверяется перед выдачей
+HEALTH_CHECK_IDLE_S = 30
+
+_lock = threading.Lock()
+_pg_pool = None
+_pg_slots = threading.BoundedSemaphore(PG_POOL_MAX)
+# Выданные подключения MySQL ограничены так же, как PostgreSQL; простаивающие лежат в очереди
+_mysql_slots = threading.BoundedSemaphore(MYSQL_POOL_MAX)
+_mysql_idle = queue.LifoQueue(maxsize=MYSQL_POOL_MAX)
+# Время возврата подключения в пул; ключ - само подключение, а не id(),
+# который после закрытия может достаться новому объекту
+_last_used = weakref.WeakKeyDictionary()
+
+def _get_pg_pool():
+    global _pg_pool
+    with _lock:
+        if _pg_pool is None or _pg_pool.closed:
+            _pg_pool = pool.ThreadedConnectionPool(PG_POOL_MIN, PG_POOL_MAX, **PG_CONFIG)
+        return _pg_pool
+
+def _pg_alive(conn):
+    if conn.closed:
+        return False
+    # Новое подключение или недавно использованное считается живым
+    if time.monotonic() - _last_used.get(conn, time.monotonic()) < HEALTH_CHECK_IDLE_S:
+        return True
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.close()
+        conn.rollback()
+        return True
+    except Exception:
+        return False
+
+def get_pg_connection(stage=None, **settings):
+    """
+    Подключение PostgreSQL из общего пула с настройками сессии этапа.
+    Если пул исчерпан, ждет освобождения подключения
+    """
+    _pg_slots.acquire()
+    try:
+        pg_pool = _get_pg_pool()
+        conn = pg_pool.getconn()
+        if not _pg_alive(conn):
+            _last_used.pop(conn, None)
+            pg_pool.putconn(conn, close=True)
+            conn = pg_pool.getconn()
+        
+        session = dict(PG_SESSION_SETTINGS.get(stage, {}), **settings)
+        if session:
+            cur = conn.cursor()
+            for name, value in session.items():
+                cur.execute("SELECT set_config(%s, %s, FALSE)", (name, str(value)))
+            cur.close()
+            conn.commit()
+        return conn
+    except Exception:
+        _pg_slots.release()
+        raise
+
+def release_pg_connection(conn):
+    """
+    Возвращает подключение в пул: откатывает незавершенную транзакцию
+    и сбрасывает настройки сессии (в том числе dq.run_id)
+    """
+    pg_pool = _get_pg_pool()
+    try:
+        close = conn.closed != 0
+        if not close:
+            try:
+                conn.rollback()
+                conn.autocommit = True
+                conn.cursor().execute("RESET ALL")
+                conn.autocommit = False
+            except Exception:
+                close = True
+        if close:
+            _last_used.pop(conn, None)
+        else:
+            _last_used[conn] = time.monotonic()
+        pg_pool.putconn(conn, close=close)
+    finally:
+        _pg_slots.release()
+
+def connect_mysql():
+    # Отдельное подключение к MySQL через pymysql (вне пула).
+    # pymysql импортируется здесь, чтобы этапы без MySQL не требовали его
+    import pymysql
+    return pymysql.connect(
+        host=MYSQL_CONFIG['host'],
+        port=MYSQL_CONFIG['port'],
+        user=MYSQL_CONFIG['user'],
+        password=MYSQL_CONFIG['password'],
+        database=MYSQL_CONFIG['database'],
+        charset='utf8mb4'
+    )
+
+def _close_mysql(conn):
+    _last_used.pop(conn, None)
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+def get_mysql_connection(stage=None, **settings):
+    """
+    Подключение MySQL из общего пула с настройками сессии этапа.
+    Если выдано MYSQL_POOL_MAX подключений, ждет освобождения
+    """
+    _mysql_slots.acquire()
+    conn = None
+    try:
+        while conn is None:
+            try:
+                candidate = _mysql_idle.get_nowait()
+            except queue.Empty:
+                conn = connect_mysql()
+                break
+            if time.monotonic() - _last_used.get(candidate, 0) < HEALTH_CHECK_IDLE_S:
+                conn = candidate
+                break
+            try:
+                candidate.ping(reconnect=False)
+                conn = candidate
+            except Exception:
+                _close_mysql(candidate)
+        
+        session = dict(MYSQL_SESSION_SETTINGS.get(stage, {}), **settings)
+        cur = conn.cursor()
+        for name, value in session.items():
+            cur.execute(f"SET SESSION {name} = %s", (value,))
+        cur.close()
+        # Запоминаем, какие переменные сбросить при возврате
+        conn._pool_session = list(session)
+        return conn
+    except Exception:
+        if conn is not None:
+            _close_mysql(conn)
+        _mysql_slots.release()
+        raise
+
+def release_mysql_connection(conn):
+    """
+    Возвращает подключение MySQL в пул с настройками сессии по умолчанию
+    """
+    try:
+        conn.rollback()
+        cur = conn.cursor()
+        for name in getattr(conn, '_pool_session', []):
+            cur.execute(f"SET SESSION {name} = DEFAULT")
+        cur.close()
+        conn._pool_session = []
+        _last_used[conn] = time.monotonic()
+        _mysql_idle.put_nowait(conn)
+    except Exception:
+        _close_mysql(conn)
+    finally:
+        _mysql_slots.release()
+
+def close_all():
+    """
+    Закрывает все подключения пулов (в конце пайплайна)
+    """
+    global _pg_pool
+    with _lock:
+        if _pg_pool is not None and not _pg_pool.closed:
+            _pg_pool.closeall()
+        _pg_pool = None
+    while True:
+        try:
+            _close_mysql(_mysql_idle.get_nowait())
+        except queue.Empty:
+            break
+    _last_used.clear()
\ No newline at end of file
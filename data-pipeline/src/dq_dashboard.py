@@ -1,4 +1,3 @@
-import psycopg2
 import pandas as pd
 from datetime import datetime, timedelta
 import sys
@@ -7,17 +6,7 @@ import os
 # Добавляем путь для импорта
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-try:
-    from config import DB_CONFIG
-except ImportError:
-    # Альтернативный способ если импорт не работает
-    DB_CONFIG = {
-        'host': 'localhost',
-        'port': '5432',
-        'database': 'etl_db',
-        'user': 'user',
-        'password': 'password'
-    }
+from db_pool import get_pg_connection, release_pg_connection
 
 def generate_dq_dashboard(days_back=7):
     """
@@ -25,25 +14,36 @@ def generate_dq_dashboard(days_back=7):
     """
     conn = None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_pg_connection()
         
-        summary_query = """
+        # Сводка, разбивка по типам и тренды строятся по дневной сводке одним запросом
+        rollup_query = """
             SELECT 
-                COUNT(*) as total_checks,
-                COUNT(*) FILTER (WHERE status = 'passed') as passed_checks,
-                COUNT(*) FILTER (WHERE status = 'failed') as failed_checks,
-                COUNT(*) FILTER (WHERE status = 'error') as error_checks,
-                ROUND(COUNT(*) FILTER (WHERE status = 'passed') * 100.0 / NULLIF(COUNT(*), 0), 2) as success_rate
-            FROM s_sql_dds.t_dq_check_results
-            WHERE execution_date >= CURRENT_DATE - INTERVAL '%s days'
+                check_date,
+                check_type,
+                total_checks,
+                passed_checks,
+                failed_checks,
+                error_checks
+            FROM s_sql_dds.t_dq_daily_rollup
+            WHERE check_date >= CURRENT_DATE - INTERVAL '%s days'
+            ORDER BY check_date, check_type
         """
         
         cur = conn.cursor()
-        cur.execute(summary_query, (days_back,))
-        result = cur.fetchone()
+        cur.execute(rollup_query, (days_back,))
+        rollup = cur.fetchall()
+        
+        def success_rate_of(passed, total):
+            return round(passed * 100.0 / total, 2) if total else None
         
-        if result and result[0] > 0:
-            total, passed, failed, errors, success_rate = result
+        total = sum(row[2] for row in rollup)
+        passed = sum(row[3] for row in rollup)
+        failed = sum(row[4] for row in rollup)
+        errors = sum(row[5] for row in rollup)
+        success_rate = success_rate_of(passed, total)
+        
+        if total > 0:
             print(f" Период: последние {days_back} дней")
             print(f" Всего проверок: {total}")
             print(f" Успешных: {passed} ({success_rate}%)")
@@ -63,30 +63,27 @@ def generate_dq_dashboard(days_back=7):
             print("Нет данных о проверках за указанный период")
         
         
-        type_query = """
-            SELECT 
-                check_type,
-                COUNT(*) as total,
-                COUNT(*) FILTER (WHERE status = 'passed') as passed,
-                COUNT(*) FILTER (WHERE status = 'failed') as failed,
-                COUNT(*) FILTER (WHERE status = 'error') as errors,
-                ROUND(COUNT(*) FILTER (WHERE status = 'passed') * 100.0 / NULLIF(COUNT(*), 0), 2) as success_rate
-            FROM s_sql_dds.t_dq_check_results
-            WHERE execution_date >= CURRENT_DATE - INTERVAL '%s days'
-              AND check_type != 'summary'
-            GROUP BY check_type
-            ORDER BY check_type
-        """
-        
-        cur.execute(type_query, (days_back,))
-        type_results = cur.fetchall()
-        
-        if type_results:
+        type_totals = {}
+        trend_totals = {}
+        for check_date, check_type, day_total, day_passed, day_failed, day_errors in rollup:
+            if check_type == 'summary':
+                continue
+            t = type_totals.setdefault(check_type, [0, 0, 0, 0])
+            d = trend_totals.setdefault(check_date, [0, 0])
+            t[0] += day_total
+            t[1] += day_passed
+            t[2] += day_failed
+            t[3] += day_errors
+            d[0] += day_total
+            d[1] += day_passed
+        
+        if type_totals:
             print(f"{'Тип проверки':<20} {'Всего':<6} {'+':<6} {'-':<6} {'!':<6} {'%':<6}")
             print("-"*50)
-            for row in type_results:
-                check_type, total, passed, failed, errors, rate = row
-                print(f"{check_type:<20} {total:<6} {passed:<6} {failed:<6} {errors:<6} {rate:<6.1f}")
+            for check_type in sorted(type_totals):
+                type_total, type_passed, type_failed, type_errors = type_totals[check_type]
+                rate = success_rate_of(type_passed, type_total) or 0
+                print(f"{check_type:<20} {type_total:<6} {type_passed:<6} {type_failed:<6} {type_errors:<6} {rate:<6.1f}")
         else:
             print("Нет данных о типах проверок")
         
@@ -98,8 +95,15 @@ def generate_dq_dashboard(days_back=7):
                 execution_date,
                 error_message
             FROM s_sql_dds.t_dq_check_results
-            WHERE check_type != 'summary'
-            ORDER BY execution_date DESC
+            WHERE run_id = (
+                -- Последний завершенный запуск проверок, без дрейфа, чанков в процессе загрузки и незавершенных
+                SELECT MAX(run_id)
+                FROM s_sql_dds.t_dq_runs
+                WHERE COALESCE(mode, '') NOT IN ('drift', 'in_flight')
+                  AND status <> 'running'
+            )
+              AND check_type != 'summary'
+            ORDER BY check_id DESC
             LIMIT 10
         """
         
@@ -117,21 +121,10 @@ def generate_dq_dashboard(days_back=7):
             print("Нет данных о последних проверках")
         
         
-        trends_query = """
-            SELECT 
-                DATE(execution_date) as check_date,
-                COUNT(*) as total_checks,
-                COUNT(*) FILTER (WHERE status = 'passed') as passed_checks,
-                ROUND(COUNT(*) FILTER (WHERE status = 'passed') * 100.0 / NULLIF(COUNT(*), 0), 2) as daily_success_rate
-            FROM s_sql_dds.t_dq_check_results
-            WHERE execution_date >= CURRENT_DATE - INTERVAL '%s days'
-              AND check_type != 'summary'
-            GROUP BY DATE(execution_date)
-            ORDER BY check_date
-        """
-        
-        cur.execute(trends_query, (days_back,))
-        trends = cur.fetchall()
+        trends = [
+            (check_date, day_total, day_passed, success_rate_of(day_passed, day_total) or 0)
+            for check_date, (day_total, day_passed) in sorted(trend_totals.items())
+        ]
         
         if trends:
             print(f"{'Дата':<12} {'Проверок':<10} {'Успешно':<10} {'%':<8}")
@@ -150,13 +143,21 @@ def generate_dq_dashboard(days_back=7):
                 error_message,
                 execution_date
             FROM s_sql_dds.t_dq_check_results
-            WHERE status IN ('failed', 'error')
+            WHERE run_id IN (
+                SELECT run_id
+                FROM s_sql_dds.t_dq_runs
+                WHERE started_at >= CURRENT_DATE - INTERVAL '%s days'
+                  AND (failed_checks > 0 OR error_checks > 0)
+                ORDER BY run_id DESC
+                LIMIT 5
+            )
               AND execution_date >= CURRENT_DATE - INTERVAL '%s days'
-            ORDER BY execution_date DESC
+              AND status IN ('failed', 'error')
+            ORDER BY check_id DESC
             LIMIT 5
         """
         
-        cur.execute(critical_query, (days_back,))
+        cur.execute(critical_query, (days_back, days_back))
         critical_issues = cur.fetchall()
         
         if critical_issues:
@@ -169,7 +170,7 @@ def generate_dq_dashboard(days_back=7):
             print("Критических проблем не обнаружено!")
         
         
-        if 'success_rate' in locals() and success_rate:
+        if success_rate:
             if success_rate < 90:
                 print("Проверить качество входящих данных")
                 print("Рассмотреть возможность корректировки порогов проверок")
@@ -187,7 +188,7 @@ def generate_dq_dashboard(days_back=7):
                 print("Рассмотреть возможность добавления новых проверок")
         
         
-        if 'success_rate' in locals() and success_rate:
+        if success_rate:
             if success_rate >= 95:
                 print("ОТЛИЧНО: Качество данных на высоком уровне")
                 print("Все системы работают стабильно")
@@ -209,7 +210,7 @@ def generate_dq_dashboard(days_back=7):
         raise
     finally:
         if conn:
-            conn.close()
+            release_pg_connection(conn)
 
 if __name__ == "__main__":
     # Получаем количество дней из аргументов командной строки
@@ -0,0 +1,114 @@
+import os
+import re
+import sys
+import gzip
+from datetime import date
+from config import DQ_RETENTION_MONTHS, DQ_ARCHIVE_DIR
+from db_pool import get_pg_connection, release_pg_connection
+
+PARTITION_PATTERN = re.compile(r'^t_dq_check_results_p(\d{4})_(\d{2})$')
+
+PARTITIONS_QUERY = """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    JOIN pg_namespace n ON n.oid = p.relnamespace
+    WHERE n.nspname = 's_sql_dds'
+      AND p.relname = 't_dq_check_results'
+    ORDER BY c.relname
+"""
+
+def partition_month(partition_name):
+    """
+    Месяц секции по ее имени (t_dq_check_results_pYYYY_MM), None для DEFAULT
+    """
+    match = PARTITION_PATTERN.match(partition_name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+def retention_cutoff(today, retention_months):
+    """
+    Первый месяц, который еще хранится: текущий месяц минус retention_months
+    """
+    months = today.year * 12 + today.month - 1 - retention_months
+    return date(months // 12, months % 12 + 1, 1)
+
+def expired_partitions(partition_names, today, retention_months):
+    """
+    Секции, целиком лежащие раньше границы хранения
+    """
+    cutoff = retention_cutoff(today, retention_months)
+    return [
+        name for name in partition_names
+        if partition_month(name) is not None and partition_month(name) < cutoff
+    ]
+
+def archive_partition(cur, partition_name, archive_dir):
+    """
+    Выгружает секцию в сжатый CSV перед удалением
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{partition_name}.csv.gz")
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        cur.copy_expert(
+            f"COPY s_sql_dds.{partition_name} TO STDOUT WITH (FORMAT CSV, HEADER)",
+            f
+        )
+    return path
+
+def apply_dq_retention(retention_months=DQ_RETENTION_MONTHS, mode='drop', archive_dir=DQ_ARCHIVE_DIR, today=None):
+    """
+    Отсоединяет секции t_dq_check_results старше retention_months месяцев.
+    mode='drop' удаляет их, mode='detach' оставляет отдельными таблицами.
+    Дневная сводка t_dq_daily_rollup не затрагивается, поэтому тренды дашборда сохраняются
+    """
+    if mode not in ('drop', 'detach'):
+        raise ValueError(f"Неизвестный режим хранения: {mode}")
+    
+    conn = None
+    try:
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        
+        # Заодно создаем секции наперед
+        cur.execute("SELECT s_sql_dds.fn_dq_create_partitions()")
+        
+        cur.execute(PARTITIONS_QUERY)
+        partitions = [row[0] for row in cur.fetchall()]
+        expired = expired_partitions(partitions, today or date.today(), retention_months)
+        
+        if not expired:
+            print(f"Нет секций старше {retention_months} мес.")
+            conn.commit()
+            return []
+        
+        for partition_name in expired:
+            if archive_dir:
+                path = archive_partition(cur, partition_name, archive_dir)
+                print(f"Архив {partition_name}: {path}")
+            
+            cur.execute(f"ALTER TABLE s_sql_dds.t_dq_check_results DETACH PARTITION s_sql_dds.{partition_name}")
+            if mode == 'drop':
+                cur.execute(f"DROP TABLE s_sql_dds.{partition_name}")
+                print(f"Секция {partition_name} удалена")
+            else:
+                print(f"Секция {partition_name} отсоединена")
+        
+        conn.commit()
+        return expired
+        
+    except Exception as e:
+        print(f"Ошибка при очистке результатов DQ: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+if __name__ == "__main__":
+    months = int(sys.argv[1]) if len(sys.argv) > 1 else DQ_RETENTION_MONTHS
+    retention_mode = sys.argv[2] if len(sys.argv) > 2 else 'drop'
+    apply_dq_retention(months, retention_mode)
\ No newline at end of file
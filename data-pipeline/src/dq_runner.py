@@ -0,0 +1,230 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import PG_POOL_MAX
+from db_pool import get_pg_connection, release_pg_connection
+from metrics import span
+
+# Реестр проверок качества данных.
+# metric_sql возвращает одну строку: (actual_value), (actual_value, expected_value)
+# или (actual_value, expected_value, metric_value) и может использовать параметры
+# %(start_dt)s и %(end_dt)s. Проверка пройдена, если metric_value (а без него
+# actual_value) <= threshold. actual_value и expected_value хранят те же величины,
+# что и fn_dq_checks_load, чтобы история результатов оставалась сравнимой
+DQ_CHECKS = []
+
+# Фильтр окна загрузки, общий для всех проверок
+WINDOW_FILTER = """
+    (%(start_dt)s::DATE IS NULL OR effective_from >= %(start_dt)s::DATE)
+    AND (%(end_dt)s::DATE IS NULL OR effective_to <= %(end_dt)s::DATE)
+"""
+
+def register_check(name, check_type, table, metric_sql, threshold, column=None, timeout_s=60):
+    """
+    Регистрирует проверку в реестре DQ_CHECKS
+    """
+    DQ_CHECKS.append({
+        'name': name,
+        'check_type': check_type,
+        'table': table,
+        'column': column,
+        'metric_sql': metric_sql,
+        'threshold': threshold,
+        'timeout_s': timeout_s,
+    })
+
+register_check(
+    name='Purchase amount sum comparison',
+    check_type='correctness',
+    table='v_dm_task',
+    metric_sql=f"""
+        WITH expected AS (
+            SELECT COALESCE(SUM(purchase_amount), 0) AS value
+            FROM s_sql_dds.t_sql_source_structured
+            WHERE {WINDOW_FILTER}
+        ), actual AS (
+            SELECT COALESCE(SUM(purchase_amount), 0) AS value
+            FROM s_sql_dds.v_dm_task
+            WHERE {WINDOW_FILTER}
+        )
+        SELECT a.value, e.value, ABS(e.value - a.value) / NULLIF(e.value, 0)
+        FROM expected e, actual a
+    """,
+    threshold=0.01,
+)
+
+register_check(
+    name='Null values percentage',
+    check_type='completeness',
+    table='v_dm_task',
+    column='customer_id',
+    metric_sql=f"""
+        SELECT COALESCE(COUNT(*) FILTER (WHERE customer_id IS NULL) * 100.0 / NULLIF(COUNT(*), 0), 0)
+        FROM s_sql_dds.v_dm_task
+        WHERE {WINDOW_FILTER}
+    """,
+    threshold=5,
+)
+
+register_check(
+    name='Date range validation',
+    check_type='consistency',
+    table='v_dm_task',
+    metric_sql=f"""
+        SELECT COUNT(*)
+        FROM s_sql_dds.v_dm_task
+        WHERE effective_to < effective_from
+          AND {WINDOW_FILTER}
+    """,
+    threshold=0,
+)
+
+register_check(
+    name='Duplicate records check',
+    check_type='uniqueness',
+    table='v_dm_task',
+    metric_sql=f"""
+        SELECT COUNT(*) FROM (
+            SELECT fact_id, customer_id, effective_from
+            FROM s_sql_dds.v_dm_task
+            WHERE {WINDOW_FILTER}
+            GROUP BY fact_id, customer_id, effective_from
+            HAVING COUNT(*) > 1
+        ) duplicates
+    """,
+    threshold=0,
+)
+
+register_check(
+    name='Salary range validation',
+    check_type='validity',
+    table='v_dm_task',
+    column='salary',
+    metric_sql=f"""
+        SELECT COUNT(*)
+        FROM s_sql_dds.v_dm_task
+        WHERE (salary < 0 OR salary > 1000000)
+          AND {WINDOW_FILTER}
+    """,
+    threshold=0,
+)
+
+def run_check(check, start_dt=None, end_dt=None):
+    """
+    Выполняет одну проверку на подключении из общего пула с собственным statement_timeout
+    """
+    conn = None
+    started = time.perf_counter()
+    result = {
+        'check': check,
+        'status': 'error',
+        'actual_value': None,
+        'expected_value': None,
+        'metric_value': None,
+        'error_message': None,
+    }
+    try:
+        conn = get_pg_connection('dq', statement_timeout=int(check['timeout_s'] * 1000))
+        cur = conn.cursor()
+        cur.execute(check['metric_sql'], {'start_dt': start_dt, 'end_dt': end_dt})
+        row = cur.fetchone()
+        cur.close()
+        
+        result['actual_value'] = row[0]
+        result['expected_value'] = row[1] if len(row) > 1 else None
+        metric = row[2] if len(row) > 2 else row[0]
+        result['metric_value'] = metric
+        
+        if metric is not None and metric <= check['threshold']:
+            result['status'] = 'passed'
+            result['error_message'] = 'Metric within threshold'
+        else:
+            result['status'] = 'failed'
+            result['error_message'] = f"Metric {metric} exceeds threshold {check['threshold']}"
+    except Exception as e:
+        result['error_message'] = f"Error: {e}"[:500]
+    finally:
+        if conn:
+            release_pg_connection(conn)
+        result['duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+def save_results(cursor, results):
+    """
+    Записывает результаты проверок и итоговую строку в t_dq_check_results
+    """
+    for result in results:
+        check = result['check']
+        cursor.execute("""
+            INSERT INTO s_sql_dds.t_dq_check_results 
+            (check_type, table_name, column_name, check_name, status,
+             expected_value, actual_value, metric_value, error_threshold, error_message, duration_ms)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            check['check_type'], check['table'], check['column'], check['name'], result['status'],
+            result['expected_value'], result['actual_value'], result.get('metric_value'), check['threshold'],
+            result['error_message'], result['duration_ms']
+        ))
+    
+    total = len(results)
+    passed = sum(1 for r in results if r['status'] == 'passed')
+    cursor.execute("""
+        INSERT INTO s_sql_dds.t_dq_check_results 
+        (check_type, table_name, check_name, status, expected_value, actual_value, error_message, duration_ms)
+        VALUES ('summary', 'v_dm_task', 'Overall DQ check', %s, %s, %s, %s, %s)
+    """, (
+        'passed' if passed == total else 'failed', total, passed,
+        f"Total: {total}, Passed: {passed}, Failed: {total - passed}",
+        sum(r['duration_ms'] for r in results)
+    ))
+
+def run_dq_checks_parallel(start_dt=None, end_dt=None, max_workers=4, checks=None):
+    """
+    Запускает независимые проверки из реестра параллельно на подключениях общего пула
+    и пишет длительность каждой проверки в t_dq_check_results
+    """
+    checks = DQ_CHECKS if checks is None else checks
+    # Одно подключение занято записью результатов, проверкам остаются прочие слоты пула
+    max_workers = max(1, min(max_workers, PG_POOL_MAX - 1))
+    conn = None
+    
+    try:
+        print(f"Запуск {len(checks)} проверок качества данных ({max_workers} потоков)...")
+        
+        # Запуск открывается на подключении, которое потом запишет результаты
+        conn = get_pg_connection('dq')
+        cursor = conn.cursor()
+        cursor.execute("SELECT s_sql_dds.fn_dq_start_run(%s, %s, %s)", ('parallel', start_dt, end_dt))
+        run_id = cursor.fetchone()[0]
+        conn.commit()
+        
+        with span('dq.checks', mode='parallel', dq_run_id=run_id) as current:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(
+                    lambda check: run_check(check, start_dt, end_dt), checks
+                ))
+            
+            save_results(cursor, results)
+            cursor.execute("SELECT s_sql_dds.fn_dq_finish_run(%s)", (run_id,))
+            conn.commit()
+            cursor.close()
+            current.set(rows=len(results))
+        
+        for result in sorted(results, key=lambda r: -r['duration_ms']):
+            print(f"[{result['status'].upper()}] {result['check']['name']}: "
+                  f"{result['metric_value']} ({result['duration_ms']:.1f} ms)")
+        
+        failed = sum(1 for r in results if r['status'] != 'passed')
+        print(f"Итог: Всего: {len(results)}, Успешно: {len(results) - failed}, Неудачно/ошибок: {failed}")
+        return results
+        
+    except Exception as e:
+        print(f"Ошибка при запуске проверок качества данных: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+if __name__ == "__main__":
+    run_dq_checks_parallel()
\ No newline at end of file
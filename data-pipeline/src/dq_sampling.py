@@ -0,0 +1,171 @@
+import math
+import time
+from statistics import NormalDist
+from db_pool import get_pg_connection, release_pg_connection
+from dq_runner import save_results
+from metrics import span
+
+# Приближенные проверки: доля строк, удовлетворяющих predicate, в процентах.
+# Проверка падает, только если весь доверительный интервал выше threshold.
+APPROX_CHECKS = [
+    {
+        'name': 'Null values percentage (approx)',
+        'check_type': 'completeness',
+        'table': 't_dm_task',
+        'column': 'customer_id',
+        'predicate': 'customer_id IS NULL',
+        'threshold': 5,
+    },
+    {
+        'name': 'Invalid date range rate (approx)',
+        'check_type': 'consistency',
+        'table': 't_dm_task',
+        'column': None,
+        'predicate': 'effective_to < effective_from',
+        'threshold': 0,
+    },
+    {
+        'name': 'Invalid salary rate (approx)',
+        'check_type': 'validity',
+        'table': 't_dm_task',
+        'column': 'salary',
+        'predicate': 'salary < 0 OR salary > 1000000',
+        'threshold': 0,
+    },
+]
+
+SAMPLING_METHODS = ('SYSTEM', 'BERNOULLI')
+
+# by_start - окно бэкфилла по effective_from, как в fn_dq_checks_load
+WINDOW_FILTER = """
+    (%(start_dt)s::DATE IS NULL OR effective_from >= %(start_dt)s::DATE)
+    AND (%(end_dt)s::DATE IS NULL
+         OR CASE WHEN %(by_start)s THEN effective_from ELSE effective_to END <= %(end_dt)s::DATE)
+"""
+
+def wilson_interval(hits, total, confidence=0.95):
+    """
+    Доверительный интервал Уилсона для доли hits/total, в процентах
+    """
+    if total == 0:
+        return None, None, None
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    p = hits / total
+    denominator = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    # На краях (0 или все строки) граница интервала точная, без ошибки округления
+    lower = 0.0 if hits == 0 else max(0.0, center - margin)
+    upper = 1.0 if hits == total else min(1.0, center + margin)
+    return p * 100, lower * 100, upper * 100
+
+def approximate_verdict(lower, upper, threshold):
+    """
+    passed - интервал целиком не выше порога, failed - целиком выше, borderline - пересекает порог
+    """
+    if lower > threshold:
+        return 'failed'
+    if upper <= threshold:
+        return 'passed'
+    return 'borderline'
+
+def sample_counts(cursor, table, checks, sample_percent, method, seed, start_dt, end_dt, by_start=False):
+    """
+    Считает размер выборки и число срабатываний каждой проверки за один проход по выборке
+    """
+    filters = ",\n".join(f"COUNT(*) FILTER (WHERE {check['predicate']})" for check in checks)
+    cursor.execute(f"""
+        SELECT COUNT(*), {filters}
+        FROM s_sql_dds.{table} TABLESAMPLE {method} (%(percent)s) REPEATABLE (%(seed)s)
+        WHERE {WINDOW_FILTER}
+    """, {'percent': sample_percent, 'seed': seed, 'start_dt': start_dt, 'end_dt': end_dt, 'by_start': by_start})
+    row = cursor.fetchone()
+    return row[0], row[1:]
+
+def exact_rate(cursor, check, start_dt, end_dt, by_start=False):
+    cursor.execute(f"""
+        SELECT COUNT(*) FILTER (WHERE {check['predicate']}) * 100.0 / NULLIF(COUNT(*), 0)
+        FROM s_sql_dds.{check['table']}
+        WHERE {WINDOW_FILTER}
+    """, {'start_dt': start_dt, 'end_dt': end_dt, 'by_start': by_start})
+    return cursor.fetchone()[0] or 0
+
+def run_approximate_dq_checks(start_dt=None, end_dt=None, sample_percent=1.0, method='SYSTEM',
+                              confidence=0.95, exact_on_borderline=False, seed=42, by_start=False):
+    """
+    Приближенные проверки качества данных по выборке TABLESAMPLE с доверительным интервалом.
+    SYSTEM выбирает целые страницы и быстрее, но строки внутри страницы коррелированы,
+    поэтому реальный интервал шире расчетного; BERNOULLI выбирает отдельные строки.
+    Пограничные проверки при exact_on_borderline=True перепроверяются точным проходом.
+    Режим approximate в run_data_quality_checks.
+    """
+    method = method.upper()
+    if method not in SAMPLING_METHODS:
+        raise ValueError(f"Неизвестный метод выборки: {method}")
+    
+    conn = None
+    try:
+        conn = get_pg_connection('dq')
+        cursor = conn.cursor()
+        
+        print(f"Приближенные проверки качества данных: {method} {sample_percent}%...")
+        
+        cursor.execute("SELECT s_sql_dds.fn_dq_start_run(%s, %s, %s)", ('approximate', start_dt, end_dt))
+        run_id = cursor.fetchone()[0]
+        
+        results = []
+        with span('dq.checks', mode='approximate', dq_run_id=run_id) as current:
+            for table in sorted({check['table'] for check in APPROX_CHECKS}):
+                checks = [check for check in APPROX_CHECKS if check['table'] == table]
+                started = time.perf_counter()
+                sampled, hits = sample_counts(cursor, table, checks, sample_percent, method, seed, start_dt, end_dt,
+                                              by_start)
+                sample_ms = (time.perf_counter() - started) * 1000 / len(checks)
+                
+                for check, check_hits in zip(checks, hits):
+                    started = time.perf_counter()
+                    estimate, lower, upper = wilson_interval(check_hits, sampled, confidence)
+                    result = {'check': check, 'expected_value': None, 'actual_value': estimate}
+                    
+                    if estimate is None:
+                        status = 'borderline'
+                        message = 'Empty sample'
+                    else:
+                        status = approximate_verdict(lower, upper, check['threshold'])
+                        message = (f"Estimate {estimate:.3f}% CI{int(confidence * 100)} "
+                                   f"[{lower:.3f}%, {upper:.3f}%] on {sampled} sampled rows")
+                    
+                    if status == 'borderline' and exact_on_borderline:
+                        exact = exact_rate(cursor, check, start_dt, end_dt, by_start)
+                        result['actual_value'] = exact
+                        status = 'passed' if exact <= check['threshold'] else 'failed'
+                        message = f"{message}; exact pass: {exact:.3f}%"
+                    elif status == 'borderline':
+                        # Без точной перепроверки пограничный результат не считается провалом
+                        status = 'passed'
+                        message = f"{message}; borderline"
+                    
+                    result['status'] = status
+                    result['error_message'] = message[:500]
+                    result['duration_ms'] = round(sample_ms + (time.perf_counter() - started) * 1000, 3)
+                    results.append(result)
+                    print(f"[{status.upper()}] {check['name']}: {message}")
+            
+            save_results(cursor, results)
+            cursor.execute("SELECT s_sql_dds.fn_dq_finish_run(%s)", (run_id,))
+            conn.commit()
+            cursor.close()
+            current.set(rows=len(results))
+        return results
+        
+    except Exception as e:
+        print(f"Ошибка при запуске приближенных проверок: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+if __name__ == "__main__":
+    run_approximate_dq_checks()
\ No newline at end of file
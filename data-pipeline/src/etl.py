@@ -2,29 +2,50 @@ from get_dataset import get_dataset
 from load_data_to_db import load_data_to_db
 from fill_structured_table import fill_structured_table
 from init_database import init_database
+from checkpoint import completed_units, mark_done
+from metrics import span
 
-def etl():
+def etl(rows=1000, seed=None, run_id=None, start_date='2023-01-01', end_date='2023-12-31'):
 
-    #Верхнеуровневая ETL-функция без параметров
+    #Верхнеуровневая ETL-функция; start_date и end_date - окно очистки
+    #С run_id выполненные шаги (и загруженные чанки) прерванного запуска пропускаются
     print("Запуск ETL процесса...")
+    done = completed_units(run_id, 'etl')
     
     # 0. Инициализация базы данных
     print("Этап 0: Инициализация базы данных")
-    init_database()
-    
-    # 1. Генерация данных
-    print("Этап 1: Генерация синтетических данных")
-    df = get_dataset(rows=1000)  # Уменьшим до 1000 для тестирования
-    print(f"Сгенерировано {len(df)} записей")
+    if 'init' in done:
+        print("Уже выполнено")
+    else:
+        init_database()
+        mark_done(run_id, 'etl', 'init')
     
-    # 2. Загрузка в неструктурированную таблицу
-    print("Этап 2: Загрузка в неструктурированную таблицу")
-    loaded_count = load_data_to_db(df)
+    if 'load' in done:
+        print("Этапы 1-2 уже выполнены")
+        loaded_count = done['load']['rows']
+    else:
+        # 1. Генерация данных
+        print("Этап 1: Генерация синтетических данных")
+        with span('etl.generate') as current:
+            df = get_dataset(rows=rows, seed=seed)  # По умолчанию 1000 для тестирования
+            df_bytes = int(df.memory_usage(deep=True).sum())
+            current.set(rows=len(df), bytes=df_bytes)
+        print(f"Сгенерировано {len(df)} записей")
+        
+        # 2. Загрузка в неструктурированную таблицу
+        print("Этап 2: Загрузка в неструктурированную таблицу")
+        with span('etl.load') as current:
+            loaded_count = load_data_to_db(df, run_id=run_id)
+            # Объем оценивается по размеру DataFrame в памяти
+            current.set(rows=loaded_count, bytes=df_bytes * loaded_count // max(len(df), 1))
+        if loaded_count > 0:
+            mark_done(run_id, 'etl', 'load', {'rows': loaded_count})
     
     if loaded_count > 0:
         # 3. Очистка и загрузка в структурированную таблицу
         print("Этап 3: Очистка и трансформация данных")
-        fill_structured_table(start_date='2023-01-01', end_date='2023-12-31')
+        with span('etl.cleanse') as current:
+            current.set(rows=fill_structured_table(start_date=start_date, end_date=end_date))
         print("ETL процесс завершен успешно!")
     else:
         print("ETL процесс завершен с ошибками - данные не были загружены")
\ No newline at end of file
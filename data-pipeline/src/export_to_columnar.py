@@ -0,0 +1,209 @@
+import os
+import shutil
+import numpy as np
+from config import EXPORT_DIR
+from db_pool import get_pg_connection, release_pg_connection
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # Без pyarrow выгружаем в сжатые .npz
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = [
+    'fact_id', 'customer_id', 'product_id', 'region_id', 'status_id',
+    'age', 'salary', 'purchase_amount', 'transaction_count',
+    'effective_from', 'effective_to', 'current_flag', 'created_dt'
+]
+
+INT_COLUMNS = ['fact_id', 'customer_id', 'product_id', 'region_id', 'status_id', 'age', 'transaction_count']
+FLOAT_COLUMNS = ['salary', 'purchase_amount']
+DATE_COLUMNS = ['effective_from', 'effective_to', 'created_dt']
+
+# Чтение отсортировано по effective_from, поэтому месяцы приходят по очереди
+# и одновременно открыт только один файл
+EXPORT_QUERY = """
+    SELECT fact_id, customer_id, product_id, region_id, status_id,
+           age, salary, purchase_amount, transaction_count,
+           effective_from, effective_to, current_flag, created_dt
+    FROM s_sql_dds.v_dm_task
+    WHERE (%s IS NULL OR effective_from >= %s)
+      AND (%s IS NULL OR effective_to <= %s)
+    ORDER BY effective_from, fact_id
+"""
+
+# Есть ли в месяце строки вне окна выгрузки: тогда окно покрывает месяц не целиком
+OUTSIDE_WINDOW_QUERY = """
+    SELECT EXISTS (
+        SELECT 1
+        FROM s_sql_dds.v_dm_task
+        WHERE (effective_from >= %(month)s::date AND effective_from < %(month)s::date + INTERVAL '1 month'
+               OR %(month)s IS NULL AND effective_from IS NULL)
+          AND NOT COALESCE((%(start_dt)s IS NULL OR effective_from >= %(start_dt)s)
+                           AND (%(end_dt)s IS NULL OR effective_to <= %(end_dt)s), FALSE)
+    )
+"""
+
+def arrow_schema():
+    return pa.schema([
+        ('fact_id', pa.int64()),
+        ('customer_id', pa.int32()),
+        ('product_id', pa.int32()),
+        ('region_id', pa.int32()),
+        ('status_id', pa.int32()),
+        ('age', pa.int32()),
+        ('salary', pa.decimal128(15, 2)),
+        ('purchase_amount', pa.decimal128(15, 2)),
+        ('transaction_count', pa.int32()),
+        ('effective_from', pa.date32()),
+        ('effective_to', pa.date32()),
+        ('current_flag', pa.bool_()),
+        ('created_dt', pa.date32()),
+    ])
+
+def month_key(value):
+    return value.strftime('%Y-%m') if value else 'unknown'
+
+def window_tag(cursor, month, start_dt=None, end_dt=None):
+    """
+    None, если окно выгружает месяц целиком, иначе метка окна для имен частей
+    """
+    if start_dt is None and end_dt is None:
+        return None
+    month_start = None if month == 'unknown' else f'{month}-01'
+    cursor.execute(OUTSIDE_WINDOW_QUERY, {'month': month_start, 'start_dt': start_dt, 'end_dt': end_dt})
+    if not cursor.fetchone()[0]:
+        return None
+    return f"{start_dt or 'min'}_{end_dt or 'max'}"
+
+def part_prefix(tag=None):
+    return f'part-{tag}-' if tag else 'part-'
+
+def month_dir(output_dir, month, tag=None):
+    # Hive-разметка: effective_month=YYYY-MM.
+    # Месяц, выгружаемый целиком, перезаписывается. При частичном покрытии
+    # заменяются только части этого же окна, остальные данные месяца остаются
+    path = os.path.join(output_dir, 'v_dm_task', f'effective_month={month}')
+    if tag is None:
+        if os.path.exists(path):
+            shutil.rmtree(path)
+    elif os.path.exists(path):
+        for name in os.listdir(path):
+            if name.startswith(part_prefix(tag)):
+                os.remove(os.path.join(path, name))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def rows_to_numpy(rows):
+    """
+    Переводит строки v_dm_task в словарь массивов NumPy.
+    NULL хранится в отдельной маске <column>_isnull.
+    """
+    columns = dict(zip(EXPORT_COLUMNS, zip(*rows)))
+    arrays = {}
+    for name, values in columns.items():
+        isnull = np.array([v is None for v in values])
+        if name in INT_COLUMNS:
+            arrays[name] = np.array([0 if v is None else v for v in values], dtype=np.int64)
+        elif name in FLOAT_COLUMNS:
+            arrays[name] = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+        elif name in DATE_COLUMNS:
+            arrays[name] = np.array(values, dtype='datetime64[D]')
+        else:
+            arrays[name] = np.array([False if v is None else v for v in values], dtype=np.bool_)
+        if isnull.any():
+            arrays[f'{name}_isnull'] = isnull
+    return arrays
+
+def write_numpy_part(path, part, rows, tag=None):
+    np.savez_compressed(os.path.join(path, f'{part_prefix(tag)}{part:05d}.npz'), **rows_to_numpy(rows))
+
+def export_to_columnar(start_dt=None, end_dt=None, output_dir=None, batch_size=50000):
+    """
+    Выгружает v_dm_task в колоночные файлы, секционированные по месяцу effective_from.
+    Пишет потоково по пачкам: с pyarrow - Parquet (zstd, пачка - row group),
+    без него - сжатые .npz (пачка - отдельный файл part-NNNNN.npz в каталоге месяца).
+    Каталог месяца, целиком попавшего в окно, перезаписывается. Если окно
+    покрывает месяц частично, пишутся части part-<start>_<end>-NNNNN и
+    заменяются только части того же окна. MySQL не требуется.
+    """
+    output_dir = output_dir or EXPORT_DIR
+    conn = None
+    
+    try:
+        conn = get_pg_connection('migrate')
+        
+        # Серверный курсор: в памяти не больше одной пачки
+        cursor = conn.cursor(name="export_to_columnar")
+        cursor.itersize = batch_size
+        cursor.execute(EXPORT_QUERY, (start_dt, start_dt, end_dt, end_dt))
+        
+        print(f"Exporting v_dm_task to {output_dir} ({'parquet' if pa else 'npz'})...")
+        
+        schema = arrow_schema() if pa else None
+        check_cursor = conn.cursor()
+        current_month = None
+        tag = None
+        writer = None
+        month_path = None
+        part = 0
+        exported = 0
+        months = 0
+        
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            
+            # Пачка может захватывать границу месяцев - режем ее по месяцам
+            start = 0
+            while start < len(rows):
+                month = month_key(rows[start][9])
+                end = start
+                while end < len(rows) and month_key(rows[end][9]) == month:
+                    end += 1
+                chunk = rows[start:end]
+                
+                if month != current_month:
+                    if writer:
+                        writer.close()
+                        writer = None
+                    
+                    current_month = month
+                    months += 1
+                    tag = window_tag(check_cursor, month, start_dt, end_dt)
+                    month_path = month_dir(output_dir, month, tag)
+                    part = 0
+                    if pa:
+                        path = os.path.join(month_path, f'{part_prefix(tag)}00000.parquet')
+                        writer = pq.ParquetWriter(path, schema, compression='zstd')
+                
+                if pa:
+                    columns = dict(zip(EXPORT_COLUMNS, map(list, zip(*chunk))))
+                    writer.write_table(pa.table(columns, schema=schema))
+                else:
+                    write_numpy_part(month_path, part, chunk, tag)
+                    part += 1
+                
+                exported += len(chunk)
+                start = end
+        
+        if writer:
+            writer.close()
+        
+        cursor.close()
+        check_cursor.close()
+        print(f"Exported {exported} records into {months} monthly partitions")
+        return exported
+        
+    except Exception as e:
+        print(f"Error exporting data: {e}")
+        raise
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+if __name__ == "__main__":
+    export_to_columnar()
\ No newline at end of file
@@ -1,26 +1,34 @@
-import psycopg2
-from config import DB_CONFIG
+from db_pool import get_pg_connection, release_pg_connection
+from metrics import record_span
+from plan_capture import capture_plans
 
-def fill_dm_table(start_dt=None, end_dt=None):
+def fill_dm_table(start_dt=None, end_dt=None, by_start=False):
     """
-    Заполняет витрину данных в PostgreSQL DWH
+    Заполняет витрину данных в PostgreSQL DWH.
+    by_start - окно бэкфилла по effective_from: факты окна загружаются заново
     """
     conn = None
     try:
         # Подключение к базе данных
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_pg_connection('dm_load')
         cursor = conn.cursor()
         
         print("Starting DWH data load...")
         
-        # Вызов функции загрузки данных в DWH
-        if start_dt and end_dt:
-            cursor.execute("SELECT s_sql_dds.fn_dm_data_load(%s, %s)", (start_dt, end_dt))
-        else:
-            cursor.execute("SELECT s_sql_dds.fn_dm_data_load(NULL, NULL)")
+        # Вызов функции загрузки данных в DWH: по строке на шаг (справочники, факты)
+        with capture_plans(conn, 'dm_load', start_dt, end_dt):
+            if start_dt and end_dt:
+                cursor.execute("SELECT * FROM s_sql_dds.fn_dm_data_load(%s, %s, %s)", (start_dt, end_dt, by_start))
+            else:
+                cursor.execute("SELECT * FROM s_sql_dds.fn_dm_data_load(NULL, NULL)")
+            steps = cursor.fetchall()
+            
+            # Коммит изменений
+            conn.commit()
         
-        # Коммит изменений
-        conn.commit()
+        for step, rows_affected, duration_ms in steps:
+            record_span(f"dm_load.{step}", float(duration_ms) / 1000, rows=rows_affected)
+            print(f"  {step}: {rows_affected} rows in {float(duration_ms):.1f} ms")
         
         # Проверка количества записей в фактовой таблице
         cursor.execute("SELECT COUNT(*) FROM s_sql_dds.t_dm_task")
@@ -43,6 +51,9 @@ def fill_dm_table(start_dt=None, end_dt=None):
         print(f"Fact records: {fact_count}")
         print(f"Dimensions - Customers: {customer_count}, Products: {product_count}, Regions: {region_count}, Statuses: {status_count}")
         
+        # Число строк по шагам функции загрузки
+        return {step: rows_affected for step, rows_affected, _ in steps}
+    
     except Exception as e:
         print(f"Error loading DWH data: {e}")
         if conn:
@@ -50,7 +61,21 @@ def fill_dm_table(start_dt=None, end_dt=None):
         raise
     finally:
         if conn:
-            conn.close()
+            release_pg_connection(conn)
+
+def reset_dm_facts():
+    """
+    Очищает фактовую таблицу витрины: факты накапливаются между запусками,
+    для сопоставимых замеров (benchmark.py) витрина загружается заново
+    """
+    conn = None
+    try:
+        conn = get_pg_connection()
+        conn.cursor().execute("TRUNCATE TABLE s_sql_dds.t_dm_task")
+        conn.commit()
+    finally:
+        if conn:
+            release_pg_connection(conn)
 
 if __name__ == "__main__":
     fill_dm_table()
\ No newline at end of file
@@ -1,28 +1,32 @@
-import psycopg2
-from config import DB_CONFIG  # Убрали src.
+from db_pool import get_pg_connection, release_pg_connection
+from plan_capture import capture_plans
 
-def fill_structured_table(start_date='2023-01-01', end_date='2023-12-31'):
+def fill_structured_table(start_date='2023-01-01', end_date='2023-12-31', by_start=False):
     #Запуск SQL-функции для очистки данных и загрузки в структурированную таблицу
+    #by_start - окно бэкфилла по effective_from (см. fn_etl_data_load)
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_pg_connection('transform')
         cur = conn.cursor()
         
-        # Вызов SQL-функции для ETL
-        cur.execute("SELECT s_sql_dds.fn_etl_data_load(%s, %s);", (start_date, end_date))
-        
-        # Получение количества обработанных записей
-        result = cur.fetchone()
-        processed_count = result[0] if result else 0
-        
-        conn.commit()
+        with capture_plans(conn, 'etl.cleanse', start_date, end_date):
+            # Вызов SQL-функции для ETL
+            cur.execute("SELECT s_sql_dds.fn_etl_data_load(%s, %s, %s);", (start_date, end_date, by_start))
+            
+            # Получение количества обработанных записей
+            result = cur.fetchone()
+            processed_count = result[0] if result else 0
+            
+            conn.commit()
         print(f"Успешно обработано {processed_count} записей в t_sql_source_structured")
+        return processed_count
         
     except Exception as e:
         print(f"Ошибка при выполнении ETL: {e}")
         if 'conn' in locals():
             conn.rollback()
+        raise
     finally:
         if 'cur' in locals():
             cur.close()
         if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+            release_pg_connection(conn)
\ No newline at end of file
@@ -3,11 +3,13 @@ import numpy as np
 from datetime import datetime, timedelta
 import random
 
-def get_dataset(rows=1000):
+def get_dataset(rows=1000, seed=None):
     """
-    Генерация синтетических данных с аномалиями и историчностью типа 2 (SCD2)
+    Генерация синтетических данных с аномалиями и историчностью типа 2 (SCD2).
+    С заданным seed результат воспроизводим (нужно для продолжения прерванного запуска)
     """
-    np.random.seed(42)
+    np.random.seed(42 if seed is None else seed)
+    rng = random.Random(seed)
     
     # Базовые данные
     users = [f'user_{i:04d}' for i in range(1, 101)]
@@ -18,42 +20,42 @@ def get_dataset(rows=1000):
     data = []
     
     for i in range(rows):
-        user_id = random.choice(users)
+        user_id = rng.choice(users)
         base_date = datetime(2023, 1, 1)
         
         # Историчность типа 2 - несколько записей для одного пользователя с разными периодами действия
-        effective_from = base_date + timedelta(days=random.randint(0, 300))
-        effective_to = effective_from + timedelta(days=random.randint(30, 365))
+        effective_from = base_date + timedelta(days=rng.randint(0, 300))
+        effective_to = effective_from + timedelta(days=rng.randint(30, 365))
         
         record = {
             'user_id': user_id,
             'user_name': f'User {user_id.split("_")[1]}',
-            'age': random.randint(18, 70),
+            'age': rng.randint(18, 70),
             'salary': np.random.normal(50000, 20000),
             'purchase_amount': np.random.gamma(2, 50),
-            'product_category': random.choice(products),
-            'region': random.choice(regions),
-            'customer_status': random.choice(statuses),
-            'transaction_count': random.randint(1, 100),
+            'product_category': rng.choice(products),
+            'region': rng.choice(regions),
+            'customer_status': rng.choice(statuses),
+            'transaction_count': rng.randint(1, 100),
             'effective_from': effective_from,
             'effective_to': effective_to,
-            'current_flag': True if random.random() > 0.3 else False
+            'current_flag': True if rng.random() > 0.3 else False
         }
         
         # Добавление аномалий
-        if random.random() < 0.05:  # 5% записей с отрицательной зарплатой
+        if rng.random() < 0.05:  # 5% записей с отрицательной зарплатой
             record['salary'] = -abs(record['salary'])
         
-        if random.random() < 0.03:  # 3% записей с пропущенными значениями
+        if rng.random() < 0.03:  # 3% записей с пропущенными значениями
             record['age'] = None
             
-        if random.random() < 0.04:  # 4% записей с некорректными датами
+        if rng.random() < 0.04:  # 4% записей с некорректными датами
             record['effective_to'] = record['effective_from'] - timedelta(days=10)
             
-        if random.random() < 0.02:  # 2% записей с очень большими значениями
+        if rng.random() < 0.02:  # 2% записей с очень большими значениями
             record['purchase_amount'] = record['purchase_amount'] * 1000
             
-        if random.random() < 0.03:  # 3% записей с невалидными категориями
+        if rng.random() < 0.03:  # 3% записей с невалидными категориями
             record['product_category'] = 'Invalid_Category'
             
         data.append(record)
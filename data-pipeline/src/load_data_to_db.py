@@ -1,60 +1,133 @@
-import psycopg2
 import pandas as pd  # Добавьте этот импорт
-from config import DB_CONFIG
+from psycopg2.extras import execute_values
+from db_pool import get_pg_connection, release_pg_connection
+from chunk_dq import BatchDQReport, DataQualityError, save_batch_report
+from checkpoint import completed_units, mark_unit_done, clear_units
 
-def load_data_to_db(df):
+SOURCE_COLUMNS = [
+    'user_id', 'user_name', 'age', 'salary', 'purchase_amount', 'product_category',
+    'region', 'customer_status', 'transaction_count', 'effective_from', 'effective_to', 'current_flag',
+]
+
+# Вставка чанка одним запросом (bulk=True)
+BULK_INSERT_QUERY = f"""
+    INSERT INTO s_sql_dds.t_sql_source_unstructured ({', '.join(SOURCE_COLUMNS)})
+    VALUES %s
+"""
+
+def source_rows(chunk):
+    # Типы numpy и pandas -> типы psycopg2, NaN и NaT -> NULL, даты -> date
+    convert = {
+        'age': float, 'salary': float, 'purchase_amount': float, 'transaction_count': int,
+        'effective_from': lambda value: value.date(), 'effective_to': lambda value: value.date(),
+        'current_flag': bool,
+    }
+    columns = []
+    for column in SOURCE_COLUMNS:
+        cast = convert.get(column, lambda value: value)
+        columns.append([cast(value) if pd.notna(value) else None for value in chunk[column].tolist()])
+    return list(zip(*columns))
+
+def load_data_to_db(df, chunk_size=500, dq_report=None, run_id=None, append=False, bulk=False):
     #Загрузка данных в неструктурированную таблицу PostgreSQL
+    #Каждый чанк проверяется правилами chunk_dq до вставки; при превышении порогов
+    #загрузка откатывается целиком и DataQualityError передается дальше
+    #С run_id каждый чанк фиксируется вместе с контрольной точкой, и повторный
+    #запуск догружает только недостающие чанки
+    #С append=True строки добавляются к уже загруженным (микро-батчи soak.py);
+    #отчет батча в t_dq_runs не сохраняется, иначе строка писалась бы на каждый батч
+    #С bulk=True чанк вставляется одним запросом; ошибка строки отменяет всю загрузку,
+    #а не пропускает строку (benchmark.py, soak.py)
     
+    report = BatchDQReport() if dq_report is None else dq_report
+    done = {unit: details for unit, details in completed_units(run_id, 'etl').items()
+            if unit.startswith('chunk:')}
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_pg_connection('load')
         cur = conn.cursor()
         
-        # Очистка таблицы перед загрузкой новых данных
-        cur.execute("TRUNCATE TABLE s_sql_dds.t_sql_source_unstructured;")
+        # Очистка таблицы перед загрузкой новых данных (кроме продолжения загрузки)
+        if done:
+            print(f"Продолжение загрузки: {len(done)} чанков уже загружено")
+        elif not append:
+            cur.execute("TRUNCATE TABLE s_sql_dds.t_sql_source_unstructured;")
         
         print("Загрузка данных...")
         
         # Подготовка данных для вставки с обработкой исключений
-        successful_inserts = 0
-        for index, row in df.iterrows():
-            try:
-                # Преобразование NaN в None для PostgreSQL
-                age = row['age'] if pd.notna(row['age']) else None
-                salary = float(row['salary']) if pd.notna(row['salary']) else None
-                purchase_amount = float(row['purchase_amount']) if pd.notna(row['purchase_amount']) else None
-                transaction_count = row['transaction_count'] if pd.notna(row['transaction_count']) else None
-                
-                cur.execute("""
-                    INSERT INTO s_sql_dds.t_sql_source_unstructured 
-                    (user_id, user_name, age, salary, purchase_amount, product_category, 
-                     region, customer_status, transaction_count, effective_from, effective_to, current_flag)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    row['user_id'], 
-                    row['user_name'], 
-                    age, 
-                    salary, 
-                    purchase_amount, 
-                    row['product_category'], 
-                    row['region'],
-                    row['customer_status'], 
-                    transaction_count, 
-                    row['effective_from'],
-                    row['effective_to'], 
-                    row['current_flag']
-                ))
-                successful_inserts += 1
-                
-            except Exception as e:
-                print(f"Ошибка при вставке строки {index}: {e}")
-                print(f"Проблемные данные: {row.to_dict()}")
-                continue  # Продолжаем со следующей строкой
+        successful_inserts = sum(details['rows'] for details in done.values())
+        for start in range(0, len(df), chunk_size):
+            unit = f"chunk:{start}"
+            if unit in done:
+                continue
+            chunk = df.iloc[start:start + chunk_size]
+            report.add_chunk(chunk)
+            chunk_inserts = successful_inserts
+            
+            if bulk:
+                rows = source_rows(chunk)
+                execute_values(cur, BULK_INSERT_QUERY, rows, page_size=len(rows))
+                successful_inserts += len(rows)
+            else:
+                for index, row in chunk.iterrows():
+                    try:
+                        # Преобразование NaN в None для PostgreSQL
+                        age = row['age'] if pd.notna(row['age']) else None
+                        salary = float(row['salary']) if pd.notna(row['salary']) else None
+                        purchase_amount = float(row['purchase_amount']) if pd.notna(row['purchase_amount']) else None
+                        transaction_count = row['transaction_count'] if pd.notna(row['transaction_count']) else None
+                        
+                        cur.execute("""
+                            INSERT INTO s_sql_dds.t_sql_source_unstructured 
+                            (user_id, user_name, age, salary, purchase_amount, product_category, 
+                             region, customer_status, transaction_count, effective_from, effective_to, current_flag)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        """, (
+                            row['user_id'], 
+                            row['user_name'], 
+                            age, 
+                            salary, 
+                            purchase_amount, 
+                            row['product_category'], 
+                            row['region'],
+                            row['customer_status'], 
+                            transaction_count, 
+                            row['effective_from'],
+                            row['effective_to'], 
+                            row['current_flag']
+                        ))
+                        successful_inserts += 1
+                    
+                    except Exception as e:
+                        print(f"Ошибка при вставке строки {index}: {e}")
+                        print(f"Проблемные данные: {row.to_dict()}")
+                        continue  # Продолжаем со следующей строкой
+            
+            if run_id is not None:
+                mark_unit_done(cur, run_id, 'etl', unit, {'rows': successful_inserts - chunk_inserts})
+                conn.commit()
         
         conn.commit()
         print(f"Успешно загружено {successful_inserts} из {len(df)} записей в t_sql_source_unstructured")
+        report.print_summary()
+        if not append:
+            save_batch_report(report)
         
         return successful_inserts
-        
+    
+    except DataQualityError as e:
+        print(f"Проверка качества данных не пройдена: {e}")
+        if 'conn' in locals():
+            conn.rollback()
+            # Уже зафиксированные чанки отбракованного батча тоже удаляются
+            if run_id is not None:
+                cur.execute("TRUNCATE TABLE s_sql_dds.t_sql_source_unstructured;")
+                clear_units(cur, run_id, 'etl')
+                conn.commit()
+        e.report.print_summary()
+        if not append:
+            save_batch_report(e.report)
+        raise
     except Exception as e:
         print(f"Ошибка при загрузке данных: {e}")
         if 'conn' in locals():
@@ -64,4 +137,4 @@ def load_data_to_db(df):
         if 'cur' in locals():
             cur.close()
         if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+            release_pg_connection(conn)
\ No newline at end of file
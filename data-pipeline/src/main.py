@@ -1,42 +1,415 @@
 import sys
-from etl import etl
-from fill_dm_table import fill_dm_table
-from migrate_to_mysql import migrate_to_mysql
+import argparse
+from backends import BACKENDS, backend_function
+from config import PIPELINE_BACKEND
 
-def main():
+# Точка входа пайплайна. Подкоманды запускают отдельные этапы:
+#   python main.py generate --rows=10000 --output=data.csv
+#   python main.py load --input=data.csv
+#   python main.py transform --start-date=2023-01-01 --end-date=2023-06-30
+#   python main.py dm | dq --dq-mode=incremental | migrate --mysql-shards=4 | dashboard --days=30
+#   python main.py all --rows=100000 --workers=2     (то же, что python main.py --rows=100000)
+#   python main.py backfill --start-date=2023-01-01 --end-date=2023-12-31 --window=month --concurrency=4
+# Модули этапов импортируются внутри подкоманд: короткие задачи cron не платят
+# за импорт pandas, NumPy и pymysql, которые им не нужны
+
+COMMANDS = ['generate', 'load', 'transform', 'dm', 'dq', 'migrate', 'dashboard', 'backfill', 'all']
+
+# Окно очистки по умолчанию, как в fn_etl_data_load
+DEFAULT_START_DATE = '2023-01-01'
+DEFAULT_END_DATE = '2023-12-31'
+
+def _csv_list(value):
+    return [item for item in value.split(',') if item]
+
+def _add_window(parser):
+    parser.add_argument('--start-date', help="начало окна дат (effective_from >= start)")
+    parser.add_argument('--end-date', help="конец окна дат (effective_to <= end)")
+
+def _add_backend(parser):
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=PIPELINE_BACKEND,
+                        help="бэкенд исполнения: postgres (PostgreSQL + MySQL) или sqlite (см. sqlite_backend.py)")
+
+def _add_dataset(parser):
+    parser.add_argument('--rows', type=int, default=1000, help="объем синтетических данных")
+    parser.add_argument('--seed', type=int, help="воспроизводимая генерация")
+
+def _add_migration(parser):
+    parser.add_argument('--sink', default='mysql', help="приемник вместо MySQL (см. sinks.SINKS)")
+    parser.add_argument('--mysql-delta', action='store_true',
+                        help="только новые факты по водяному знаку fact_id; без окна, --mysql-swap и --mysql-shards")
+    parser.add_argument('--mysql-swap', action='store_true',
+                        help="загрузка целевой таблицы MySQL через подмену секций вместо DELETE + INSERT")
+    parser.add_argument('--mysql-shards', type=int, default=1, help="параллельная миграция по диапазонам fact_id")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='main.py', description="ETL пайплайн: PostgreSQL -> витрина -> MySQL",
+                                     allow_abbrev=False)
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    
+    generate = subparsers.add_parser('generate', help="сгенерировать синтетические данные в CSV", allow_abbrev=False)
+    _add_dataset(generate)
+    generate.add_argument('--output', help="файл CSV (по умолчанию stdout)")
+    
+    load = subparsers.add_parser('load', help="загрузить данные в t_sql_source_unstructured", allow_abbrev=False)
+    _add_dataset(load)
+    _add_backend(load)
+    load.add_argument('--input', help="файл CSV от generate вместо генерации")
+    load.add_argument('--chunk-size', type=int, default=500)
+    load.add_argument('--append', action='store_true', help="дописать к уже загруженным строкам")
+    
+    transform = subparsers.add_parser('transform', help="очистка в t_sql_source_structured", allow_abbrev=False)
+    _add_window(transform)
+    _add_backend(transform)
+    
+    dm = subparsers.add_parser('dm', help="загрузка справочников и фактов витрины", allow_abbrev=False)
+    _add_window(dm)
+    _add_backend(dm)
+    
+    dq = subparsers.add_parser('dq', help="проверки качества витрины", allow_abbrev=False)
+    _add_window(dq)
+    _add_backend(dq)
+    dq.add_argument('--dq-mode', default='per_check', help="см. run_data_quality_checks.DQ_FUNCTIONS")
+    
+    migrate = subparsers.add_parser('migrate', help="перенос витрины в MySQL или другой приемник", allow_abbrev=False)
+    _add_window(migrate)
+    _add_backend(migrate)
+    _add_migration(migrate)
+    
+    dashboard = subparsers.add_parser('dashboard', help="текстовый дашборд качества данных", allow_abbrev=False)
+    dashboard.add_argument('--days', type=int, default=7)
+    
+    backfill = subparsers.add_parser('backfill', help="перезагрузка диапазона дат окнами (см. backfill.py)",
+                                     allow_abbrev=False)
+    backfill.add_argument('--start-date', required=True, help="начало диапазона (effective_from)")
+    backfill.add_argument('--end-date', required=True, help="конец диапазона (effective_from)")
+    backfill.add_argument('--window', default='month', help="размер окна: month или число дней")
+    backfill.add_argument('--concurrency', type=int, default=2, help="число окон, обрабатываемых одновременно")
+    backfill.add_argument('--retries', type=int, default=3, help="попыток на шаг окна")
+    backfill.add_argument('--skip', type=_csv_list, action='append', default=[],
+                          help="пропустить шаги окна: transform, dm, dq, migrate")
+    backfill.add_argument('--dq-mode', default='per_check', choices=['per_check', 'single_pass'])
+    backfill.add_argument('--resume', action='store_true',
+                          help="продолжить прерванный бэкфилл с теми же параметрами вместо нового")
+    # Окна по effective_from есть только в SQL-функциях PostgreSQL
+    backfill.set_defaults(backend='postgres')
+    
+    pipeline = subparsers.add_parser('all', help="весь пайплайн графом этапов (по умолчанию)", allow_abbrev=False)
+    _add_dataset(pipeline)
+    _add_window(pipeline)
+    _add_backend(pipeline)
+    _add_migration(pipeline)
+    pipeline.add_argument('--only', type=_csv_list, action='append', default=[], help="запустить только эти этапы")
+    pipeline.add_argument('--skip', type=_csv_list, action='append', default=[],
+                          help="пропустить этапы (и зависящие от них)")
+    pipeline.add_argument('--with', dest='include', type=_csv_list, action='append', default=[],
+                          help="добавить этапы, выключенные по умолчанию (profile, verify)")
+    pipeline.add_argument('--workers', type=int, default=4, help="число одновременно выполняемых этапов")
+    pipeline.add_argument('--dq-mode', default='per_check', help="см. run_data_quality_checks.DQ_FUNCTIONS")
+    pipeline.add_argument('--resume', action='store_true',
+                          help="продолжить прерванный запуск с теми же параметрами вместо нового")
+    pipeline.add_argument('--explain', action='store_true',
+                          help="сохранить планы тяжелых запросов и сравнить с прошлым запуском (см. plan_capture.py)")
+    pipeline.add_argument('--profile-memory', nargs='?', const='tracemalloc', choices=['tracemalloc', 'rss'],
+                          help="отчет по памяти этапов (см. memory_profile.py); rss - без замедления от tracemalloc")
+    pipeline.add_argument('--soak', action='store_true',
+                          help="длительная нагрузка микро-батчами вместо одного запуска (см. soak.py)")
+    pipeline.add_argument('--rate', type=lambda value: [int(rate) for rate in _csv_list(value)], default=[1000],
+                          help="строк/с по ступеням нагрузки --soak")
+    pipeline.add_argument('--duration', type=float, default=60, help="секунд на ступень --soak")
+    pipeline.add_argument('--batch-interval', type=float, default=1.0)
+    pipeline.add_argument('--report-interval', type=float, default=10.0)
+    # Старые флаги сохранены как псевдонимы
+    pipeline.add_argument('--skip-mysql', action='store_true',
+                          help="= --skip=migrate для приемника mysql; другой --sink выполняется, без сверки с MySQL")
+    pipeline.add_argument('--verify-mysql', action='store_true', help="= --with=verify")
+    pipeline.add_argument('--profile', action='store_true', help="= --with=profile")
+    return parser
+
+# Флаги миграции и их значения по умолчанию: бэкенд sqlite переносит витрину
+# в свою базу dwh и эти флаги не поддерживает
+MIGRATION_DEFAULTS = {'sink': 'mysql', 'mysql_delta': False, 'mysql_swap': False, 'mysql_shards': 1}
+
+def parse_args(argv):
+    # Без подкоманды выполняется весь пайплайн: python main.py --skip-mysql
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['all'] + list(argv)
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'backend', None) == 'sqlite':
+        ignored = [f"--{name.replace('_', '-')}" for name, default in MIGRATION_DEFAULTS.items()
+                   if getattr(args, name, default) != default]
+        if ignored:
+            parser.error(f"{args.command}: {', '.join(ignored)} not supported with --backend=sqlite "
+                         f"(the sqlite backend migrates into its own dwh database)")
+    if getattr(args, 'mysql_delta', False):
+        # Дельта переносит все факты выше водяного знака: окно, загрузка подменой секций
+        # и шарды к ней не применяются
+        conflicting = [flag for flag, value in (('--start-date', getattr(args, 'start_date', None)),
+                                                ('--end-date', getattr(args, 'end_date', None)),
+                                                ('--mysql-swap', args.mysql_swap),
+                                                ('--mysql-shards', args.mysql_shards != 1)) if value]
+        if conflicting:
+            parser.error(f"{args.command}: --mysql-delta cannot be combined with {', '.join(conflicting)} "
+                         f"(delta migration ships every fact above the fact_id watermark)")
+    return args
+
+def parse_options(argv):
+    """
+    Параметры полного пайплайна (подкоманда all) в виде словаря для build_stages
+    """
+    args = parse_args(argv)
+    # --skip-mysql относится только к MySQL: выгрузка в другой приемник выполняется,
+    # пропускается лишь сверка с MySQL
+    skip_mysql = (['migrate'] if args.sink == 'mysql' else ['verify']) if args.skip_mysql else []
+    options = {
+        'only': sum(args.only, []),
+        'skip': sum(args.skip, []) + skip_mysql,
+        'include': sum(args.include, []) + (['verify'] if args.verify_mysql else [])
+                   + (['profile'] if args.profile else []),
+        'workers': args.workers,
+        'dq_mode': args.dq_mode,
+        'mysql_delta': args.mysql_delta,
+        'load_strategy': 'swap' if args.mysql_swap else 'delete_insert',
+        'mysql_shards': args.mysql_shards,
+        'sink': args.sink,
+        'rows': args.rows,
+        'seed': args.seed,
+        'start_date': args.start_date,
+        'end_date': args.end_date,
+        'resume': args.resume,
+        'explain': args.explain,
+        'profile_memory': args.profile_memory,
+        'backend': args.backend,
+        'soak': args.soak,
+        'rates': args.rate,
+        'duration': args.duration,
+        'batch_interval': args.batch_interval,
+        'report_interval': args.report_interval,
+    }
+    
+    if options['soak'] and options['backend'] != 'postgres':
+        raise ValueError("--soak requires the postgres backend (incremental SQL functions)")
+    if options['backend'] == 'sqlite':
+        # Контрольные точки, планы запросов, профилирование колонок и сверка работают только с PostgreSQL
+        if options['explain'] or {'profile', 'verify'} & set(options['include']):
+            raise ValueError("--explain, profile and verify stages require the postgres backend")
+    
+    return options
+
+def run_params(options):
+    """
+    Параметры, определяющие данные запуска: по ним находится прерванный запуск для продолжения
     """
-    Основная функция запуска всего пайплайна
+    keys = ('rows', 'seed', 'sink', 'mysql_delta', 'load_strategy', 'mysql_shards', 'start_date', 'end_date')
+    return {key: options.get(key) for key in keys}
+
+def run_migration(options, start_dt=None, end_dt=None, run_id=None):
+    """
+    Перенос витрины в приемник по параметрам миграции
+    """
+    backend = options.get('backend', 'postgres')
+    if backend != 'postgres':
+        # Встроенный бэкенд переносит витрину в свою базу dwh вместо MySQL
+        return backend_function(backend, 'migrate')(start_dt, end_dt)
+    from sinks import run_sink
+    # --sink=NAME выгружает v_dm_task в другой приемник вместо MySQL (см. sinks.SINKS)
+    if options['sink'] != 'mysql':
+        print(f"Exporting data to {options['sink']} sink...")
+        return run_sink(options['sink'], start_dt, end_dt)
+    return run_sink('mysql', start_dt, end_dt, delta=options['mysql_delta'], shards=options['mysql_shards'],
+                    load_strategy=options['load_strategy'], run_id=run_id)
+
+def build_stages(options, run_id=None):
     """
+    Граф этапов пайплайна: после загрузки DWH проверки качества,
+    профилирование и миграция выполняются параллельно.
+    С run_id этапы, выполненные в прерванном запуске, пропускаются
+    """
+    from scheduler import stage
+    from metrics import traced
+    
+    backend = options.get('backend', 'postgres')
+    start_dt = options.get('start_date')
+    end_dt = options.get('end_date')
+    
+    def etl():
+        backend_function(backend, 'etl')(rows=options['rows'], seed=options['seed'], run_id=run_id,
+                                         start_date=start_dt or DEFAULT_START_DATE,
+                                         end_date=end_dt or DEFAULT_END_DATE)
+    
+    def profile():
+        from column_profiling import profile_batch, detect_drift, PROFILED_TABLES
+        # Профилируется только окно этой загрузки, а не вся история
+        profile_batch(start_dt or DEFAULT_START_DATE, end_dt or DEFAULT_END_DATE)
+        for table in PROFILED_TABLES:
+            detect_drift(table)
+    
+    def verify():
+        # Сверка MySQL с PostgreSQL по контрольным суммам в окне миграции
+        from verify_mysql_migration import verify_mysql_migration
+        verify_mysql_migration(start_dt, end_dt)
+    
+    stages = [
+        stage('etl', etl),
+        stage('dm_load', lambda: backend_function(backend, 'fill_dm_table')(start_dt, end_dt), depends_on=['etl']),
+        stage('dq', lambda: backend_function(backend, 'run_data_quality_checks')(start_dt, end_dt,
+                                                                                mode=options['dq_mode']),
+              depends_on=['dm_load']),
+        stage('profile', profile, depends_on=['dm_load'], default=False),
+        # Ошибка миграции не останавливает пайплайн
+        stage('migrate', lambda: run_migration(options, start_dt, end_dt, run_id), depends_on=['dm_load'],
+              critical=False),
+        stage('verify', verify, depends_on=['migrate'], critical=False, default=False),
+    ]
+    for item in stages:
+        if options.get('profile_memory'):
+            from memory_profile import profiled
+            item['func'] = profiled(item['name'], item['func'])
+        if run_id is not None:
+            from checkpoint import checkpointed_stage
+            item['func'] = checkpointed_stage(run_id, item['name'], item['func'])
+        # Спан этапа: шаги внутри этапа пишутся его дочерними спанами (см. metrics.py)
+        item['func'] = traced(item['name'], item['func'])
+    return {item['name']: item for item in stages}
+
+def run_pipeline(options):
+    """
+    Весь пайплайн графом этапов (или нагрузка микро-батчами с --soak)
+    """
+    if options['soak']:
+        from soak import run_soak
+        run_soak(
+            options['rates'],
+            duration=options['duration'],
+            batch_interval=options['batch_interval'],
+            report_interval=options['report_interval'],
+            skip_migrate='migrate' in options['skip'],
+            seed=options['seed'],
+        )
+        return
+    
+    from scheduler import run_stages
+    
+    run_id = None
     try:
-        # Проверяем наличие флага --skip-mysql в аргументах командной строки
-        skip_mysql = '--skip-mysql' in sys.argv
-        
         print("=== Starting Complete Data Pipeline ===")
         
-        # Шаг 1: ETL процесс (из первой лабы)
-        print("\n1. Running ETL process...")
-        etl()
+        if options['backend'] == 'postgres':
+            from checkpoint import start_pipeline_run
+            # Новый запуск или, с --resume, продолжение прерванного с теми же параметрами
+            run_id, params = start_pipeline_run(run_params(options), resume=options['resume'])
+            options['seed'] = params['seed']
+        else:
+            # SQLite допускает одного писателя: этапы выполняются последовательно
+            options['workers'] = 1
         
-        # Шаг 2: Заполнение DWH в PostgreSQL
-        print("\n2. Loading data to PostgreSQL DWH...")
-        fill_dm_table()
+        if options['explain']:
+            from plan_capture import enable_plan_capture
+            enable_plan_capture(run_id)
+        if options['profile_memory']:
+            from memory_profile import start_memory_profiling
+            # Память общая для процесса: параллельные этапы смешали бы выделения
+            if options['profile_memory'] == 'tracemalloc':
+                start_memory_profiling()
+            options['workers'] = 1
         
-        # Шаг 3: Миграция в MySQL (с обработкой ошибок)
-        if not skip_mysql:
-            print("\n3. Migrating data to MySQL DWH...")
-            try:
-                migrate_to_mysql()
-            except Exception as e:
-                print(f"Warning: MySQL migration failed - {e}")
-                print("Continuing pipeline without MySQL migration...")
-        else:
-            print("\n3. Skipping MySQL migration (--skip-mysql flag set)")
+        statuses = run_stages(
+            build_stages(options, run_id),
+            only=options['only'],
+            skip=options['skip'],
+            include=options['include'],
+            max_workers=options['workers'],
+        )
         
-        print("\n=== Complete Pipeline finished successfully ===")
+        # Запуск с предупреждениями (например, неудачной миграцией) остается незавершенным
+        completed = all(status in ('success', 'skipped') for status in statuses.values())
+        if run_id is not None:
+            from checkpoint import finish_pipeline_run
+            finish_pipeline_run(run_id, 'success' if completed else 'partial')
         
+        print("\n=== Complete Pipeline finished successfully ===")
+    
     except Exception as e:
         print(f"Pipeline failed: {e}")
+        if run_id is not None:
+            from checkpoint import finish_pipeline_run
+            finish_pipeline_run(run_id, 'failed')
         raise
+    finally:
+        if options.get('profile_memory'):
+            from memory_profile import write_memory_report
+            write_memory_report()
+
+def run_command(args):
+    """
+    Выполняет одну подкоманду, кроме all
+    """
+    if args.command == 'generate':
+        from get_dataset import get_dataset
+        df = get_dataset(rows=args.rows, seed=args.seed)
+        df.to_csv(args.output or sys.stdout, index=False)
+        if args.output:
+            print(f"Сгенерировано {len(df)} записей в {args.output}")
+        return len(df)
+    
+    if args.command == 'load':
+        backend_function(args.backend, 'init_database')()
+        if args.input:
+            import pandas as pd
+            df = pd.read_csv(args.input, parse_dates=['effective_from', 'effective_to'])
+        else:
+            from get_dataset import get_dataset
+            df = get_dataset(rows=args.rows, seed=args.seed)
+        return backend_function(args.backend, 'load_data_to_db')(df, chunk_size=args.chunk_size, append=args.append)
+    
+    if args.command == 'transform':
+        return backend_function(args.backend, 'fill_structured_table')(args.start_date or DEFAULT_START_DATE,
+                                                                       args.end_date or DEFAULT_END_DATE)
+    
+    if args.command == 'dm':
+        return backend_function(args.backend, 'fill_dm_table')(args.start_date, args.end_date)
+    
+    if args.command == 'dq':
+        return backend_function(args.backend, 'run_data_quality_checks')(args.start_date, args.end_date,
+                                                                         mode=args.dq_mode)
+    
+    if args.command == 'migrate':
+        options = {
+            'backend': args.backend,
+            'sink': args.sink,
+            'mysql_delta': args.mysql_delta,
+            'load_strategy': 'swap' if args.mysql_swap else 'delete_insert',
+            'mysql_shards': args.mysql_shards,
+        }
+        return run_migration(options, args.start_date, args.end_date)
+    
+    if args.command == 'dashboard':
+        from dq_dashboard import generate_dq_dashboard
+        return generate_dq_dashboard(days_back=args.days)
+    
+    if args.command == 'backfill':
+        from backfill import run_backfill
+        return run_backfill(args.start_date, args.end_date, window=args.window, concurrency=args.concurrency,
+                            retries=args.retries, skip=sum(args.skip, []), dq_mode=args.dq_mode,
+                            resume=args.resume)
+
+def main(argv=None):
+    """
+    Основная функция запуска: подкоманда или весь пайплайн
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    backend = getattr(args, 'backend', None)
+    try:
+        if args.command == 'all':
+            run_pipeline(parse_options(argv))
+        else:
+            run_command(args)
+    finally:
+        # Подключения общего пула переиспользовались всеми этапами
+        if backend is not None:
+            backend_function(backend, 'close_all')()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,188 @@
+import os
+import time
+import linecache
+import threading
+import tracemalloc
+from datetime import datetime
+from config import METRICS_DIR
+from metrics import RssSampler
+
+# Профилирование памяти этапов (main.py --profile-memory): tracemalloc и замер RSS
+# вокруг каждого этапа, места выделения памяти на пике этапа и остаток после него.
+# tracemalloc замедляет код с большим числом мелких выделений (iterrows) в несколько раз,
+# поэтому --profile-memory=rss оставляет только замер RSS. Память учитывается по всему
+# процессу, поэтому в этом режиме этапы выполняются последовательно.
+# Отчет - METRICS_DIR/memory_profile_<время>.txt
+
+TOP_SITES = 10
+SAMPLE_INTERVAL = 0.1
+SNAPSHOT_GROWTH = 1.5
+
+# Служебные выделения самого профилировщика (и его потоков) и импорта не показываются
+EXCLUDED_FILES = {
+    tracemalloc.__file__,
+    threading.__file__,
+    '<frozen importlib._bootstrap>',
+    '<frozen importlib._bootstrap_external>',
+    '<unknown>',
+}
+
+_reports = []
+_samplers = []
+_lock = threading.Lock()
+
+class PeakSnapshotSampler(threading.Thread):
+    """
+    Снимает snapshot tracemalloc, когда объем отслеживаемой памяти достигает нового максимума:
+    итоговый снимок показывает, чем была занята память в пике этапа
+    """
+    
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_traced = 0
+        self.snapshot = None
+        self._stopped = threading.Event()
+        self._sample_lock = threading.Lock()
+    
+    def sample(self):
+        # Опрос идет и из потока сэмплера, и из mark_peak() в потоке этапа
+        with self._sample_lock:
+            current, _ = tracemalloc.get_traced_memory()
+            # Снимок дорогой (пропорционален числу выделений), поэтому новый берется только
+            # при росте в SNAPSHOT_GROWTH раз: снимков логарифмически мало, а последний
+            # показывает не меньше 1/SNAPSHOT_GROWTH пиковой памяти
+            if self.snapshot is None or current > self.peak_traced * SNAPSHOT_GROWTH:
+                self.peak_traced = current
+                self.snapshot = tracemalloc.take_snapshot()
+    
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+    
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        # Память могла вырасти после последнего опроса
+        self.sample()
+        return self.snapshot
+
+def mark_peak():
+    """
+    Опрашивает сэмплеры выполняющихся этапов сразу: память, освобожденная быстрее
+    SAMPLE_INTERVAL, иначе не попала бы в снимок пика
+    """
+    with _lock:
+        samplers = list(_samplers)
+    for sampler in samplers:
+        sampler.sample()
+
+def start_memory_profiling(frames=1):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+def top_sites(snapshot, baseline, limit=TOP_SITES):
+    """
+    Места выделения, больше всего выросшие относительно начала этапа
+    """
+    # Фильтрация уже сгруппированной статистики: Snapshot.filter_traces на сотнях тысяч
+    # выделений в разы медленнее
+    sites = []
+    for stat in snapshot.compare_to(baseline, 'lineno'):
+        if len(sites) == limit:
+            break
+        # compare_to сортирует по модулю разницы: освобожденная память пропускается
+        frame = stat.traceback[0]
+        if stat.size_diff <= 0 or frame.filename in EXCLUDED_FILES:
+            continue
+        sites.append({
+            'site': f"{os.path.basename(frame.filename)}:{frame.lineno}",
+            'line': linecache.getline(frame.filename, frame.lineno).strip(),
+            'size_bytes': stat.size_diff,
+            'blocks': stat.count_diff,
+        })
+    return sites
+
+def profiled(name, func):
+    """
+    Оборачивает функцию этапа замером памяти
+    """
+    def run():
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            baseline = tracemalloc.take_snapshot()
+            start_traced, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            sampler = PeakSnapshotSampler()
+            sampler.start()
+            with _lock:
+                _samplers.append(sampler)
+        rss = RssSampler()
+        rss.start()
+        started = time.perf_counter()
+        status = 'success'
+        try:
+            return func()
+        except Exception:
+            status = 'failed'
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            report = {
+                'stage': name,
+                'status': status,
+                'duration_s': duration,
+                'peak_traced_bytes': None,
+                'retained_bytes': None,
+                'rss_growth_bytes': rss.stop(),
+                'peak_rss_bytes': rss.peak_rss,
+                'top_sites': [],
+            }
+            if tracing:
+                with _lock:
+                    _samplers.remove(sampler)
+                snapshot = sampler.stop()
+                end_traced, peak_traced = tracemalloc.get_traced_memory()
+                report['peak_traced_bytes'] = peak_traced - start_traced
+                report['retained_bytes'] = end_traced - start_traced
+                report['top_sites'] = top_sites(snapshot, baseline)
+            with _lock:
+                _reports.append(report)
+            print(f"[{name}] memory: peak {_mib(report['peak_traced_bytes'])}, "
+                  f"retained {_mib(report['retained_bytes'])}, RSS growth {_mib(report['rss_growth_bytes'])}")
+    return run
+
+def _mib(value):
+    return '-' if value is None else f"{value / 1024 / 1024:.1f} MiB"
+
+def format_report(reports):
+    lines = [f"Memory profile {datetime.now():%Y-%m-%d %H:%M:%S}", ""]
+    for report in reports:
+        lines.append(f"Stage {report['stage']} ({report['status']}, {report['duration_s']:.1f}s)")
+        lines.append(f"  peak traced:  {_mib(report['peak_traced_bytes'])}")
+        lines.append(f"  retained:     {_mib(report['retained_bytes'])}")
+        lines.append(f"  RSS growth:   {_mib(report['rss_growth_bytes'])} (peak RSS {_mib(report['peak_rss_bytes'])})")
+        if report['peak_traced_bytes'] is not None:
+            lines.append("  top allocation sites at peak:")
+            for site in report['top_sites']:
+                lines.append(f"    {_mib(site['size_bytes']):>12} {site['blocks']:>9} blocks  {site['site']}  {site['line']}")
+            if not report['top_sites']:
+                lines.append("    (none)")
+        lines.append("")
+    return lines
+
+def write_memory_report(path=None):
+    """
+    Записывает отчет по всем профилированным этапам и возвращает путь к файлу
+    """
+    with _lock:
+        reports = list(_reports)
+    if not reports:
+        return None
+    if path is None:
+        os.makedirs(METRICS_DIR or '.', exist_ok=True)
+        path = os.path.join(METRICS_DIR or '.', f"memory_profile_{datetime.now():%Y%m%d_%H%M%S}.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(format_report(reports)))
+    print(f"Memory profile saved to {path}")
+    return path
\ No newline at end of file
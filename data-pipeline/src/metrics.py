@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from config import METRICS_DIR
+
+try:
+    import resource
+except ImportError:
+    # Нет на Windows: пиковый RSS не пишется
+    resource = None
+
+# Спаны этапов пайплайна: длительность, строки, строки/с, байты и пиковый RSS.
+# Каждый завершенный спан пишется строкой в METRICS_DIR/spans.jsonl,
+# последние значения по каждому спану - в Prometheus textfile для node_exporter
+
+JSONL_FILE = 'spans.jsonl'
+PROM_FILE = 'etl_pipeline.prom'
+
+_lock = threading.Lock()
+_local = threading.local()
+_latest = {}
+TRACE_ID = uuid.uuid4().hex
+
+class Span:
+    """
+    Открытый спан: строки и байты задаются через set() по ходу работы
+    """
+    
+    def __init__(self, name, parent=None, attrs=None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = dict(attrs or {})
+        self.rows = None
+        self.bytes = None
+        self.started = time.time()
+        self._started_perf = time.perf_counter()
+    
+    def set(self, rows=None, bytes=None, **attrs):
+        if rows is not None:
+            self.rows = int(rows)
+        if bytes is not None:
+            self.bytes = int(bytes)
+        self.attrs.update(attrs)
+        return self
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    # ru_maxrss в килобайтах на Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def current_rss_bytes():
+    """
+    Текущий RSS процесса (Linux); None, если /proc недоступен
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class RssSampler(threading.Thread):
+    """
+    Фоновый замер пикового RSS во время этапа (benchmark.py, memory_profile.py)
+    """
+    
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.start_rss = current_rss_bytes()
+        self.peak_rss = self.start_rss
+        self._stopped = threading.Event()
+    
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            rss = current_rss_bytes()
+            if rss is not None and rss > self.peak_rss:
+                self.peak_rss = rss
+    
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        if self.start_rss is None:
+            return None
+        return self.peak_rss - self.start_rss
+
+def _record(name, duration_s, rows=None, bytes_moved=None, status='ok', span_id=None,
+            parent_id=None, started=None, attrs=None):
+    record = {
+        'trace_id': TRACE_ID,
+        'span_id': span_id or uuid.uuid4().hex[:16],
+        'parent_id': parent_id,
+        'name': name,
+        'start': started if started is not None else time.time() - duration_s,
+        'duration_s': round(duration_s, 6),
+        'rows': rows,
+        'rows_per_s': round(rows / duration_s, 3) if rows is not None and duration_s > 0 else None,
+        'bytes': bytes_moved,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'status': status,
+        'attrs': attrs or {},
+    }
+    with _lock:
+        _latest[name] = record
+        if METRICS_DIR:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            with open(os.path.join(METRICS_DIR, JSONL_FILE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+            write_prometheus_textfile(os.path.join(METRICS_DIR, PROM_FILE))
+    return record
+
+def current_span():
+    """
+    Открытый спан текущего потока (None вне спанов)
+    """
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+@contextmanager
+def span(name, parent=None, **attrs):
+    """
+    Измеряет блок кода. Вложенные спаны одного потока получают parent_id.
+    Стек спанов у каждого потока свой, поэтому рабочий поток получает
+    родителя явно: span(..., parent=current_span() вызывающего потока)
+    """
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    current = Span(name, parent or (stack[-1] if stack else None), attrs)
+    stack.append(current)
+    status = 'ok'
+    try:
+        yield current
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        stack.pop()
+        _record(
+            name, time.perf_counter() - current._started_perf, current.rows, current.bytes, status,
+            current.span_id, current.parent_id, current.started, current.attrs
+        )
+
+def record_span(name, duration_s, rows=None, bytes_moved=None, **attrs):
+    """
+    Записывает уже измеренный шаг (например, шаг SQL-функции) как дочерний спан текущего
+    """
+    stack = getattr(_local, 'stack', None)
+    parent_id = stack[-1].span_id if stack else None
+    return _record(name, duration_s, rows, bytes_moved, parent_id=parent_id, attrs=attrs)
+
+def traced(name, func):
+    """
+    Оборачивает функцию этапа спаном с именем этапа
+    """
+    def run():
+        with span(name):
+            return func()
+    return run
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_lines(records):
+    """
+    Метрики в текстовом формате Prometheus по последнему значению каждого спана
+    """
+    gauges = [
+        ('etl_span_duration_seconds', 'Duration of the last run of a pipeline span', 'duration_s'),
+        ('etl_span_rows', 'Rows processed by the last run of a pipeline span', 'rows'),
+        ('etl_span_rows_per_second', 'Throughput of the last run of a pipeline span', 'rows_per_s'),
+        ('etl_span_bytes', 'Bytes moved by the last run of a pipeline span', 'bytes'),
+        ('etl_span_peak_rss_bytes', 'Process peak RSS at the end of a pipeline span', 'peak_rss_bytes'),
+    ]
+    lines = []
+    for metric, help_text, field in gauges:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for name in sorted(records):
+            value = records[name][field]
+            if value is not None:
+                lines.append(f'{metric}{{span="{_label(name)}"}} {value}')
+    lines.append("# HELP etl_span_success Whether the last run of a pipeline span succeeded")
+    lines.append("# TYPE etl_span_success gauge")
+    for name in sorted(records):
+        lines.append(f'etl_span_success{{span="{_label(name)}"}} {int(records[name]["status"] == "ok")}')
+    lines.append("# HELP etl_span_last_end_timestamp_seconds End time of the last run of a pipeline span")
+    lines.append("# TYPE etl_span_last_end_timestamp_seconds gauge")
+    for name in sorted(records):
+        record = records[name]
+        lines.append(f'etl_span_last_end_timestamp_seconds{{span="{_label(name)}"}} '
+                     f'{round(record["start"] + record["duration_s"], 3)}')
+    return lines
+
+def write_prometheus_textfile(path):
+    # Запись через временный файл: node_exporter не должен увидеть файл наполовину
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(prometheus_lines(_latest)) + '\n')
+    os.replace(tmp_path, path)
\ No newline at end of file
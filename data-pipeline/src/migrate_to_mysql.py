@@ -1,76 +1,214 @@
-import psycopg2
-import pymysql
-from config import PG_CONFIG, MYSQL_CONFIG
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from db_pool import (
+    connect_mysql, get_pg_connection, release_pg_connection,
+    get_mysql_connection, release_mysql_connection
+)
+from checkpoint import completed_units, mark_unit_done, clear_units
+from metrics import span, current_span
+from plan_capture import capture_plans
+from config import PG_POOL_MAX
 
-def migrate_to_mysql(start_dt=None, end_dt=None):
+# Общие части запросов миграции
+SELECT_FACTS_QUERY = """
+    SELECT fact_id, customer_id, product_id, region_id, status_id,
+           age, salary, purchase_amount, transaction_count,
+           effective_from, effective_to, current_flag, created_dt
+    FROM s_sql_dds.v_dm_task
+    WHERE (%s IS NULL OR effective_from >= %s)
+      AND (%s IS NULL OR effective_to <= %s)
+"""
+
+# Окно бэкфилла: факты по effective_from, каждый попадает ровно в одно окно
+SELECT_WINDOW_FACTS_QUERY = """
+    SELECT fact_id, customer_id, product_id, region_id, status_id,
+           age, salary, purchase_amount, transaction_count,
+           effective_from, effective_to, current_flag, created_dt
+    FROM s_sql_dds.v_dm_task
+    WHERE effective_from BETWEEN %s AND %s
+"""
+
+INSERT_STG_QUERY = """
+    INSERT INTO t_dm_stg_task 
+    (fact_id, customer_id, product_id, region_id, status_id,
+     age, salary, purchase_amount, transaction_count,
+     effective_from, effective_to, current_flag, created_dt)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+UPSERT_TARGET_QUERY = """
+    INSERT INTO t_dm_task 
+    (fact_id, customer_id, product_id, region_id, status_id,
+     age, salary, purchase_amount, transaction_count,
+     effective_from, effective_to, current_flag, created_dt)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        customer_id = VALUES(customer_id),
+        product_id = VALUES(product_id),
+        region_id = VALUES(region_id),
+        status_id = VALUES(status_id),
+        age = VALUES(age),
+        salary = VALUES(salary),
+        purchase_amount = VALUES(purchase_amount),
+        transaction_count = VALUES(transaction_count),
+        effective_from = VALUES(effective_from),
+        effective_to = VALUES(effective_to),
+        current_flag = VALUES(current_flag),
+        created_dt = VALUES(created_dt)
+"""
+
+# Отпечаток содержимого окна v_dm_task: staging или шарды, загруженные прерванным
+# запуском, переиспользуются только если данные окна с тех пор не менялись
+FINGERPRINT_QUERY = """
+    SELECT COUNT(*), COALESCE(SUM(hashtextextended(v::TEXT, 0)), 0)
+    FROM s_sql_dds.v_dm_task v
+    WHERE (%s IS NULL OR effective_from >= %s)
+      AND (%s IS NULL OR effective_to <= %s)
+"""
+
+# PRIMARY KEY t_dm_task в MySQL - (fact_id, effective_from): ключ секционирования входит
+# в каждый уникальный индекс секционированной таблицы, поэтому UNIQUE (fact_id) невозможен.
+# ON DUPLICATE KEY UPDATE заменяет факт только с прежним effective_from, версия факта
+# с другим effective_from удаляется перед upsert (см. upsert_target_rows)
+DELETE_MOVED_FACTS_QUERY = """
+    DELETE FROM t_dm_task
+    WHERE fact_id IN ({ids})
+      AND (fact_id, effective_from) NOT IN ({keys})
+"""
+
+# Таблица водяных знаков дельта-миграции (см. sql/dm/s_sql_dm/table/t_dm_migration_watermark.sql)
+WATERMARK_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS t_dm_migration_watermark (
+        target_table VARCHAR(64) PRIMARY KEY,
+        last_fact_id BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+# Стратегии переноса staging -> t_dm_task:
+#   delete_insert - DELETE окна и INSERT из staging (исходная процедура)
+#   swap          - сборка секций в теневой таблице и EXCHANGE PARTITION / RENAME TABLE
+LOAD_PROCEDURES = {
+    'delete_insert': 'fn_dm_data_stg_to_dm_load',
+    'swap': 'fn_dm_data_stg_to_dm_swap_load',
+}
+
+# Размер пачки при потоковом чтении шарда из PostgreSQL
+SHARD_BATCH_SIZE = 10000
+
+def window_fingerprint(pg_cursor, start_dt=None, end_dt=None):
+    """
+    Отпечаток окна миграции: [число строк, сумма хешей строк]
+    """
+    pg_cursor.execute(FINGERPRINT_QUERY, (start_dt, start_dt, end_dt, end_dt))
+    return [str(value) for value in pg_cursor.fetchone()]
+
+def migrate_to_mysql(start_dt=None, end_dt=None, load_strategy='delete_insert', run_id=None):
     
     # Мигрирует данные из PostgreSQL в MySQL используя pymysql
+    # С run_id загруженный staging не копируется повторно при продолжении запуска,
+    # если данные окна с тех пор не изменились
     
     pg_conn = None
     mysql_conn = None
     
     try:
+        units = completed_units(run_id, 'migrate')
+        
         # Подключение к PostgreSQL
         print("Connecting to PostgreSQL...")
-        pg_conn = psycopg2.connect(**PG_CONFIG)
+        pg_conn = get_pg_connection('migrate')
         pg_cursor = pg_conn.cursor()
+        fingerprint = window_fingerprint(pg_cursor, start_dt, end_dt) if run_id is not None else None
         
-        # Подключение к MySQL через pymysql
-        print("Connecting to MySQL...")
-        mysql_conn = pymysql.connect(
-            host=MYSQL_CONFIG['host'],
-            port=MYSQL_CONFIG['port'],
-            user=MYSQL_CONFIG['user'],
-            password=MYSQL_CONFIG['password'],
-            database=MYSQL_CONFIG['database'],
-            charset='utf8mb4'
-        )
-        mysql_cursor = mysql_conn.cursor()
+        if 'staging' in units and (units['staging'] or {}).get('fingerprint') == fingerprint:
+            print("MySQL staging table already loaded in this run")
+            mysql_conn = get_mysql_connection('migrate')
+        else:
+            if 'staging' in units:
+                print("Source data changed since staging was loaded, reloading staging")
+            
+            # Подключение к MySQL через pymysql
+            print("Connecting to MySQL...")
+            mysql_conn = get_mysql_connection('migrate')
+            mysql_cursor = mysql_conn.cursor()
+            
+            # Выборка данных из представления PostgreSQL
+            print("Fetching data from PostgreSQL DWH...")
+            with capture_plans(pg_conn, 'migrate', start_dt, end_dt):
+                pg_cursor.execute(SELECT_FACTS_QUERY, (start_dt, start_dt, end_dt, end_dt))
+                data = pg_cursor.fetchall()
+            
+            print(f"Fetched {len(data)} records from PostgreSQL DWH")
+            
+            if len(data) == 0:
+                print("No data to migrate!")
+                return
+            
+            with span('migrate.staging') as current:
+                current.set(rows=len(data))
+                
+                # Очистка staging таблицы в MySQL
+                print("Cleaning MySQL staging table...")
+                mysql_cursor.execute("DELETE FROM t_dm_stg_task")
+                
+                # Вставка данных в MySQL staging таблицу
+                print("Inserting data into MySQL staging table...")
+                mysql_cursor.executemany(INSERT_STG_QUERY, data)
+                mysql_conn.commit()
+            
+            print(f"Inserted {mysql_cursor.rowcount} records into MySQL staging table")
+            if run_id is not None:
+                # Отметка на уже взятом подключении: второе подключение из пула не нужно
+                mark_unit_done(pg_cursor, run_id, 'migrate', 'staging', {'fingerprint': fingerprint})
+                pg_conn.commit()
         
-        # Выборка данных из представления PostgreSQL
-        print("Fetching data from PostgreSQL DWH...")
-        query = """
-            SELECT fact_id, customer_id, product_id, region_id, status_id,
-                   age, salary, purchase_amount, transaction_count,
-                   effective_from, effective_to, current_flag, created_dt
-            FROM s_sql_dds.v_dm_task
-            WHERE (%s IS NULL OR effective_from >= %s)
-              AND (%s IS NULL OR effective_to <= %s)
-        """
-        
-        pg_cursor.execute(query, (start_dt, start_dt, end_dt, end_dt))
-        data = pg_cursor.fetchall()
-        
-        print(f"Fetched {len(data)} records from PostgreSQL DWH")
-        
-        if len(data) == 0:
-            print("No data to migrate!")
-            return
-        
-        # Очистка staging таблицы в MySQL
-        print("Cleaning MySQL staging table...")
-        mysql_cursor.execute("DELETE FROM t_dm_stg_task")
-        
-        # Вставка данных в MySQL staging таблицу
-        print("Inserting data into MySQL staging table...")
-        insert_query = """
-            INSERT INTO t_dm_stg_task 
-            (fact_id, customer_id, product_id, region_id, status_id,
-             age, salary, purchase_amount, transaction_count,
-             effective_from, effective_to, current_flag, created_dt)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        mysql_cursor.executemany(insert_query, data)
-        mysql_conn.commit()
-        
-        print(f"Inserted {mysql_cursor.rowcount} records into MySQL staging table")
+        load_staging_to_target(mysql_conn, start_dt, end_dt, load_strategy)
         
+    except Exception as e:
+        print(f"Error migrating data: {e}")
+        if mysql_conn:
+            mysql_conn.rollback()
+        raise
+    finally:
+        if pg_conn:
+            release_pg_connection(pg_conn)
+        if mysql_conn:
+            release_mysql_connection(mysql_conn)
+
+def target_partitioned(mysql_cursor):
+    """
+    Секционирована ли t_dm_task по effective_from
+    """
+    mysql_cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 't_dm_task' AND PARTITION_NAME IS NOT NULL
+    """)
+    return mysql_cursor.fetchone()[0] > 0
+
+def load_staging_to_target(mysql_conn, start_dt=None, end_dt=None, load_strategy='delete_insert'):
+    """
+    Переносит данные из staging в целевую таблицу MySQL процедурой выбранной стратегии
+    """
+    if load_strategy not in LOAD_PROCEDURES:
+        raise ValueError(f"Unknown load strategy: {load_strategy}")
+    
+    mysql_cursor = mysql_conn.cursor()
+    
+    # t_dm_task, созданная до секционирования, не меняется CREATE TABLE IF NOT EXISTS,
+    # а подмена секций окна без секций невозможна
+    windowed = start_dt is not None or end_dt is not None
+    if load_strategy == 'swap' and windowed and not target_partitioned(mysql_cursor):
+        print("WARNING: MySQL t_dm_task is not partitioned by effective_from, falling back to delete_insert. "
+              "Recreate it from sql/dm/s_sql_dm/table/t_dm_task.sql to load windows via partition swap")
+        load_strategy = 'delete_insert'
+    
+    with span('migrate.target', strategy=load_strategy) as current:
         # Вызов процедуры загрузки в целевую таблицу MySQL
-        print("Loading data to MySQL target table...")
+        print(f"Loading data to MySQL target table ({load_strategy})...")
         
         # Для pymysql используем execute для вызова процедуры
-        call_query = "CALL fn_dm_data_stg_to_dm_load(%s, %s)"
+        call_query = f"CALL {LOAD_PROCEDURES[load_strategy]}(%s, %s)"
         mysql_cursor.execute(call_query, (start_dt, end_dt))
         
         # Получение результата процедуры
@@ -83,9 +221,187 @@ def migrate_to_mysql(start_dt=None, end_dt=None):
         # Проверка финального количества записей
         mysql_cursor.execute("SELECT COUNT(*) FROM t_dm_task")
         final_count = mysql_cursor.fetchone()[0]
+        current.set(rows=final_count)
+    
+    print(f"Data migration completed successfully!")
+    print(f"Total records in MySQL DWH: {final_count}")
+    return final_count
+
+def upsert_target_rows(mysql_cursor, rows):
+    """
+    Upsert пачки фактов в t_dm_task с уникальностью по fact_id: повторно отправленный
+    факт с исправленным effective_from заменяет прежнюю строку, а не добавляется рядом с ней
+    """
+    if not rows:
+        return
+    mysql_cursor.execute(
+        DELETE_MOVED_FACTS_QUERY.format(ids=', '.join(['%s'] * len(rows)),
+                                        keys=', '.join(['(%s, %s)'] * len(rows))),
+        [row[0] for row in rows] + [value for row in rows for value in (row[0], row[9])]
+    )
+    mysql_cursor.executemany(UPSERT_TARGET_QUERY, rows)
+
+def split_fact_id_ranges(min_id, max_id, shards):
+    """
+    Делит отрезок [min_id, max_id] на shards непересекающихся диапазонов fact_id
+    """
+    if min_id is None or max_id is None:
+        return []
+    
+    shards = max(1, min(shards, max_id - min_id + 1))
+    width = -(-(max_id - min_id + 1) // shards)  # округление вверх
+    
+    ranges = []
+    lo = min_id
+    while lo <= max_id:
+        hi = min(lo + width - 1, max_id)
+        ranges.append((lo, hi))
+        lo = hi + 1
+    return ranges
+
+def copy_fact_range(pg_conn, mysql_conn, lo, hi, start_dt=None, end_dt=None, table='t_dm_stg_task'):
+    """
+    Копирует факты окна с fact_id в [lo, hi] из v_dm_task в таблицу MySQL.
+    Диапазон окна в MySQL предварительно очищается, поэтому повторный вызов безопасен,
+    а факты вне окна не затрагиваются.
+    """
+    mysql_cursor = mysql_conn.cursor()
+    mysql_cursor.execute(
+        f"DELETE FROM {table} WHERE fact_id BETWEEN %s AND %s"
+        " AND (%s IS NULL OR effective_from >= %s) AND (%s IS NULL OR effective_to <= %s)",
+        (lo, hi, start_dt, start_dt, end_dt, end_dt)
+    )
+    
+    insert_query = INSERT_STG_QUERY.replace("t_dm_stg_task", table)
+    
+    # Серверный курсор: шард читается пачками и не держится в памяти целиком
+    pg_cursor = pg_conn.cursor(name=f"migrate_shard_{lo}_{hi}")
+    pg_cursor.itersize = SHARD_BATCH_SIZE
+    pg_cursor.execute(
+        SELECT_FACTS_QUERY + " AND fact_id BETWEEN %s AND %s",
+        (start_dt, start_dt, end_dt, end_dt, lo, hi)
+    )
+    
+    copied = 0
+    while True:
+        rows = pg_cursor.fetchmany(SHARD_BATCH_SIZE)
+        if not rows:
+            break
+        mysql_cursor.executemany(insert_query, rows)
+        copied += len(rows)
+    
+    pg_cursor.close()
+    mysql_conn.commit()
+    pg_conn.commit()
+    return copied
+
+def migrate_shard(lo, hi, start_dt=None, end_dt=None, retries=3, run_id=None, fingerprint=None, parent=None):
+    """
+    Мигрирует один шард в staging по собственной паре подключений с повторными попытками
+    """
+    for attempt in range(1, retries + 1):
+        pg_conn = None
+        mysql_conn = None
+        try:
+            pg_conn = get_pg_connection('migrate')
+            mysql_conn = get_mysql_connection('migrate')
+            with span('migrate.shard', parent=parent, range=f"{lo}-{hi}", attempt=attempt) as current:
+                copied = copy_fact_range(pg_conn, mysql_conn, lo, hi, start_dt, end_dt)
+                current.set(rows=copied)
+            print(f"Shard [{lo}, {hi}]: copied {copied} records (attempt {attempt})")
+            # Контрольная точка пишется на уже взятом подключении: второе подключение
+            # из пула при числе шардов, равном размеру пула, ждало бы бесконечно
+            if run_id is not None:
+                mark_unit_done(pg_conn.cursor(), run_id, 'migrate', f"shard:{lo}-{hi}",
+                               {'rows': copied, 'fingerprint': fingerprint})
+                pg_conn.commit()
+            return copied
+        except Exception as e:
+            print(f"Shard [{lo}, {hi}] failed on attempt {attempt}/{retries}: {e}")
+            if mysql_conn:
+                mysql_conn.rollback()
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+        finally:
+            if pg_conn:
+                release_pg_connection(pg_conn)
+            if mysql_conn:
+                release_mysql_connection(mysql_conn)
+
+def migrate_to_mysql_sharded(start_dt=None, end_dt=None, shards=4, workers=None, retries=3,
+                             load_strategy='delete_insert', run_id=None):
+    """
+    Мигрирует v_dm_task в MySQL, разбивая данные на shards диапазонов fact_id.
+    Каждый шард грузится в staging параллельно, процедура загрузки в целевую
+    таблицу вызывается только после того, как все шарды загружены.
+    С run_id продолжение запуска догружает только незавершенные шарды.
+    """
+    pg_conn = None
+    mysql_conn = None
+    
+    try:
+        units = completed_units(run_id, 'migrate')
         
-        print(f"Data migration completed successfully!")
-        print(f"Total records in MySQL DWH: {final_count}")
+        print("Connecting to PostgreSQL...")
+        pg_conn = get_pg_connection('migrate')
+        pg_cursor = pg_conn.cursor()
+        
+        # Границы fact_id в окне миграции
+        pg_cursor.execute(
+            "SELECT MIN(fact_id), MAX(fact_id) FROM s_sql_dds.v_dm_task"
+            " WHERE (%s IS NULL OR effective_from >= %s)"
+            "   AND (%s IS NULL OR effective_to <= %s)",
+            (start_dt, start_dt, end_dt, end_dt)
+        )
+        min_id, max_id = pg_cursor.fetchone()
+        
+        ranges = split_fact_id_ranges(min_id, max_id, shards)
+        if not ranges:
+            print("No data to migrate!")
+            return
+        
+        # Шарды, загруженные прерванным запуском; если диапазоны или данные окна
+        # с тех пор изменились, staging собирается заново
+        fingerprint = window_fingerprint(pg_cursor, start_dt, end_dt) if run_id is not None else None
+        done = {unit: details for unit, details in units.items() if unit.startswith('shard:')}
+        if (not set(done) <= {f"shard:{lo}-{hi}" for lo, hi in ranges}
+                or any(details.get('fingerprint') != fingerprint for details in done.values())):
+            clear_units(pg_cursor, run_id, 'migrate')
+            pg_conn.commit()
+            done = {}
+        release_pg_connection(pg_conn)
+        pg_conn = None
+        
+        print("Connecting to MySQL...")
+        mysql_conn = get_mysql_connection('migrate')
+        
+        if done:
+            print(f"Resuming migration: {len(done)} of {len(ranges)} shards already in staging")
+        else:
+            # Очистка staging таблицы в MySQL
+            print("Cleaning MySQL staging table...")
+            mysql_conn.cursor().execute("DELETE FROM t_dm_stg_task")
+            mysql_conn.commit()
+        
+        pending = [(lo, hi) for lo, hi in ranges if f"shard:{lo}-{hi}" not in done]
+        print(f"Migrating {len(pending)} shards of fact_id [{min_id}, {max_id}]...")
+        total = sum(details['rows'] for details in done.values())
+        # Спаны шардов - дочерние спаны этапа, хотя пишутся из рабочих потоков
+        parent = current_span()
+        # Один слот пула остается свободным для остальных этапов и контрольных точек
+        with ThreadPoolExecutor(max_workers=max(1, min(workers or len(ranges), PG_POOL_MAX - 1))) as pool:
+            futures = {
+                pool.submit(migrate_shard, lo, hi, start_dt, end_dt, retries, run_id, fingerprint, parent): (lo, hi)
+                for lo, hi in pending
+            }
+            for future in as_completed(futures):
+                total += future.result()
+        
+        print(f"Inserted {total} records into MySQL staging table")
+        
+        # Все шарды на месте - переносим staging в целевую таблицу
+        load_staging_to_target(mysql_conn, start_dt, end_dt, load_strategy)
         
     except Exception as e:
         print(f"Error migrating data: {e}")
@@ -94,9 +410,148 @@ def migrate_to_mysql(start_dt=None, end_dt=None):
         raise
     finally:
         if pg_conn:
-            pg_conn.close()
+            release_pg_connection(pg_conn)
         if mysql_conn:
-            mysql_conn.close()
+            release_mysql_connection(mysql_conn)
+
+def migrate_to_mysql_delta(batch_size=SHARD_BATCH_SIZE):
+    """
+    Дельта-миграция: переносит в MySQL только факты с fact_id больше водяного знака.
+    fact_id выдается BIGSERIAL и только растет, поэтому новые факты всегда лежат
+    выше последнего отправленного. Строки применяются через INSERT ... ON DUPLICATE KEY UPDATE,
+    водяной знак сдвигается в той же транзакции MySQL, что и пачка данных.
+    Удаления не переносятся: если fill_dm_table или бэкфилл перезаписывает окно, факты
+    получают новые fact_id, а прежние остаются в MySQL. Поэтому после перезаписи окна
+    и периодически нужна полная миграция или миграция окна (migrate_window_to_mysql).
+    """
+    pg_conn = None
+    mysql_conn = None
+    
+    try:
+        print("Connecting to PostgreSQL...")
+        pg_conn = get_pg_connection('migrate')
+        
+        print("Connecting to MySQL...")
+        mysql_conn = get_mysql_connection('migrate')
+        mysql_cursor = mysql_conn.cursor()
+        
+        mysql_cursor.execute(WATERMARK_TABLE_DDL)
+        mysql_cursor.execute(
+            "SELECT last_fact_id FROM t_dm_migration_watermark WHERE target_table = 't_dm_task'"
+        )
+        row = mysql_cursor.fetchone()
+        watermark = row[0] if row else 0
+        print(f"Current migration watermark: fact_id > {watermark}")
+        
+        # Серверный курсор: читаем только новые факты в порядке fact_id
+        pg_cursor = pg_conn.cursor(name="migrate_delta")
+        pg_cursor.itersize = batch_size
+        pg_cursor.execute(
+            SELECT_FACTS_QUERY + " AND fact_id > %s ORDER BY fact_id",
+            (None, None, None, None, watermark)
+        )
+        
+        migrated = 0
+        while True:
+            rows = pg_cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            
+            upsert_target_rows(mysql_cursor, rows)
+            watermark = rows[-1][0]
+            mysql_cursor.execute("""
+                INSERT INTO t_dm_migration_watermark (target_table, last_fact_id)
+                VALUES ('t_dm_task', %s)
+                ON DUPLICATE KEY UPDATE last_fact_id = VALUES(last_fact_id)
+            """, (watermark,))
+            mysql_conn.commit()
+            
+            migrated += len(rows)
+            print(f"Upserted {migrated} records, watermark: {watermark}")
+        
+        pg_cursor.close()
+        
+        if migrated == 0:
+            print("No new data to migrate!")
+        else:
+            print(f"Delta migration completed successfully! {migrated} records upserted")
+        return migrated
+        
+    except Exception as e:
+        print(f"Error migrating data: {e}")
+        if mysql_conn:
+            mysql_conn.rollback()
+        raise
+    finally:
+        if pg_conn:
+            release_pg_connection(pg_conn)
+        if mysql_conn:
+            release_mysql_connection(mysql_conn)
+
+def migrate_window_to_mysql(start_dt, end_dt, batch_size=SHARD_BATCH_SIZE):
+    """
+    Перезаписывает окно бэкфилла в t_dm_task MySQL: факты с effective_from в [start_dt, end_dt]
+    удаляются и загружаются заново одной транзакцией MySQL. Staging не используется,
+    поэтому окна можно переносить параллельно
+    """
+    pg_conn = None
+    mysql_conn = None
+    
+    try:
+        pg_conn = get_pg_connection('migrate')
+        mysql_conn = get_mysql_connection('migrate')
+        mysql_cursor = mysql_conn.cursor()
+        
+        with span('migrate.window') as current:
+            mysql_cursor.execute(
+                "DELETE FROM t_dm_task WHERE effective_from BETWEEN %s AND %s", (start_dt, end_dt)
+            )
+            
+            pg_cursor = pg_conn.cursor(name=f"migrate_window_{str(start_dt).replace('-', '')}")
+            pg_cursor.itersize = batch_size
+            pg_cursor.execute(SELECT_WINDOW_FACTS_QUERY, (start_dt, end_dt))
+            
+            migrated = 0
+            while True:
+                rows = pg_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                upsert_target_rows(mysql_cursor, rows)
+                migrated += len(rows)
+            
+            pg_cursor.close()
+            mysql_conn.commit()
+            pg_conn.commit()
+            current.set(rows=migrated)
+        
+        print(f"Migrated {migrated} records for window {start_dt}..{end_dt}")
+        return migrated
+    
+    except Exception as e:
+        print(f"Error migrating window {start_dt}..{end_dt}: {e}")
+        if mysql_conn:
+            mysql_conn.rollback()
+        raise
+    finally:
+        if pg_conn:
+            release_pg_connection(pg_conn)
+        if mysql_conn:
+            release_mysql_connection(mysql_conn)
+
+def mysql_sink(start_dt=None, end_dt=None, delta=False, shards=1, load_strategy='delete_insert', run_id=None):
+    """
+    Приемник mysql для sinks.run_sink: выбирает способ миграции по параметрам
+    """
+    if delta:
+        # Только новые факты (по водяному знаку fact_id); окно, шарды и подмена секций
+        # к дельте не применяются, run_id не нужен - повтор продолжает с водяного знака
+        if start_dt is not None or end_dt is not None or shards > 1 or load_strategy != 'delete_insert':
+            raise ValueError("Delta migration does not support a window, shards or the swap load strategy")
+        return migrate_to_mysql_delta()
+    if shards > 1:
+        # Параллельная миграция по диапазонам fact_id
+        return migrate_to_mysql_sharded(start_dt, end_dt, shards=shards, load_strategy=load_strategy, run_id=run_id)
+    return migrate_to_mysql(start_dt, end_dt, load_strategy=load_strategy, run_id=run_id)
 
 if __name__ == "__main__":
     migrate_to_mysql()
\ No newline at end of file
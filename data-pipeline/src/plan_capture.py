@@ -0,0 +1,360 @@
+import re
+import json
+import hashlib
+from contextlib import contextmanager
+from psycopg2.extensions import TRANSACTION_STATUS_INTRANS
+from psycopg2.extras import Json
+from db_pool import get_pg_connection, release_pg_connection
+
+# Режим захвата планов (main.py --explain): тяжелые запросы этапов выполняются под
+# auto_explain, планы с реальными счетчиками строк и буферов сохраняются в t_plan_captures
+# и сравниваются с предыдущим захватом того же запроса. Если auto_explain на сервере
+# нет, после этапа те же запросы выполняются через EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON).
+# Захват не фиксирует и не откатывает транзакцию этапа: настройки auto_explain
+# действуют до конца транзакции (set_config(..., TRUE)), ошибки откатываются до точки сохранения
+
+# Запасной вариант без auto_explain: чтения из fn_etl_data_load, fn_dm_data_load,
+# функции проверок режима dq (источник dq.<режим>, per_check - просто dq) и SELECT миграции.
+# Запросы должны совпадать с функциями, которые они представляют. Выполняются только
+# SELECT, поэтому EXPLAIN ANALYZE не меняет данных
+EXPLAIN_STATEMENTS = {
+    'etl.cleanse': {
+        'source_read': """
+            SELECT * FROM s_sql_dds.t_sql_source_unstructured
+            WHERE effective_from >= %(start_dt)s
+                AND effective_to <= %(end_dt)s
+                AND user_id IS NOT NULL
+        """,
+    },
+    'dm_load': {
+        'fact_select': """
+            SELECT c.customer_id, p.product_id, r.region_id, st.status_id, src.*
+            FROM s_sql_dds.t_sql_source_structured src
+            LEFT JOIN s_sql_dds.t_dim_customer c ON src.user_name = c.customer_name
+            LEFT JOIN s_sql_dds.t_dim_product p ON src.product_category = p.product_category
+            LEFT JOIN s_sql_dds.t_dim_region r ON src.region = r.region_name
+            LEFT JOIN s_sql_dds.t_dim_status st ON src.customer_status = st.status_name
+            WHERE (%(start_dt)s::DATE IS NULL OR src.effective_from >= %(start_dt)s)
+              AND (%(end_dt)s::DATE IS NULL OR src.effective_to <= %(end_dt)s)
+        """,
+    },
+    'dq': {
+        # fn_dq_checks_load: каждая проверка отдельным запросом
+        'purchase_sum': """
+            SELECT COALESCE(SUM(purchase_amount), 0)
+            FROM s_sql_dds.v_dm_task
+            WHERE (%(start_dt)s::DATE IS NULL OR effective_from >= %(start_dt)s)
+              AND (%(end_dt)s::DATE IS NULL OR effective_to <= %(end_dt)s)
+        """,
+        'duplicates': """
+            SELECT COUNT(*) FROM (
+                SELECT fact_id, customer_id, effective_from
+                FROM s_sql_dds.v_dm_task
+                WHERE (%(start_dt)s::DATE IS NULL OR effective_from >= %(start_dt)s)
+                  AND (%(end_dt)s::DATE IS NULL OR effective_to <= %(end_dt)s)
+                GROUP BY fact_id, customer_id, effective_from
+                HAVING COUNT(*) > 1
+            ) duplicates
+        """,
+    },
+    'dq.single_pass': {
+        # fn_dq_checks_load_single_pass: все метрики витрины одним агрегатом
+        'fact_metrics': """
+            SELECT
+                COALESCE(SUM(purchase_amount), 0),
+                COUNT(*) FILTER (WHERE customer_id IS NULL) * 100.0 / NULLIF(COUNT(*), 0),
+                COUNT(*) FILTER (WHERE effective_to < effective_from),
+                COUNT(*) FILTER (WHERE salary < 0 OR salary > 1000000),
+                COUNT(*) - COUNT(DISTINCT (fact_id, customer_id, effective_from))
+            FROM s_sql_dds.v_dm_task
+            WHERE (%(start_dt)s::DATE IS NULL OR effective_from >= %(start_dt)s)
+              AND (%(end_dt)s::DATE IS NULL OR effective_to <= %(end_dt)s)
+        """,
+    },
+    'migrate': {
+        'select_facts': """
+            SELECT fact_id, customer_id, product_id, region_id, status_id,
+                   age, salary, purchase_amount, transaction_count,
+                   effective_from, effective_to, current_flag, created_dt
+            FROM s_sql_dds.v_dm_task
+            WHERE (%(start_dt)s::DATE IS NULL OR effective_from >= %(start_dt)s)
+              AND (%(end_dt)s::DATE IS NULL OR effective_to <= %(end_dt)s)
+        """,
+    },
+}
+
+# Настройки auto_explain на время этапа: планы уходят клиенту как NOTICE
+AUTO_EXPLAIN_SETTINGS = {
+    'auto_explain.log_min_duration': '0',
+    'auto_explain.log_analyze': 'on',
+    'auto_explain.log_buffers': 'on',
+    'auto_explain.log_timing': 'on',
+    'auto_explain.log_nested_statements': 'on',
+    'auto_explain.log_format': 'json',
+    'auto_explain.log_level': 'notice',
+    'client_min_messages': 'notice',
+}
+
+# Порог регрессии: блоков на строку стало в BUFFER_GROWTH раз больше,
+# и запрос читает не меньше MIN_BLOCKS блоков (мелкие запросы не сигналят)
+BUFFER_GROWTH = 2.0
+MIN_BLOCKS = 100
+
+# Атрибуты узла, определяющие форму плана (без стоимостей и счетчиков)
+SHAPE_KEYS = ('Node Type', 'Relation Name', 'Index Name', 'Join Type', 'Strategy', 'Parent Relationship')
+
+_capture = {'enabled': False, 'run_id': None, 'auto_explain': None}
+
+def enable_plan_capture(run_id=None):
+    _capture['enabled'] = True
+    _capture['run_id'] = run_id
+
+def plan_nodes(plan):
+    """
+    Все узлы плана в порядке обхода в глубину
+    """
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+def plan_shape(plan):
+    """
+    Форма плана: типы узлов, таблицы, индексы и способы соединения
+    """
+    children = ','.join(plan_shape(child) for child in plan.get('Plans', []))
+    node = '|'.join(str(plan.get(key, '')) for key in SHAPE_KEYS)
+    return f"({node}[{children}])"
+
+def plan_hash(plan):
+    return hashlib.sha256(plan_shape(plan).encode('utf-8')).hexdigest()
+
+def plan_stats(plan):
+    """
+    Строки (максимум по узлам) и блоки буферов верхнего узла: счетчики буферов
+    узла включают его потомков
+    """
+    rows = max(int(node.get('Actual Rows', 0) * node.get('Actual Loops', 1)) for node in plan_nodes(plan))
+    return {
+        'actual_rows': rows,
+        'shared_hit_blocks': plan.get('Shared Hit Blocks', 0),
+        'shared_read_blocks': plan.get('Shared Read Blocks', 0),
+    }
+
+def scanned_relations(plan):
+    return {
+        (node['Node Type'], node.get('Relation Name'))
+        for node in plan_nodes(plan) if 'Scan' in node['Node Type']
+    }
+
+def detect_regression(previous, current, growth=BUFFER_GROWTH, min_blocks=MIN_BLOCKS):
+    """
+    Сравнивает захват с предыдущим захватом того же запроса.
+    previous/current - словари с plan, plan_hash и счетчиками plan_stats.
+    Возвращает описание регрессии или None
+    """
+    if previous is None:
+        return None
+    
+    if previous['plan_hash'] != current['plan_hash']:
+        added = scanned_relations(current['plan']) - scanned_relations(previous['plan'])
+        details = ', '.join(f"{node_type} on {relation}" if relation else node_type
+                            for node_type, relation in sorted(added, key=str))
+        return f"plan changed{': ' + details if details else ''}"
+    
+    def blocks(capture):
+        return capture['shared_hit_blocks'] + capture['shared_read_blocks']
+    
+    current_blocks = blocks(current)
+    if current_blocks >= min_blocks:
+        previous_ratio = blocks(previous) / max(previous['actual_rows'], 1)
+        current_ratio = current_blocks / max(current['actual_rows'], 1)
+        if current_ratio > previous_ratio * growth:
+            return (f"buffers per row grew {current_ratio / max(previous_ratio, 1e-9):.1f}x "
+                    f"({blocks(previous)} -> {current_blocks} blocks, "
+                    f"{previous['actual_rows']} -> {current['actual_rows']} rows)")
+    return None
+
+def normalize_statement(query_text):
+    """
+    Текст запроса без литералов: psycopg2 подставляет параметры на клиенте,
+    и без нормализации каждое окно дат давало бы новый ключ запроса
+    """
+    normalized = re.sub(r"'(?:[^']|'')*'", '?', query_text)
+    normalized = re.sub(r'(?<![\w.])\d+(?:\.\d+)?\b', '?', normalized)
+    # Списки IN (...) разной длины - один и тот же запрос
+    normalized = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?)', normalized)
+    return re.sub(r'\s+', ' ', normalized).strip().lower()
+
+def statement_key(query_text):
+    return hashlib.md5(normalize_statement(query_text).encode('utf-8')).hexdigest()
+
+def parse_auto_explain_notice(notice):
+    """
+    План из сообщения auto_explain: 'duration: 1.234 ms  plan:' и JSON
+    """
+    match = re.search(r'duration: ([\d.]+) ms\s+plan:\s*(\{.*\})\s*$', notice, re.S)
+    if not match:
+        return None
+    explained = json.loads(match.group(2))
+    return {
+        'query_text': explained.get('Query Text', ''),
+        'plan': explained['Plan'],
+        'duration_ms': float(match.group(1)),
+    }
+
+def _enable_auto_explain(conn):
+    """
+    Включает auto_explain до конца текущей транзакции этапа. Возвращает прежнее
+    значение client_min_messages или None, если auto_explain недоступен
+    """
+    # Недоступность auto_explain запоминается, чтобы не пробовать на каждом этапе
+    if _capture['auto_explain'] is False:
+        return None
+    cursor = conn.cursor()
+    cursor.execute("SAVEPOINT plan_capture")
+    try:
+        cursor.execute("SELECT current_setting('client_min_messages')")
+        client_min_messages = cursor.fetchone()[0]
+        # Библиотека, уже загруженная сервером, не требует LOAD (и прав суперпользователя)
+        cursor.execute("""
+            SELECT current_setting('shared_preload_libraries') || ','
+                || current_setting('session_preload_libraries')
+        """)
+        if 'auto_explain' not in cursor.fetchone()[0]:
+            cursor.execute("LOAD 'auto_explain'")
+        for name, value in AUTO_EXPLAIN_SETTINGS.items():
+            cursor.execute("SELECT set_config(%s, %s, TRUE)", (name, value))
+        cursor.execute("RELEASE SAVEPOINT plan_capture")
+        _capture['auto_explain'] = True
+        return client_min_messages
+    except Exception as e:
+        # Откатывается только попытка включения, работа этапа в транзакции остается
+        cursor.execute("ROLLBACK TO SAVEPOINT plan_capture")
+        cursor.execute("RELEASE SAVEPOINT plan_capture")
+        _capture['auto_explain'] = False
+        print(f"auto_explain недоступен ({str(e).strip()}), планы будут получены через EXPLAIN")
+        return None
+
+def _disable_auto_explain(conn, client_min_messages):
+    # Если этап уже зафиксировал или прервал транзакцию, ее настройки сброшены вместе с ней
+    if conn.get_transaction_status() != TRANSACTION_STATUS_INTRANS:
+        return
+    cursor = conn.cursor()
+    cursor.execute("SELECT set_config('auto_explain.log_min_duration', '-1', TRUE)")
+    cursor.execute("SELECT set_config('client_min_messages', %s, TRUE)", (client_min_messages,))
+
+def explain_statements(conn, source, params):
+    """
+    Выполняет запросы этапа из EXPLAIN_STATEMENTS под EXPLAIN ANALYZE
+    """
+    captures = []
+    cursor = conn.cursor()
+    # Точка сохранения: ошибка EXPLAIN не прерывает транзакцию этапа
+    cursor.execute("SAVEPOINT plan_explain")
+    try:
+        for name, query in EXPLAIN_STATEMENTS.get(source, {}).items():
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+            explained = cursor.fetchone()[0][0]
+            captures.append({
+                'statement_key': f"{source}.{name}",
+                'query_text': re.sub(r'\s+', ' ', query).strip(),
+                'plan': explained['Plan'],
+                'duration_ms': explained.get('Execution Time'),
+            })
+    finally:
+        cursor.execute("ROLLBACK TO SAVEPOINT plan_explain")
+        cursor.execute("RELEASE SAVEPOINT plan_explain")
+    return captures
+
+def save_captures(source, captures):
+    """
+    Сохраняет планы и отмечает регрессии относительно предыдущего захвата запроса
+    """
+    conn = None
+    try:
+        conn = get_pg_connection()
+        cursor = conn.cursor()
+        regressions = []
+        for capture in captures:
+            capture.update(plan_stats(capture['plan']))
+            capture['plan_hash'] = plan_hash(capture['plan'])
+            
+            cursor.execute("""
+                SELECT plan, plan_hash, actual_rows, shared_hit_blocks, shared_read_blocks
+                FROM s_sql_dds.t_plan_captures
+                WHERE statement_key = %s
+                ORDER BY capture_id DESC
+                LIMIT 1
+            """, (capture['statement_key'],))
+            row = cursor.fetchone()
+            previous = dict(zip(('plan', 'plan_hash', 'actual_rows', 'shared_hit_blocks', 'shared_read_blocks'),
+                                row)) if row else None
+            regression = detect_regression(previous, capture)
+            if regression:
+                regressions.append((capture['statement_key'], regression))
+            
+            cursor.execute("""
+                INSERT INTO s_sql_dds.t_plan_captures
+                (run_id, source, statement_key, query_text, plan, plan_hash, actual_rows,
+                 shared_hit_blocks, shared_read_blocks, duration_ms, regression)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                _capture['run_id'], source, capture['statement_key'], capture['query_text'],
+                Json(capture['plan']), capture['plan_hash'], capture['actual_rows'],
+                capture['shared_hit_blocks'], capture['shared_read_blocks'],
+                capture['duration_ms'], regression
+            ))
+        conn.commit()
+        
+        print(f"[{source}] захвачено планов: {len(captures)}")
+        for key, regression in regressions:
+            print(f"[{source}] WARNING plan regression in {key}: {regression}")
+        return regressions
+    
+    except Exception as e:
+        print(f"Ошибка при сохранении планов: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+@contextmanager
+def capture_plans(conn, source, start_dt=None, end_dt=None):
+    """
+    Захватывает планы запросов, выполненных на conn внутри блока.
+    Вне режима захвата ничего не делает
+    """
+    if not _capture['enabled']:
+        yield
+        return
+    
+    client_min_messages = _enable_auto_explain(conn)
+    auto_explain = client_min_messages is not None
+    saved_notices = conn.notices
+    # По умолчанию psycopg2 хранит только последние 50 сообщений
+    conn.notices = []
+    try:
+        yield
+        
+        if auto_explain:
+            captures = []
+            for notice in conn.notices:
+                capture = parse_auto_explain_notice(notice)
+                # Только запросы, читающие таблицы: вставки VALUES и служебные вызовы пропускаются
+                if capture and scanned_relations(capture['plan']):
+                    capture['statement_key'] = f"{source}.{statement_key(capture['query_text'])}"
+                    captures.append(capture)
+        else:
+            # Повторное выполнение запросов удваивает время этапа, поэтому только без auto_explain
+            captures = explain_statements(conn, source, {'start_dt': start_dt, 'end_dt': end_dt})
+    finally:
+        conn.notices = saved_notices
+        if auto_explain:
+            try:
+                _disable_auto_explain(conn, client_min_messages)
+            except Exception:
+                # Транзакция этапа прервана; ее откатит сам этап
+                pass
+    
+    save_captures(source, captures)
\ No newline at end of file
@@ -1,51 +1,84 @@
-import psycopg2
 import sys
 import os
 
 # Добавляем путь для импорта
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-try:
-    from config import DB_CONFIG
-except ImportError:
-    # Альтернативный способ если импорт не работает
-    DB_CONFIG = {
-        'host': 'localhost',
-        'port': '5432',
-        'database': 'etl_db',
-        'user': 'user',
-        'password': 'password'
-    }
+from db_pool import get_pg_connection, release_pg_connection
+from metrics import span
+from plan_capture import capture_plans
 
-def run_data_quality_checks(start_dt=None, end_dt=None):
+# Режимы проверок:
+#   per_check   - каждая проверка отдельным запросом (fn_dq_checks_load)
+#   single_pass - все метрики витрины за один проход (fn_dq_checks_load_single_pass)
+#   incremental - пересчет только изменившихся месяцев и вердикт из кэша (fn_dq_checks_load_incremental)
+#   parallel    - проверки реестра dq_runner.DQ_CHECKS параллельно на нескольких подключениях
+#   approximate - проверки dq_sampling.APPROX_CHECKS по выборке TABLESAMPLE с доверительным интервалом
+DQ_FUNCTIONS = {
+    'per_check': 's_sql_dds.fn_dq_checks_load',
+    'single_pass': 's_sql_dds.fn_dq_checks_load_single_pass',
+    'incremental': 's_sql_dds.fn_dq_checks_load_incremental',
+    'parallel': None,
+    'approximate': None,
+}
+
+def run_data_quality_checks(start_dt=None, end_dt=None, mode='per_check', by_start=False):
     """
-    Запускает проверки качества данных
+    Запускает проверки качества данных.
+    by_start - окно бэкфилла по effective_from (кроме режима incremental)
     """
+    if mode not in DQ_FUNCTIONS:
+        raise ValueError(f"Неизвестный режим проверок: {mode}")
+    if by_start and mode == 'incremental':
+        # Инкрементальный режим пересчитывает месяцы по водяному знаку fact_id, а не окно
+        raise ValueError("Режим incremental не поддерживает окна по effective_from")
+    if mode == 'parallel':
+        if by_start:
+            raise ValueError("Режим parallel не поддерживает окна по effective_from")
+        from dq_runner import run_dq_checks_parallel
+        return run_dq_checks_parallel(start_dt, end_dt)
+    if mode == 'approximate':
+        from dq_sampling import run_approximate_dq_checks
+        return run_approximate_dq_checks(start_dt, end_dt, by_start=by_start)
+    dq_function = DQ_FUNCTIONS[mode]
+    
     conn = None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_pg_connection('dq')
         cursor = conn.cursor()
         
         print("Запуск проверок качества данных...")
         
-        # Запуск функции проверки качества данных
-        if start_dt and end_dt:
-            cursor.execute("SELECT s_sql_dds.fn_dq_checks_load(%s, %s)", (start_dt, end_dt))
-        else:
-            cursor.execute("SELECT s_sql_dds.fn_dq_checks_load(NULL, NULL)")
+        # Открываем запуск: результаты проверок получат его run_id
+        cursor.execute("SELECT s_sql_dds.fn_dq_start_run(%s, %s, %s)", (mode, start_dt, end_dt))
+        run_id = cursor.fetchone()[0]
         
-        conn.commit()
+        # Запуск функции проверки качества данных
+        with span('dq.checks', mode=mode, dq_run_id=run_id) as current:
+            # Планы режимов различаются, поэтому у каждого режима свой источник захвата
+            source = 'dq' if mode == 'per_check' else f"dq.{mode}"
+            with capture_plans(conn, source, start_dt, end_dt):
+                if start_dt and end_dt and by_start:
+                    cursor.execute(f"SELECT {dq_function}(%s, %s, TRUE)", (start_dt, end_dt))
+                elif start_dt and end_dt:
+                    cursor.execute(f"SELECT {dq_function}(%s, %s)", (start_dt, end_dt))
+                else:
+                    cursor.execute(f"SELECT {dq_function}(NULL, NULL)")
+                
+                cursor.execute("SELECT s_sql_dds.fn_dq_finish_run(%s)", (run_id,))
+                conn.commit()
+            
+            # Для проверок единица работы - проверка, а не строка витрины
+            cursor.execute("SELECT total_checks FROM s_sql_dds.t_dq_runs WHERE run_id = %s", (run_id,))
+            current.set(rows=cursor.fetchone()[0])
         
-        # Получаем результаты
+        # Получаем результаты этого запуска
         cursor.execute("""
             SELECT check_name, status, error_message, execution_date
             FROM s_sql_dds.t_dq_check_results
-            WHERE execution_date = (
-                SELECT MAX(execution_date) 
-                FROM s_sql_dds.t_dq_check_results
-            )
+            WHERE run_id = %s
             ORDER BY check_id
-        """)
+        """, (run_id,))
         
         results = cursor.fetchall()
         
@@ -84,7 +117,8 @@ def run_data_quality_checks(start_dt=None, end_dt=None):
         raise
     finally:
         if conn:
-            conn.close()
+            release_pg_connection(conn)
 
 if __name__ == "__main__":
-    run_data_quality_checks()
\ No newline at end of file
+    # Режим проверок можно передать первым аргументом: per_check, single_pass, incremental, parallel или approximate
+    run_data_quality_checks(mode=sys.argv[1] if len(sys.argv) > 1 else 'per_check')
\ No newline at end of file
@@ -0,0 +1,124 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Планировщик этапов пайплайна: этап объявляет зависимости, независимые этапы
+# выполняются параллельно. critical=False - ошибка этапа только предупреждение
+# (зависимые от него этапы пропускаются), default=False - этап запускается
+# только если выбран явно (--only или --with)
+
+def stage(name, func, depends_on=(), critical=True, default=True):
+    """
+    Описание этапа для run_stages
+    """
+    return {
+        'name': name,
+        'func': func,
+        'depends_on': tuple(depends_on),
+        'critical': critical,
+        'default': default,
+    }
+
+def check_stages(stages):
+    """
+    Проверяет, что зависимости существуют и в графе нет циклов
+    """
+    for item in stages.values():
+        for dependency in item['depends_on']:
+            if dependency not in stages:
+                raise ValueError(f"Stage {item['name']} depends on unknown stage {dependency}")
+    
+    visited = {}
+    def visit(name, path):
+        if visited.get(name) == 'done':
+            return
+        if visited.get(name) == 'active':
+            raise ValueError(f"Stage dependency cycle: {' -> '.join(path + [name])}")
+        visited[name] = 'active'
+        for dependency in stages[name]['depends_on']:
+            visit(dependency, path + [name])
+        visited[name] = 'done'
+    
+    for name in stages:
+        visit(name, [])
+
+def select_stages(stages, only=None, skip=(), include=()):
+    """
+    Список этапов к запуску в порядке объявления.
+    only - запустить только эти этапы (их зависимости считаются уже выполненными),
+    include - добавить к этапам по умолчанию, skip - исключить вместе с зависимыми от них
+    """
+    for name in list(only or []) + list(skip) + list(include):
+        if name not in stages:
+            raise ValueError(f"Unknown stage: {name}. Available: {', '.join(stages)}")
+    
+    if only:
+        selected = set(only)
+    else:
+        selected = {name for name, item in stages.items() if item['default']} | set(include)
+    
+    excluded = set(skip)
+    changed = True
+    while changed:
+        changed = False
+        for name, item in stages.items():
+            if name not in excluded and excluded.intersection(item['depends_on']):
+                excluded.add(name)
+                changed = True
+    
+    return [name for name in stages if name in selected and name not in excluded]
+
+def run_stages(stages, only=None, skip=(), include=(), max_workers=4):
+    """
+    Выполняет выбранные этапы: этап стартует, как только завершились
+    все его зависимости из числа выбранных. Возвращает статусы этапов
+    """
+    check_stages(stages)
+    selected = select_stages(stages, only, skip, include)
+    statuses = {name: 'skipped' for name in stages}
+    pending = list(selected)
+    running = {}
+    started_at = time.perf_counter()
+    
+    print(f"Stages: {', '.join(selected) if selected else '(none)'}")
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for name in list(pending):
+                dependencies = [d for d in stages[name]['depends_on'] if d in selected]
+                if any(statuses[d] in ('failed', 'warning', 'upstream_failed') for d in dependencies):
+                    statuses[name] = 'upstream_failed'
+                    pending.remove(name)
+                    print(f"[{name}] skipped: upstream stage did not succeed")
+                elif all(statuses[d] == 'success' for d in dependencies):
+                    pending.remove(name)
+                    print(f"[{name}] started")
+                    running[executor.submit(stages[name]['func'])] = (name, time.perf_counter())
+            
+            if not running:
+                continue
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, stage_started = running.pop(future)
+                elapsed = time.perf_counter() - stage_started
+                try:
+                    future.result()
+                    statuses[name] = 'success'
+                    print(f"[{name}] finished in {elapsed:.1f}s")
+                except Exception as e:
+                    if stages[name]['critical']:
+                        statuses[name] = 'failed'
+                        print(f"[{name}] failed after {elapsed:.1f}s: {e}")
+                    else:
+                        statuses[name] = 'warning'
+                        print(f"[{name}] Warning: stage failed after {elapsed:.1f}s - {e}")
+    
+    print(f"\nStages finished in {time.perf_counter() - started_at:.1f}s")
+    for name in stages:
+        print(f"  {name:<12} {statuses[name]}")
+    
+    failed = [name for name in selected if statuses[name] == 'failed']
+    if failed:
+        raise RuntimeError(f"Pipeline stages failed: {', '.join(failed)}")
+    
+    return statuses
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import sys
+import hashlib
+from db_pool import get_pg_connection, release_pg_connection
+
+# Версионированные миграции схемы PostgreSQL. Единственный источник DDL - файлы sql/dds:
+#  - MIGRATIONS: таблицы, применяются один раз в порядке номеров. Изменение уже
+#    примененной таблицы - новая миграция (ALTER), а не правка старого файла;
+#  - REPEATABLE: функции и представления (CREATE OR REPLACE), применяются заново
+#    только при изменении файла.
+# Примененное записывается в s_sql_dds.t_schema_version. На актуальной базе
+# apply_migrations() выполняет два SELECT и не выполняет DDL и не берет блокировок.
+#   python schema_migrations.py            применить ожидающие миграции
+#   python schema_migrations.py --status   показать состояние без изменений
+
+# Каталог sql/ в корне репозитория
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'sql')
+
+VERSION_TABLE_FILE = 'dds/s_sql_dds/table/t_schema_version.sql'
+
+# (версия, описание, файлы)
+MIGRATIONS = [
+    (1, 'source tables', ['dds/s_sql_dds/table/t_sql_source.sql']),
+    (2, 'star schema', [
+        'dds/s_sql_dds/table/t_dim_tables.sql',
+        'dds/s_sql_dds/table/t_dm_task.sql',
+    ]),
+    (3, 'data quality results', [
+        'dds/s_sql_dds/table/t_dq_check_results.sql',
+        'dds/s_sql_dds/table/t_dq_runs.sql',
+    ]),
+    (4, 'data quality partition metrics', ['dds/s_sql_dds/table/t_dq_partition_metrics.sql']),
+    (5, 'column profiles', ['dds/s_sql_dds/table/t_column_profiles.sql']),
+    (6, 'pipeline runs and checkpoints', ['dds/s_sql_dds/table/t_pipeline_runs.sql']),
+    (7, 'plan captures', ['dds/s_sql_dds/table/t_plan_captures.sql']),
+    (8, 'micro-batch watermarks', ['dds/s_sql_dds/table/t_microbatch_watermarks.sql']),
+    (9, 'data quality metric value', ['dds/s_sql_dds/migration/V009_dq_check_results_metric_value.sql']),
+]
+
+# Функции и представления в порядке зависимостей; применяются после всех MIGRATIONS
+REPEATABLE = [
+    'dds/s_sql_dds/function/fn_etl_data_load.sql',
+    'dds/s_sql_dds/function/fn_dm_data_load.sql',
+    'dds/s_sql_dds/view/v_dm_task.sql',
+    'dds/s_sql_dds/function/fn_dq_runs.sql',
+    'dds/s_sql_dds/function/fn_dq_checks_load.sql',
+    'dds/s_sql_dds/function/fn_dq_checks_load_single_pass.sql',
+    'dds/s_sql_dds/function/fn_dq_refresh_partition_metrics.sql',
+    'dds/s_sql_dds/function/fn_dq_checks_load_incremental.sql',
+]
+
+# Ключ pg_advisory_lock: параллельные запуски (cron, soak, backfill) применяют миграции по очереди
+MIGRATION_LOCK_ID = 720049
+
+def execute_sql_file(cur, relative_path):
+    """
+    Выполняет SQL-файл из каталога sql/
+    """
+    with open(os.path.join(SQL_DIR, relative_path), encoding='utf-8') as f:
+        cur.execute(f.read())
+
+def files_checksum(files):
+    digest = hashlib.sha256()
+    for relative_path in files:
+        with open(os.path.join(SQL_DIR, relative_path), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def migration_plan():
+    """
+    Все миграции по порядку: (name, version, description, files, checksum)
+    """
+    plan = []
+    for version, description, files in MIGRATIONS:
+        plan.append((f"V{version:03d}", version, description, files, files_checksum(files)))
+    for relative_path in REPEATABLE:
+        plan.append((relative_path, None, 'repeatable', [relative_path], files_checksum([relative_path])))
+    return plan
+
+def read_applied(cur):
+    """
+    {name: checksum} примененных миграций; пусто, если таблицы версий еще нет
+    """
+    cur.execute("SELECT to_regclass('s_sql_dds.t_schema_version')")
+    if cur.fetchone()[0] is None:
+        return {}
+    cur.execute("SELECT name, checksum FROM s_sql_dds.t_schema_version")
+    return dict(cur.fetchall())
+
+def pending_migrations(applied, plan=None):
+    """
+    Миграции, которые нужно применить: новые версии и измененные повторяемые файлы
+    """
+    pending = []
+    for name, version, description, files, checksum in plan or migration_plan():
+        if name not in applied:
+            pending.append((name, version, description, files, checksum))
+        elif applied[name] != checksum:
+            if version is None:
+                pending.append((name, version, description, files, checksum))
+            else:
+                # Примененная версия не перезапускается: изменение схемы - новая миграция
+                print(f"Warning: migration {name} ({description}) was changed after it was applied")
+    return pending
+
+def apply_migrations():
+    """
+    Приводит схему к текущей версии. Возвращает имена примененных миграций
+    """
+    conn = None
+    try:
+        conn = get_pg_connection('init')
+        cur = conn.cursor()
+        plan = migration_plan()
+        pending = pending_migrations(read_applied(cur), plan)
+        conn.commit()
+        if not pending:
+            return []
+        
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        applied_names = []
+        try:
+            execute_sql_file(cur, VERSION_TABLE_FILE)
+            conn.commit()
+            # Пока ждали блокировку, миграции мог применить другой процесс
+            for name, version, description, files, checksum in pending_migrations(read_applied(cur), plan):
+                print(f"Применение {name} ({description})...")
+                # Каждая миграция - отдельная транзакция вместе с записью о ней
+                for relative_path in files:
+                    execute_sql_file(cur, relative_path)
+                cur.execute("""
+                    INSERT INTO s_sql_dds.t_schema_version (name, version, description, checksum)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (name) DO UPDATE
+                    SET checksum = EXCLUDED.checksum, applied_at = CURRENT_TIMESTAMP
+                """, (name, version, description, checksum))
+                conn.commit()
+                applied_names.append(name)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            # Блокировка уровня сессии: снимается явно, подключение возвращается в пул
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+        
+        print(f"Применено миграций: {len(applied_names)}")
+        return applied_names
+    
+    finally:
+        if conn is not None:
+            release_pg_connection(conn)
+
+def migration_status():
+    """
+    Печатает состояние каждой миграции без изменений в базе
+    """
+    conn = None
+    try:
+        conn = get_pg_connection()
+        applied = read_applied(conn.cursor())
+        for name, version, description, files, checksum in migration_plan():
+            if name not in applied:
+                state = 'pending'
+            elif applied[name] != checksum:
+                state = 'changed' if version is not None else 'pending'
+            else:
+                state = 'applied'
+            print(f"{state:<8} {name:<60} {description}")
+    finally:
+        if conn is not None:
+            release_pg_connection(conn)
+
+if __name__ == "__main__":
+    if '--status' in sys.argv[1:]:
+        migration_status()
+    else:
+        apply_migrations()
\ No newline at end of file
@@ -0,0 +1,43 @@
+import time
+import importlib
+from metrics import span
+
+# Приемники миграции v_dm_task: имя -> (модуль, функция).
+# Функция приемника принимает (start_dt, end_dt, **options) и сама читает v_dm_task.
+# Модуль импортируется только при выборе приемника, поэтому выгрузка в файлы
+# не требует pymysql, а миграция в MySQL - pyarrow.
+# Все приемники, включая MySQL, запускаются через run_sink: повторные попытки
+# и спан migrate.sink общие для всех
+SINKS = {
+    'mysql': ('migrate_to_mysql', 'mysql_sink'),
+    'columnar': ('export_to_columnar', 'export_to_columnar'),
+}
+
+def register_sink(name, module_name, function_name):
+    """
+    Регистрирует новый приемник миграции
+    """
+    SINKS[name] = (module_name, function_name)
+
+def run_sink(name, start_dt=None, end_dt=None, retries=3, **options):
+    """
+    Запускает миграцию v_dm_task в приемник name. Упавшая миграция повторяется
+    с нарастающей паузой: приемники перезаписывают окно, поэтому повтор безопасен
+    """
+    if name not in SINKS:
+        raise ValueError(f"Unknown sink: {name}. Available: {', '.join(sorted(SINKS))}")
+    
+    module_name, function_name = SINKS[name]
+    sink = getattr(importlib.import_module(module_name), function_name)
+    for attempt in range(1, retries + 1):
+        try:
+            with span('migrate.sink', sink=name, attempt=attempt) as current:
+                result = sink(start_dt, end_dt, **options)
+                if isinstance(result, int):
+                    current.set(rows=result)
+            return result
+        except Exception as e:
+            print(f"Sink {name} failed on attempt {attempt}/{retries}: {e}")
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
\ No newline at end of file
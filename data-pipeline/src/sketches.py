@@ -0,0 +1,258 @@
+import math
+import hashlib
+
+# Объединяемые скетчи для профилирования колонок: HyperLogLog (число уникальных)
+# и KLL (квантили). Скетчи двух батчей объединяются без повторного чтения данных
+
+def stable_hash(value):
+    """
+    64-битный хеш, не зависящий от PYTHONHASHSEED
+    """
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+class HyperLogLog:
+    """
+    Оценка числа уникальных значений с относительной ошибкой ~1.04 / sqrt(2 ** precision)
+    """
+    
+    def __init__(self, precision=12, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"precision должен быть от 4 до 16: {precision}")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+    
+    def add(self, value):
+        h = stable_hash(value)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Нельзя объединить HyperLogLog с разной точностью")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+    
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Поправка для малых кардинальностей (linear counting)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+    
+    def to_bytes(self):
+        return bytes([self.precision]) + bytes(self.registers)
+    
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        return cls(precision=data[0], registers=data[1:])
+
+class KLLSketch:
+    """
+    Квантильный скетч KLL: уровень h хранит элементы с весом 2 ** h,
+    при переполнении уровня половина его элементов поднимается выше
+    """
+    
+    def __init__(self, k=200, c=2 / 3):
+        self.k = k
+        self.c = c
+        self.compactors = [[]]
+        self.offsets = [0]
+        self.count = 0
+    
+    def _capacity(self, level):
+        height = len(self.compactors)
+        return int(math.ceil(self.k * self.c ** (height - level - 1))) + 1
+    
+    def _size(self):
+        return sum(len(compactor) for compactor in self.compactors)
+    
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+    
+    def add(self, value):
+        self.compactors[0].append(float(value))
+        self.count += 1
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+    
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for level in range(len(self.compactors)):
+                if len(self.compactors[level]) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                        self.offsets.append(0)
+                    items = sorted(self.compactors[level])
+                    # При нечетном числе элементов последний остается на уровне
+                    kept = [items.pop()] if len(items) % 2 else []
+                    # Смещение чередуется, чтобы ошибка округления не накапливалась в одну сторону
+                    offset = self.offsets[level]
+                    self.offsets[level] = 1 - offset
+                    self.compactors[level + 1].extend(items[offset::2])
+                    self.compactors[level] = kept
+                    break
+    
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+            self.offsets.append(0)
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        self._compress()
+        return self
+    
+    def _weighted_items(self):
+        items = [
+            (value, 1 << level)
+            for level, compactor in enumerate(self.compactors)
+            for value in compactor
+        ]
+        items.sort()
+        return items
+    
+    def rank(self, value):
+        """
+        Доля элементов <= value
+        """
+        items = self._weighted_items()
+        total = sum(weight for _, weight in items)
+        if not total:
+            return None
+        return sum(weight for item, weight in items if item <= value) / total
+    
+    def quantile(self, q):
+        items = self._weighted_items()
+        total = sum(weight for _, weight in items)
+        if not total:
+            return None
+        target = q * total
+        cumulative = 0
+        for value, weight in items:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return items[-1][0]
+    
+    def to_dict(self):
+        return {'k': self.k, 'c': self.c, 'count': self.count,
+                'offsets': self.offsets, 'compactors': self.compactors}
+    
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(k=data['k'], c=data['c'])
+        sketch.count = data['count']
+        sketch.offsets = list(data['offsets'])
+        sketch.compactors = [list(map(float, compactor)) for compactor in data['compactors']]
+        return sketch
+
+def ks_distance(sketch_a, sketch_b):
+    """
+    Статистика Колмогорова-Смирнова по двум KLL-скетчам:
+    максимальная разница эмпирических функций распределения
+    """
+    items_a = sketch_a._weighted_items()
+    items_b = sketch_b._weighted_items()
+    total_a = sum(weight for _, weight in items_a)
+    total_b = sum(weight for _, weight in items_b)
+    if not total_a or not total_b:
+        return None
+    
+    # Один проход по обоим отсортированным наборам
+    i = j = 0
+    cdf_a = cdf_b = 0
+    distance = 0.0
+    while i < len(items_a) or j < len(items_b):
+        if j == len(items_b) or (i < len(items_a) and items_a[i][0] <= items_b[j][0]):
+            point = items_a[i][0]
+        else:
+            point = items_b[j][0]
+        while i < len(items_a) and items_a[i][0] <= point:
+            cdf_a += items_a[i][1]
+            i += 1
+        while j < len(items_b) and items_b[j][0] <= point:
+            cdf_b += items_b[j][1]
+            j += 1
+        distance = max(distance, abs(cdf_a / total_a - cdf_b / total_b))
+    return distance
+
+class ColumnProfile:
+    """
+    Профиль колонки за батч: число строк и NULL, min/max, HyperLogLog
+    и (для числовых колонок) KLL. Профили объединяются через merge
+    """
+    
+    def __init__(self, numeric=False, hll_precision=12, kll_k=200):
+        self.numeric = numeric
+        self.row_count = 0
+        self.null_count = 0
+        self.min_value = None
+        self.max_value = None
+        self.hll = HyperLogLog(hll_precision)
+        self.kll = KLLSketch(kll_k) if numeric else None
+    
+    def _normalize(self, value):
+        # Числа сравниваются как числа, остальное (даты, строки) - как ISO-строки
+        return float(value) if self.numeric else str(value)
+    
+    def add(self, value):
+        self.row_count += 1
+        if value is None:
+            self.null_count += 1
+            return
+        value = self._normalize(value)
+        self.hll.add(value)
+        if self.kll is not None:
+            self.kll.add(value)
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if self.max_value is None or value > self.max_value:
+            self.max_value = value
+    
+    def merge(self, other):
+        self.row_count += other.row_count
+        self.null_count += other.null_count
+        for value in (other.min_value, other.max_value):
+            if value is None:
+                continue
+            if self.min_value is None or value < self.min_value:
+                self.min_value = value
+            if self.max_value is None or value > self.max_value:
+                self.max_value = value
+        self.hll.merge(other.hll)
+        if self.kll is not None and other.kll is not None:
+            self.kll.merge(other.kll)
+        return self
+    
+    @property
+    def null_rate(self):
+        return self.null_count / self.row_count if self.row_count else None
+    
+    def distinct_estimate(self):
+        return self.hll.count()
+
+def compare_profiles(current, baseline):
+    """
+    Метрики дрейфа текущего профиля относительно базового
+    """
+    drift = {
+        'null_rate_delta': None,
+        'ks_distance': None,
+        'median_shift': None,
+    }
+    if current.null_rate is not None and baseline.null_rate is not None:
+        drift['null_rate_delta'] = current.null_rate - baseline.null_rate
+    if current.kll is not None and baseline.kll is not None:
+        drift['ks_distance'] = ks_distance(current.kll, baseline.kll)
+        current_median = current.kll.quantile(0.5)
+        baseline_median = baseline.kll.quantile(0.5)
+        if current_median is not None and baseline_median:
+            drift['median_shift'] = (current_median - baseline_median) / abs(baseline_median)
+    return drift
\ No newline at end of file
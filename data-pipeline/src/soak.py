@@ -0,0 +1,377 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from config import METRICS_DIR
+from db_pool import get_pg_connection, release_pg_connection
+from init_database import init_database
+from get_dataset import get_dataset
+from load_data_to_db import load_data_to_db
+from chunk_dq import DataQualityError
+from migrate_to_mysql import migrate_to_mysql_delta
+from sketches import KLLSketch
+
+# Длительная нагрузка микро-батчами (main.py --soak): поток приема генерирует батчи
+# get_dataset с заданной скоростью и дописывает их в t_sql_source_unstructured, а цикл
+# обработки инкрементально очищает, загружает в витрину и переносит в MySQL только новые
+# строки (водяные знаки t_microbatch_watermarks и t_dm_migration_watermark).
+# Каждые report_interval секунд печатаются задержка от плановой отправки батча до конца
+# миграции, перцентили длительности этапов и отставание. Скорости из --rate=500,1000,2000
+# проходятся по очереди: на пределе пропускной способности отставание начинает расти,
+# а загрузка (доля занятого времени) потока приема или цикла обработки подходит к 100%
+
+BATCH_INTERVAL = 1.0
+REPORT_INTERVAL = 10.0
+IDLE_SLEEP = 0.2
+PERCENTILES = (0.5, 0.95, 0.99)
+STAGES = ['ingest', 'cleanse', 'dm_load', 'migrate']
+
+# Ступень считается устойчивой, если к концу отставание не больше стольких батчей
+SUSTAINABLE_BACKLOG_BATCHES = 2
+
+class SoakStats:
+    """
+    Статистика одной ступени нагрузки. Поток приема добавляет батчи,
+    цикл обработки забирает их и отмечает задержку
+    """
+    
+    def __init__(self, rate, batch_interval=BATCH_INTERVAL):
+        self.rate = rate
+        self.batch_interval = batch_interval
+        self.batch_rows = max(1, int(round(rate * batch_interval)))
+        self.started = time.time()
+        self.latency = {name: KLLSketch() for name in STAGES}
+        self.busy = {name: 0.0 for name in STAGES}
+        self.errors = {name: 0 for name in STAGES}
+        self.lag = KLLSketch()
+        self.max_lag = 0.0
+        self.pending = []
+        self.batches_ingested = 0
+        self.rejected_batches = 0
+        self.ingested_rows = 0
+        self.processed_rows = 0
+        self.cleansed_rows = 0
+        self.fact_rows = 0
+        self.migrated_rows = 0
+        self._lock = threading.Lock()
+    
+    def due_at(self, batch_no):
+        return self.started + batch_no * self.batch_interval
+    
+    def record_stage(self, name, duration, failed=False):
+        with self._lock:
+            self.latency[name].add(duration)
+            self.busy[name] += duration
+            if failed:
+                self.errors[name] += 1
+    
+    def batch_loaded(self, due_at, rows):
+        with self._lock:
+            self.batches_ingested += 1
+            self.ingested_rows += rows
+            self.pending.append((due_at, time.time(), rows))
+    
+    def batch_rejected(self):
+        with self._lock:
+            self.batches_ingested += 1
+            self.rejected_batches += 1
+    
+    def take_pending(self, before):
+        """
+        Батчи, зафиксированные до начала цикла: функции очистки их уже видят
+        """
+        with self._lock:
+            taken = [batch for batch in self.pending if batch[1] <= before]
+            self.pending = [batch for batch in self.pending if batch[1] > before]
+        return taken
+    
+    def add_rows(self, name, rows):
+        with self._lock:
+            if name == 'cleanse':
+                self.cleansed_rows += rows
+            elif name == 'dm_load':
+                self.fact_rows += rows
+            else:
+                self.migrated_rows += rows
+    
+    def batches_done(self, batches, finished_at):
+        with self._lock:
+            for due_at, _, rows in batches:
+                lag = finished_at - due_at
+                self.lag.add(lag)
+                self.max_lag = max(self.max_lag, lag)
+                self.processed_rows += rows
+    
+    def snapshot(self, now=None):
+        """
+        Текущие показатели ступени для отчета
+        """
+        now = time.time() if now is None else now
+        elapsed = max(now - self.started, 1e-9)
+        with self._lock:
+            # Батчи, которые по расписанию уже должны были поступить, но поток приема не успел
+            # (последний батч по расписанию может еще загружаться и отставанием не считается)
+            behind = max(0, int(elapsed // self.batch_interval) - self.batches_ingested)
+            pending_rows = sum(rows for _, _, rows in self.pending)
+            return {
+                'rate': self.rate,
+                'elapsed_s': round(elapsed, 1),
+                'batch_rows': self.batch_rows,
+                'ingested_rows': self.ingested_rows,
+                'ingest_rows_per_s': round(self.ingested_rows / elapsed, 1),
+                'processed_rows': self.processed_rows,
+                'processed_rows_per_s': round(self.processed_rows / elapsed, 1),
+                'cleansed_rows': self.cleansed_rows,
+                'fact_rows': self.fact_rows,
+                'migrated_rows': self.migrated_rows,
+                'rejected_batches': self.rejected_batches,
+                'backlog_rows': pending_rows + behind * self.batch_rows,
+                'backlog_batches': len(self.pending) + behind,
+                'ingest_behind_batches': behind,
+                'lag_s': _quantiles(self.lag),
+                'max_lag_s': round(self.max_lag, 3),
+                'stage_latency_s': {name: _quantiles(sketch) for name, sketch in self.latency.items()},
+                'utilization': {
+                    'ingest': round(self.busy['ingest'] / elapsed, 3),
+                    'processing': round(sum(self.busy[name] for name in STAGES[1:]) / elapsed, 3),
+                },
+                'errors': dict(self.errors),
+            }
+
+def _quantiles(sketch):
+    return {f"p{int(q * 100)}": (None if sketch.count == 0 else round(sketch.quantile(q), 3))
+            for q in PERCENTILES}
+
+def _seconds(value):
+    return '-' if value is None else f"{value:.2f}s"
+
+def format_snapshot(snapshot):
+    lag = snapshot['lag_s']
+    stages = ' '.join(
+        f"{name} {_seconds(latency['p50'])}/{_seconds(latency['p95'])}/{_seconds(latency['p99'])}"
+        for name, latency in snapshot['stage_latency_s'].items()
+    )
+    return (f"[soak {snapshot['rate']} rows/s t={snapshot['elapsed_s']:.0f}s] "
+            f"ingested {snapshot['ingest_rows_per_s']:.0f} rows/s, processed {snapshot['processed_rows_per_s']:.0f} rows/s, "
+            f"backlog {snapshot['backlog_rows']} rows ({snapshot['backlog_batches']} batches), "
+            f"lag p50 {_seconds(lag['p50'])} p95 {_seconds(lag['p95'])} max {_seconds(snapshot['max_lag_s'])}, "
+            f"utilization ingest {snapshot['utilization']['ingest']:.0%} processing {snapshot['utilization']['processing']:.0%}; "
+            f"stage p50/p95/p99: {stages}")
+
+def verdict(snapshot):
+    """
+    Устойчива ли ступень и что ограничивает пропускную способность
+    """
+    sustainable = snapshot['backlog_batches'] <= SUSTAINABLE_BACKLOG_BATCHES
+    utilization = snapshot['utilization']
+    if sustainable:
+        return {'sustainable': True, 'bottleneck': None}
+    if utilization['ingest'] >= utilization['processing']:
+        return {'sustainable': False, 'bottleneck': 'ingest'}
+    # Самый долгий этап цикла обработки
+    busiest = max(STAGES[1:], key=lambda name: snapshot['stage_latency_s'][name]['p50'] or 0)
+    return {'sustainable': False, 'bottleneck': busiest}
+
+def reset_watermarks():
+    """
+    Водяные знаки на текущий конец таблиц: ступень обрабатывает только свои батчи
+    """
+    conn = None
+    try:
+        conn = get_pg_connection('soak')
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO s_sql_dds.t_microbatch_watermarks (stage, last_row_id)
+            SELECT 'cleanse', COALESCE(MAX(id), 0) FROM s_sql_dds.t_sql_source_unstructured
+            UNION ALL
+            SELECT 'dm_load', COALESCE(MAX(id), 0) FROM s_sql_dds.t_sql_source_structured
+            ON CONFLICT (stage) DO UPDATE
+            SET last_row_id = EXCLUDED.last_row_id, updated_at = CURRENT_TIMESTAMP
+        """)
+        conn.commit()
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+# Инкрементальные этапы: водяной знак, таблица-источник его id и вызов функции
+# загрузки для диапазона id (from_id, to_id]; функция возвращает число строк
+INCREMENTAL_STAGES = {
+    'cleanse': ('t_sql_source_unstructured',
+                "SELECT s_sql_dds.fn_etl_data_load(from_id => %s, to_id => %s)"),
+    'dm_load': ('t_sql_source_structured',
+                "SELECT rows_affected FROM s_sql_dds.fn_dm_data_load(from_id => %s, to_id => %s) "
+                "WHERE step = 'fact_insert'"),
+}
+
+def run_incremental(stage, pool_stage):
+    """
+    Обрабатывает строки источника с id больше водяного знака и сдвигает знак
+    в той же транзакции, возвращает число обработанных строк
+    """
+    source_table, load_query = INCREMENTAL_STAGES[stage]
+    conn = None
+    try:
+        conn = get_pg_connection(pool_stage)
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO s_sql_dds.t_microbatch_watermarks (stage) VALUES (%s)
+            ON CONFLICT (stage) DO NOTHING
+        """, (stage,))
+        # Блокировка строки знака: параллельный вызов дождется конца этой транзакции.
+        # Загрузчик фиксирует батчи по одному, поэтому строки с меньшими id уже видны
+        cur.execute("""
+            SELECT last_row_id FROM s_sql_dds.t_microbatch_watermarks
+            WHERE stage = %s FOR UPDATE
+        """, (stage,))
+        watermark = cur.fetchone()[0]
+        cur.execute(f"SELECT MAX(id) FROM s_sql_dds.{source_table}")
+        max_id = cur.fetchone()[0]
+        
+        rows_affected = 0
+        if max_id is not None and max_id > watermark:
+            cur.execute(load_query, (watermark, max_id))
+            rows_affected = cur.fetchone()[0]
+            cur.execute("""
+                UPDATE s_sql_dds.t_microbatch_watermarks
+                SET last_row_id = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE stage = %s
+            """, (max_id, stage))
+        conn.commit()
+        return rows_affected
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            release_pg_connection(conn)
+
+def ingest_loop(stats, stop, seed=None):
+    """
+    Поток приема: батч batch_rows строк каждые batch_interval секунд. Отставший поток
+    не пропускает батчи, а отправляет их подряд - отставание видно в отчете
+    """
+    batch_no = 0
+    while not stop.is_set():
+        due_at = stats.due_at(batch_no)
+        delay = due_at - time.time()
+        if delay > 0 and stop.wait(delay):
+            break
+        started = time.perf_counter()
+        failed = False
+        try:
+            df = get_dataset(rows=stats.batch_rows, seed=None if seed is None else seed + batch_no)
+            loaded = load_data_to_db(df, append=True, bulk=True)
+            # load_data_to_db возвращает 0 при ошибке базы
+            failed = loaded == 0
+            if not failed:
+                stats.batch_loaded(due_at, loaded)
+        except DataQualityError:
+            stats.batch_rejected()
+        except Exception as e:
+            failed = True
+            print(f"[soak] ingest failed: {e}")
+        stats.record_stage('ingest', time.perf_counter() - started, failed)
+        batch_no += 1
+
+def process_cycle(stats, skip_migrate=False):
+    """
+    Один цикл обработки всех поступивших батчей. False - обрабатывать было нечего
+    """
+    batches = stats.take_pending(time.time())
+    if not batches:
+        return False
+    
+    for name, func in (
+        ('cleanse', lambda: run_incremental('cleanse', 'transform')),
+        ('dm_load', lambda: run_incremental('dm_load', 'dm_load')),
+        ('migrate', migrate_to_mysql_delta),
+    ):
+        if name == 'migrate' and skip_migrate:
+            continue
+        started = time.perf_counter()
+        try:
+            rows = func()
+        except Exception as e:
+            stats.record_stage(name, time.perf_counter() - started, failed=True)
+            # Ошибка миграции не останавливает нагрузку, как и в обычном запуске
+            if name != 'migrate':
+                raise
+            if stats.errors['migrate'] == 1:
+                print(f"[soak] migrate failed, continuing without it: {e}")
+            continue
+        stats.record_stage(name, time.perf_counter() - started)
+        stats.add_rows(name, rows)
+    
+    stats.batches_done(batches, time.time())
+    return True
+
+def run_step(rate, duration, batch_interval=BATCH_INTERVAL, report_interval=REPORT_INTERVAL,
+             skip_migrate=False, seed=None):
+    """
+    Одна ступень нагрузки с постоянной скоростью; возвращает итоговые показатели
+    """
+    reset_watermarks()
+    stats = SoakStats(rate, batch_interval)
+    stop = threading.Event()
+    ingest = threading.Thread(target=ingest_loop, args=(stats, stop, seed), daemon=True)
+    print(f"\n=== Soak step: {rate} rows/s in batches of {stats.batch_rows} rows "
+          f"every {batch_interval}s for {duration}s ===")
+    ingest.start()
+    
+    next_report = stats.started + report_interval
+    try:
+        while duration is None or time.time() - stats.started < duration:
+            if not process_cycle(stats, skip_migrate):
+                time.sleep(IDLE_SLEEP)
+            if time.time() >= next_report:
+                print(format_snapshot(stats.snapshot()))
+                next_report += report_interval
+    finally:
+        stop.set()
+        ingest.join()
+    
+    snapshot = stats.snapshot()
+    snapshot.update(verdict(snapshot))
+    print(format_snapshot(snapshot))
+    return snapshot
+
+def run_soak(rates, duration=60, batch_interval=BATCH_INTERVAL, report_interval=REPORT_INTERVAL,
+             skip_migrate=False, seed=None):
+    """
+    Ступени нагрузки по очереди; Ctrl+C завершает текущую ступень и печатает итог
+    """
+    init_database()
+    if not skip_migrate:
+        # Факты прошлых запусков переносятся до замеров, чтобы не попасть в первый цикл
+        try:
+            migrate_to_mysql_delta()
+        except Exception as e:
+            print(f"[soak] initial migration failed: {e}")
+    
+    steps = []
+    try:
+        for rate in rates:
+            steps.append(run_step(rate, duration, batch_interval, report_interval, skip_migrate, seed))
+    except KeyboardInterrupt:
+        print("\n[soak] interrupted")
+    
+    print(f"\n{'rate':>8} {'ingest/s':>10} {'processed/s':>12} {'backlog':>9} {'lag p95':>8} "
+          f"{'max lag':>8}  result")
+    for step in steps:
+        result = 'sustainable' if step['sustainable'] else f"saturated ({step['bottleneck']})"
+        print(f"{step['rate']:>8} {step['ingest_rows_per_s']:>10.0f} {step['processed_rows_per_s']:>12.0f} "
+              f"{step['backlog_rows']:>9} {_seconds(step['lag_s']['p95']):>8} {_seconds(step['max_lag_s']):>8}  {result}")
+    sustainable = [step['rate'] for step in steps if step['sustainable']]
+    if sustainable:
+        print(f"Highest sustainable rate: {max(sustainable)} rows/s")
+    
+    if METRICS_DIR and steps:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"soak_{datetime.now():%Y%m%d_%H%M%S}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'created_at': datetime.now().isoformat(timespec='seconds'),
+                       'batch_interval_s': batch_interval, 'duration_s': duration, 'steps': steps}, f, indent=2)
+        print(f"Soak results saved to {path}")
+    return steps
\ No newline at end of file
@@ -0,0 +1,288 @@
+import os
+import sqlite3
+import threading
+from config import SQLITE_PATH, SQLITE_DWH_PATH
+from get_dataset import get_dataset
+from chunk_dq import BatchDQReport, DataQualityError
+from metrics import span
+
+# Встроенный бэкенд SQLite: весь пайплайн в процессе, без PostgreSQL и MySQL.
+# Логика очистки, загрузки витрины и проверок качества - аналоги plpgsql-функций
+# в sql/sqlite, целевая таблица MySQL заменена таблицей dwh.t_dm_task в отдельной
+# подключенной базе. SQLITE_PATH=':memory:' держит обе базы в памяти процесса (тесты)
+
+SQLITE_SQL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'sql', 'sqlite'
+)
+
+INSERT_SOURCE_QUERY = """
+    INSERT INTO t_sql_source_unstructured
+    (user_id, user_name, age, salary, purchase_amount, product_category,
+     region, customer_status, transaction_count, effective_from, effective_to, current_flag)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SOURCE_COLUMNS = [
+    'user_id', 'user_name', 'age', 'salary', 'purchase_amount', 'product_category',
+    'region', 'customer_status', 'transaction_count', 'effective_from', 'effective_to', 'current_flag',
+]
+
+# База в памяти живет, пока открыто хотя бы одно подключение к ней
+_keep_alive = []
+_lock = threading.Lock()
+
+def _database_uri(path, name):
+    if path == ':memory:':
+        return f"file:{name}?mode=memory&cache=shared"
+    return f"file:{os.path.abspath(path)}"
+
+def _open():
+    conn = sqlite3.connect(_database_uri(SQLITE_PATH, 'etl'), uri=True, timeout=30)
+    # Для базы в памяти dwh тоже в памяти, иначе - отдельный файл SQLITE_DWH_PATH
+    dwh_path = ':memory:' if SQLITE_PATH == ':memory:' else SQLITE_DWH_PATH
+    conn.execute("ATTACH DATABASE ? AS dwh", (_database_uri(dwh_path, 'etl_dwh'),))
+    return conn
+
+def connect():
+    """
+    Подключение к базе SQLite с подключенной базой dwh (замена MySQL).
+    Каждый этап открывает свое подключение: этапы выполняются в разных потоках
+    """
+    with _lock:
+        if SQLITE_PATH == ':memory:' and not _keep_alive:
+            _keep_alive.append(_open())
+    return _open()
+
+def close_all():
+    """
+    Закрывает служебные подключения: база в памяти после этого удаляется
+    """
+    with _lock:
+        while _keep_alive:
+            _keep_alive.pop().close()
+
+def sql_statements(name):
+    """
+    Запросы файла sql/sqlite/<name> по одному: (шаг из комментария '-- step:', запрос)
+    """
+    with open(os.path.join(SQLITE_SQL_DIR, name), encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    
+    step = None
+    statement = []
+    for line in lines:
+        if line.startswith('-- step:'):
+            step = line.split(':', 1)[1].strip()
+            continue
+        if not statement and (not line.strip() or line.startswith('--')):
+            continue
+        statement.append(line)
+        text = '\n'.join(statement)
+        if sqlite3.complete_statement(text):
+            yield step, text
+            step = None
+            statement = []
+
+def init_database():
+    conn = connect()
+    try:
+        with open(os.path.join(SQLITE_SQL_DIR, 'schema.sql'), encoding='utf-8') as f:
+            conn.executescript(f.read())
+        conn.commit()
+        print(f"SQLite database initialized ({SQLITE_PATH})")
+    finally:
+        conn.close()
+
+def _source_rows(chunk):
+    # Типы numpy и pandas -> типы sqlite3, NaN -> NULL, даты -> строки ISO
+    rows = chunk[SOURCE_COLUMNS].astype(object).where(chunk[SOURCE_COLUMNS].notna(), None)
+    for column in ('effective_from', 'effective_to'):
+        rows[column] = [value.strftime('%Y-%m-%d') if value is not None else None for value in rows[column]]
+    for column in ('age', 'transaction_count', 'current_flag'):
+        rows[column] = [int(value) if value is not None else None for value in rows[column]]
+    for column in ('salary', 'purchase_amount'):
+        rows[column] = [round(float(value), 2) if value is not None else None for value in rows[column]]
+    return list(rows.itertuples(index=False, name=None))
+
+def load_data_to_db(df, chunk_size=500, dq_report=None, run_id=None, append=False, bulk=False):
+    """
+    Загрузка в t_sql_source_unstructured чанками с теми же проверками chunk_dq,
+    что и в load_data_to_db.py. run_id не используется: контрольных точек в SQLite нет,
+    bulk тоже: чанк и так вставляется одним executemany
+    """
+    report = BatchDQReport() if dq_report is None else dq_report
+    conn = connect()
+    try:
+        if not append:
+            conn.execute("DELETE FROM t_sql_source_unstructured")
+        loaded = 0
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            report.add_chunk(chunk)
+            conn.executemany(INSERT_SOURCE_QUERY, _source_rows(chunk))
+            loaded += len(chunk)
+        conn.commit()
+        print(f"Успешно загружено {loaded} из {len(df)} записей в t_sql_source_unstructured")
+        report.print_summary()
+        return loaded
+    
+    except DataQualityError as e:
+        print(f"Проверка качества данных не пройдена: {e}")
+        conn.rollback()
+        e.report.print_summary()
+        raise
+    finally:
+        conn.close()
+
+def fill_structured_table(start_date='2023-01-01', end_date='2023-12-31'):
+    conn = connect()
+    try:
+        processed_count = 0
+        for step, statement in sql_statements('etl_data_load.sql'):
+            cursor = conn.execute(statement, {'start_date': start_date, 'end_date': end_date})
+            if step == 'cleanse':
+                processed_count = cursor.rowcount
+        conn.commit()
+        print(f"Успешно обработано {processed_count} записей в t_sql_source_structured")
+        return processed_count
+    finally:
+        conn.close()
+
+def etl(rows=1000, seed=None, run_id=None, start_date='2023-01-01', end_date='2023-12-31'):
+    """
+    ETL на SQLite: те же шаги и спаны, что и etl.etl
+    """
+    print("Запуск ETL процесса (SQLite)...")
+    init_database()
+    
+    with span('etl.generate') as current:
+        df = get_dataset(rows=rows, seed=seed)
+        df_bytes = int(df.memory_usage(deep=True).sum())
+        current.set(rows=len(df), bytes=df_bytes)
+    
+    with span('etl.load') as current:
+        loaded_count = load_data_to_db(df)
+        current.set(rows=loaded_count, bytes=df_bytes)
+    
+    with span('etl.cleanse') as current:
+        current.set(rows=fill_structured_table(start_date=start_date, end_date=end_date))
+    print("ETL процесс завершен успешно!")
+
+def fill_dm_table(start_dt=None, end_dt=None):
+    """
+    Загрузка справочников и фактов; возвращает число строк по шагам, как fill_dm_table.py
+    """
+    conn = connect()
+    try:
+        steps = {}
+        for step, statement in sql_statements('dm_data_load.sql'):
+            with span(f"dm_load.{step}") as current:
+                cursor = conn.execute(statement, {'start_dt': start_dt, 'end_dt': end_dt})
+                current.set(rows=cursor.rowcount)
+            steps[step] = cursor.rowcount
+        conn.commit()
+        
+        fact_count = conn.execute("SELECT COUNT(*) FROM t_dm_task").fetchone()[0]
+        print(f"DWH data loaded successfully! Fact records: {fact_count}")
+        return steps
+    finally:
+        conn.close()
+
+def reset_dm_facts():
+    conn = connect()
+    try:
+        conn.execute("DELETE FROM t_dm_task")
+        conn.commit()
+    finally:
+        conn.close()
+
+def run_data_quality_checks(start_dt=None, end_dt=None, mode='per_check'):
+    """
+    Проверки качества витрины отдельным запуском в t_dq_runs.
+    Режимы single_pass и incremental в SQLite не реализованы - выполняется per_check
+    """
+    if mode != 'per_check':
+        print(f"DQ mode {mode} is not available on SQLite, running per_check")
+    conn = connect()
+    try:
+        run_id = conn.execute(
+            "INSERT INTO t_dq_runs (mode, start_dt, end_dt) VALUES (?, ?, ?)", ('per_check', start_dt, end_dt)
+        ).lastrowid
+        params = {'run_id': run_id, 'start_dt': start_dt, 'end_dt': end_dt}
+        
+        with span('dq.checks', mode='per_check', dq_run_id=run_id) as current:
+            for step, statement in sql_statements('dq_checks_load.sql'):
+                try:
+                    conn.execute("SAVEPOINT dq_check")
+                    conn.execute(statement, params)
+                    conn.execute("RELEASE dq_check")
+                except sqlite3.Error as e:
+                    # Как EXCEPTION WHEN OTHERS в fn_dq_checks_load: ошибка одной проверки не прерывает остальные
+                    conn.execute("ROLLBACK TO dq_check")
+                    conn.execute("RELEASE dq_check")
+                    conn.execute("""
+                        INSERT INTO t_dq_check_results (run_id, check_type, table_name, check_name, status, error_message)
+                        VALUES (?, 'error', 'v_dm_task', ?, 'error', ?)
+                    """, (run_id, step, f"Error: {e}"))
+            
+            conn.execute("""
+                UPDATE t_dq_runs
+                SET finished_at = CURRENT_TIMESTAMP,
+                    total_checks = (SELECT COUNT(*) FROM t_dq_check_results
+                                    WHERE run_id = :run_id AND check_type != 'summary'),
+                    passed_checks = (SELECT COUNT(*) FROM t_dq_check_results
+                                     WHERE run_id = :run_id AND check_type != 'summary' AND status = 'passed'),
+                    failed_checks = (SELECT COUNT(*) FROM t_dq_check_results
+                                     WHERE run_id = :run_id AND check_type != 'summary' AND status = 'failed'),
+                    error_checks = (SELECT COUNT(*) FROM t_dq_check_results
+                                    WHERE run_id = :run_id AND check_type != 'summary' AND status = 'error')
+                WHERE run_id = :run_id
+            """, {'run_id': run_id})
+            conn.execute("""
+                UPDATE t_dq_runs
+                SET status = CASE WHEN failed_checks = 0 AND error_checks = 0 THEN 'passed' ELSE 'failed' END
+                WHERE run_id = ?
+            """, (run_id,))
+            conn.commit()
+            current.set(rows=conn.execute("SELECT total_checks FROM t_dq_runs WHERE run_id = ?",
+                                          (run_id,)).fetchone()[0])
+        
+        results = conn.execute("""
+            SELECT check_name, status, error_message
+            FROM t_dq_check_results
+            WHERE run_id = ?
+            ORDER BY check_id
+        """, (run_id,)).fetchall()
+        for check_name, status, error_message in results:
+            print(f"[{status.upper()}] {check_name}: {error_message}")
+        return run_id
+    finally:
+        conn.close()
+
+def migrate(start_dt=None, end_dt=None, **options):
+    """
+    Перенос v_dm_task в dwh.t_dm_task - замена миграции в MySQL (окно перезаписывается)
+    """
+    conn = connect()
+    try:
+        with span('migrate.target') as current:
+            conn.execute("""
+                DELETE FROM dwh.t_dm_task
+                WHERE (:start_dt IS NULL OR effective_from >= :start_dt)
+                  AND (:end_dt IS NULL OR effective_to <= :end_dt)
+            """, {'start_dt': start_dt, 'end_dt': end_dt})
+            cursor = conn.execute("""
+                INSERT INTO dwh.t_dm_task
+                SELECT fact_id, customer_id, product_id, region_id, status_id,
+                       age, salary, purchase_amount, transaction_count,
+                       effective_from, effective_to, current_flag, created_dt
+                FROM v_dm_task
+                WHERE (:start_dt IS NULL OR effective_from >= :start_dt)
+                  AND (:end_dt IS NULL OR effective_to <= :end_dt)
+            """, {'start_dt': start_dt, 'end_dt': end_dt})
+            conn.commit()
+            current.set(rows=cursor.rowcount)
+        print(f"Migrated {cursor.rowcount} records to SQLite dwh.t_dm_task")
+        return cursor.rowcount
+    finally:
+        conn.close()
\ No newline at end of file
@@ -0,0 +1,162 @@
+from db_pool import get_pg_connection, release_pg_connection, get_mysql_connection, release_mysql_connection
+from migrate_to_mysql import copy_fact_range
+
+# Хэш строки считается на стороне СУБД: первые 32 бита MD5 от текстового представления строки.
+# Представление строится одинаково в PostgreSQL и MySQL, NULL кодируется как 'N'.
+PG_ROW_TEXT = """
+    CONCAT_WS('|',
+        fact_id::TEXT,
+        COALESCE(customer_id::TEXT, 'N'),
+        COALESCE(product_id::TEXT, 'N'),
+        COALESCE(region_id::TEXT, 'N'),
+        COALESCE(status_id::TEXT, 'N'),
+        COALESCE(age::TEXT, 'N'),
+        COALESCE(salary::TEXT, 'N'),
+        COALESCE(purchase_amount::TEXT, 'N'),
+        COALESCE(transaction_count::TEXT, 'N'),
+        COALESCE(TO_CHAR(effective_from, 'YYYY-MM-DD'), 'N'),
+        COALESCE(TO_CHAR(effective_to, 'YYYY-MM-DD'), 'N'),
+        CASE WHEN current_flag THEN '1' WHEN NOT current_flag THEN '0' ELSE 'N' END,
+        COALESCE(TO_CHAR(created_dt, 'YYYY-MM-DD'), 'N')
+    )
+"""
+
+MYSQL_ROW_TEXT = """
+    CONCAT_WS('|',
+        CAST(fact_id AS CHAR),
+        COALESCE(CAST(customer_id AS CHAR), 'N'),
+        COALESCE(CAST(product_id AS CHAR), 'N'),
+        COALESCE(CAST(region_id AS CHAR), 'N'),
+        COALESCE(CAST(status_id AS CHAR), 'N'),
+        COALESCE(CAST(age AS CHAR), 'N'),
+        COALESCE(CAST(salary AS CHAR), 'N'),
+        COALESCE(CAST(purchase_amount AS CHAR), 'N'),
+        COALESCE(CAST(transaction_count AS CHAR), 'N'),
+        COALESCE(CAST(effective_from AS CHAR), 'N'),
+        COALESCE(CAST(effective_to AS CHAR), 'N'),
+        COALESCE(CAST(current_flag AS CHAR), 'N'),
+        COALESCE(CAST(created_dt AS CHAR), 'N')
+    )
+"""
+
+# Окно миграции: те же условия, что и в SELECT_FACTS_QUERY (migrate_to_mysql.py),
+# поэтому сверка окна не считает расхождением факты вне него
+WINDOW_CONDITION = """
+      AND (%s IS NULL OR effective_from >= %s)
+      AND (%s IS NULL OR effective_to <= %s)
+"""
+
+PG_CHUNK_CHECKSUM_QUERY = f"""
+    SELECT fact_id / %s AS chunk_id,
+           COUNT(*),
+           SUM(('x' || SUBSTR(MD5({PG_ROW_TEXT}), 1, 8))::BIT(32)::BIGINT)
+    FROM s_sql_dds.v_dm_task
+    WHERE fact_id BETWEEN %s AND %s {WINDOW_CONDITION}
+    GROUP BY 1
+"""
+
+MYSQL_CHUNK_CHECKSUM_QUERY = f"""
+    SELECT fact_id DIV %s AS chunk_id,
+           COUNT(*),
+           SUM(CAST(CONV(SUBSTRING(MD5({MYSQL_ROW_TEXT}), 1, 8), 16, 10) AS UNSIGNED))
+    FROM t_dm_task
+    WHERE fact_id BETWEEN %s AND %s {WINDOW_CONDITION}
+    GROUP BY 1
+"""
+
+# Полный диапазон fact_id (BIGINT)
+MIN_FACT_ID = 0
+MAX_FACT_ID = 2 ** 63 - 1
+
+def fetch_chunk_checksums(cursor, query, chunk_size, lo=MIN_FACT_ID, hi=MAX_FACT_ID, start_dt=None, end_dt=None):
+    """
+    Возвращает {chunk_id: (row_count, checksum)} для фактов окна с fact_id в [lo, hi]
+    """
+    cursor.execute(query, (chunk_size, lo, hi, start_dt, start_dt, end_dt, end_dt))
+    return {int(chunk_id): (int(count), int(checksum or 0)) for chunk_id, count, checksum in cursor.fetchall()}
+
+def compare_checksums(pg_checksums, mysql_checksums):
+    """
+    Возвращает отсортированный список чанков, которые отличаются или есть только на одной стороне
+    """
+    chunks = set(pg_checksums) | set(mysql_checksums)
+    return sorted(c for c in chunks if pg_checksums.get(c) != mysql_checksums.get(c))
+
+def find_mismatched_ranges(pg_cursor, mysql_cursor, chunk_size, lo=MIN_FACT_ID, hi=MAX_FACT_ID, min_chunk_size=100,
+                           start_dt=None, end_dt=None):
+    """
+    Сравнивает контрольные суммы чанков и рекурсивно уточняет только несовпавшие чанки,
+    пока чанк не станет меньше min_chunk_size. Возвращает список диапазонов fact_id.
+    """
+    pg_checksums = fetch_chunk_checksums(pg_cursor, PG_CHUNK_CHECKSUM_QUERY, chunk_size, lo, hi, start_dt, end_dt)
+    mysql_checksums = fetch_chunk_checksums(mysql_cursor, MYSQL_CHUNK_CHECKSUM_QUERY, chunk_size, lo, hi,
+                                            start_dt, end_dt)
+    
+    ranges = []
+    for chunk_id in compare_checksums(pg_checksums, mysql_checksums):
+        chunk_lo = max(lo, chunk_id * chunk_size)
+        chunk_hi = min(hi, chunk_id * chunk_size + chunk_size - 1)
+        sub_chunk_size = chunk_size // 10
+        if sub_chunk_size < min_chunk_size:
+            ranges.append((chunk_lo, chunk_hi))
+        else:
+            ranges.extend(find_mismatched_ranges(
+                pg_cursor, mysql_cursor, sub_chunk_size, chunk_lo, chunk_hi, min_chunk_size, start_dt, end_dt
+            ))
+    return ranges
+
+def verify_mysql_migration(start_dt=None, end_dt=None, chunk_size=100000, repair=True):
+    """
+    Сверяет v_dm_task в PostgreSQL и t_dm_task в MySQL по контрольным суммам чанков fact_id.
+    Сверяется только окно миграции [start_dt, end_dt] (по умолчанию вся история).
+    В Python передаются только агрегаты по чанкам; несовпавшие чанки уточняются
+    и, если repair=True, перезаливаются из PostgreSQL в пределах окна.
+    """
+    pg_conn = None
+    mysql_conn = None
+    
+    try:
+        pg_conn = get_pg_connection('migrate')
+        mysql_conn = get_mysql_connection('migrate')
+        pg_cursor = pg_conn.cursor()
+        mysql_cursor = mysql_conn.cursor()
+        
+        print("Verifying MySQL DWH against PostgreSQL DWH...")
+        ranges = find_mismatched_ranges(pg_cursor, mysql_cursor, chunk_size, start_dt=start_dt, end_dt=end_dt)
+        
+        if not ranges:
+            print("Verification passed: all chunks match")
+            return []
+        
+        print(f"Verification found {len(ranges)} mismatching ranges")
+        for lo, hi in ranges:
+            print(f"  fact_id [{lo}, {hi}]")
+        
+        if repair:
+            for lo, hi in ranges:
+                copied = copy_fact_range(pg_conn, mysql_conn, lo, hi, start_dt, end_dt, table='t_dm_task')
+                print(f"Re-migrated fact_id [{lo}, {hi}]: {copied} records")
+            
+            remaining = []
+            for lo, hi in ranges:
+                remaining.extend(find_mismatched_ranges(pg_cursor, mysql_cursor, hi - lo + 1, lo, hi, hi - lo + 1,
+                                                        start_dt, end_dt))
+            if remaining:
+                raise Exception(f"Verification still fails for {len(remaining)} ranges after repair")
+            print("Mismatching ranges repaired successfully")
+        
+        return ranges
+        
+    except Exception as e:
+        print(f"Error verifying migration: {e}")
+        if mysql_conn:
+            mysql_conn.rollback()
+        raise
+    finally:
+        if pg_conn:
+            release_pg_connection(pg_conn)
+        if mysql_conn:
+            release_mysql_connection(mysql_conn)
+
+if __name__ == "__main__":
+    verify_mysql_migration()
\ No newline at end of file
@@ -1,40 +1,144 @@
-DELIMITER //
+-- Загрузка справочников и фактов витрины из t_sql_source_structured.
+-- Возвращает число строк и длительность каждого шага для метрик пайплайна;
+-- тип результата и параметры менялись, поэтому прежняя версия удаляется.
+-- by_start - окно бэкфилла по effective_from (см. fn_etl_data_load): факты окна
+-- перезаписываются, поэтому повторная загрузка окна не дублирует их.
+-- Ключи справочников вставляются по порядку: параллельные загрузки окон ждут
+-- друг друга на общих ключах, но не блокируют взаимно.
+-- from_id/to_id - только строки t_sql_source_structured с id в (from_id, to_id]
+-- (микро-батчи soak.py, водяной знак ведет вызывающий код)
+DROP FUNCTION IF EXISTS s_sql_dds.fn_dm_data_load(DATE, DATE);
+DROP FUNCTION IF EXISTS s_sql_dds.fn_dm_data_load(DATE, DATE, BOOLEAN);
+-- Прежний отдельный инкрементальный вариант заменен параметрами from_id/to_id
+DROP FUNCTION IF EXISTS s_sql_dds.fn_dm_data_load_incremental();
 
-CREATE PROCEDURE fn_dm_data_stg_to_dm_load(
-    IN p_start_dt DATE,
-    IN p_end_dt DATE
+CREATE OR REPLACE FUNCTION s_sql_dds.fn_dm_data_load(
+    start_dt DATE DEFAULT NULL,
+    end_dt DATE DEFAULT NULL,
+    by_start BOOLEAN DEFAULT FALSE,
+    from_id BIGINT DEFAULT NULL,
+    to_id BIGINT DEFAULT NULL
 )
+RETURNS TABLE(step VARCHAR, rows_affected BIGINT, duration_ms NUMERIC) AS $$
+DECLARE
+    v_started TIMESTAMP;
 BEGIN
-    DECLARE v_record_count INT;
+    v_started := clock_timestamp();
+    IF by_start THEN
+        -- Факты окна бэкфилла загружаются заново
+        DELETE FROM s_sql_dds.t_dm_task
+        WHERE (start_dt IS NULL OR effective_from >= start_dt)
+          AND (end_dt IS NULL OR effective_from <= end_dt);
+        step := 'fact_delete';
+        GET DIAGNOSTICS rows_affected = ROW_COUNT;
+        duration_ms := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000, 3);
+        RETURN NEXT;
+        v_started := clock_timestamp();
+    END IF;
     
-    -- Подсчет записей для логирования
-    SELECT COUNT(*) INTO v_record_count 
-    FROM t_dm_stg_task
-    WHERE (p_start_dt IS NULL OR effective_from >= p_start_dt)
-      AND (p_end_dt IS NULL OR effective_to <= p_end_dt);
+    -- Вставка данных в справочник клиентов
+    INSERT INTO s_sql_dds.t_dim_customer (customer_name)
+    SELECT DISTINCT user_name 
+    FROM s_sql_dds.t_sql_source_structured
+    WHERE (start_dt IS NULL OR effective_from >= start_dt)
+      AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt)
+      AND (from_id IS NULL OR id > from_id)
+      AND (to_id IS NULL OR id <= to_id)
+    ORDER BY user_name
+    ON CONFLICT (customer_name) DO NOTHING;
+    step := 'dim_customer';
+    GET DIAGNOSTICS rows_affected = ROW_COUNT;
+    duration_ms := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000, 3);
+    RETURN NEXT;
+    v_started := clock_timestamp();
     
-    -- Очистка данных за период в целевой таблице
-    DELETE FROM t_dm_task 
-    WHERE (p_start_dt IS NULL OR effective_from >= p_start_dt)
-      AND (p_end_dt IS NULL OR effective_to <= p_end_dt);
+    -- Вставка данных в справочник продуктов
+    INSERT INTO s_sql_dds.t_dim_product (product_category)
+    SELECT DISTINCT product_category 
+    FROM s_sql_dds.t_sql_source_structured
+    WHERE (start_dt IS NULL OR effective_from >= start_dt)
+      AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt)
+      AND (from_id IS NULL OR id > from_id)
+      AND (to_id IS NULL OR id <= to_id)
+    ORDER BY product_category
+    ON CONFLICT (product_category) DO NOTHING;
+    step := 'dim_product';
+    GET DIAGNOSTICS rows_affected = ROW_COUNT;
+    duration_ms := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000, 3);
+    RETURN NEXT;
+    v_started := clock_timestamp();
     
-    -- Вставка новых данных из staging таблицы
-    INSERT INTO t_dm_task (
-        fact_id, customer_id, product_id, region_id, status_id,
-        age, salary, purchase_amount, transaction_count,
-        effective_from, effective_to, current_flag, created_dt
-    )
-    SELECT 
-        fact_id, customer_id, product_id, region_id, status_id,
-        age, salary, purchase_amount, transaction_count,
-        effective_from, effective_to, current_flag, created_dt
-    FROM t_dm_stg_task
-    WHERE (p_start_dt IS NULL OR effective_from >= p_start_dt)
-      AND (p_end_dt IS NULL OR effective_to <= p_end_dt);
+    -- Вставка данных в справочник регионов
+    INSERT INTO s_sql_dds.t_dim_region (region_name)
+    SELECT DISTINCT region 
+    FROM s_sql_dds.t_sql_source_structured
+    WHERE (start_dt IS NULL OR effective_from >= start_dt)
+      AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt)
+      AND (from_id IS NULL OR id > from_id)
+      AND (to_id IS NULL OR id <= to_id)
+    ORDER BY region
+    ON CONFLICT (region_name) DO NOTHING;
+    step := 'dim_region';
+    GET DIAGNOSTICS rows_affected = ROW_COUNT;
+    duration_ms := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000, 3);
+    RETURN NEXT;
+    v_started := clock_timestamp();
     
-    -- Логирование результата
-    SELECT CONCAT('Loaded ', ROW_COUNT(), ' records (total in staging: ', v_record_count, ')') AS result;
+    -- Вставка данных в справочник статусов
+    INSERT INTO s_sql_dds.t_dim_status (status_name)
+    SELECT DISTINCT customer_status 
+    FROM s_sql_dds.t_sql_source_structured
+    WHERE (start_dt IS NULL OR effective_from >= start_dt)
+      AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt)
+      AND (from_id IS NULL OR id > from_id)
+      AND (to_id IS NULL OR id <= to_id)
+    ORDER BY customer_status
+    ON CONFLICT (status_name) DO NOTHING;
+    step := 'dim_status';
+    GET DIAGNOSTICS rows_affected = ROW_COUNT;
+    duration_ms := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000, 3);
+    RETURN NEXT;
+    v_started := clock_timestamp();
     
-END //
+    -- Вставка данных в фактовую таблицу
+    INSERT INTO s_sql_dds.t_dm_task (
+        customer_id,
+        product_id,
+        region_id,
+        status_id,
+        age,
+        salary,
+        purchase_amount,
+        transaction_count,
+        effective_from,
+        effective_to,
+        current_flag
+    )
+    SELECT 
+        c.customer_id,
+        p.product_id,
+        r.region_id,
+        st.status_id,  -- ИСПРАВЛЕНО: st вместо s
+        src.age,
+        src.salary,
+        src.purchase_amount,
+        src.transaction_count,
+        src.effective_from,
+        src.effective_to,
+        src.current_flag
+    FROM s_sql_dds.t_sql_source_structured src
+    LEFT JOIN s_sql_dds.t_dim_customer c ON src.user_name = c.customer_name
+    LEFT JOIN s_sql_dds.t_dim_product p ON src.product_category = p.product_category
+    LEFT JOIN s_sql_dds.t_dim_region r ON src.region = r.region_name
+    LEFT JOIN s_sql_dds.t_dim_status st ON src.customer_status = st.status_name
+    WHERE (start_dt IS NULL OR src.effective_from >= start_dt)
+      AND (end_dt IS NULL OR CASE WHEN by_start THEN src.effective_from ELSE src.effective_to END <= end_dt)
+      AND (from_id IS NULL OR src.id > from_id)
+      AND (to_id IS NULL OR src.id <= to_id);
+    step := 'fact_insert';
+    GET DIAGNOSTICS rows_affected = ROW_COUNT;
+    duration_ms := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000, 3);
+    RETURN NEXT;
 
-DELIMITER ;
\ No newline at end of file
+END;
+$$ LANGUAGE plpgsql;
\ No newline at end of file
@@ -1,6 +1,11 @@
+-- Проверки качества витрины в окне дат; by_start - окно бэкфилла по effective_from
+-- (см. fn_etl_data_load). Параметры менялись, поэтому прежняя версия удаляется
+DROP FUNCTION IF EXISTS s_sql_dds.fn_dq_checks_load(DATE, DATE);
+
 CREATE OR REPLACE FUNCTION s_sql_dds.fn_dq_checks_load(
     start_dt DATE DEFAULT NULL,
-    end_dt DATE DEFAULT NULL
+    end_dt DATE DEFAULT NULL,
+    by_start BOOLEAN DEFAULT FALSE
 )
 RETURNS VOID AS $$
 DECLARE
@@ -11,10 +16,8 @@ DECLARE
     v_expected NUMERIC;
     v_actual NUMERIC;
 BEGIN
-    -- Очищаем предыдущие результаты за период
-    DELETE FROM s_sql_dds.t_dq_check_results 
-    WHERE execution_date::DATE >= COALESCE(start_dt, '1900-01-01'::DATE)
-      AND execution_date::DATE <= COALESCE(end_dt, '2100-12-31'::DATE);
+    -- История результатов не удаляется: запуски различаются по run_id,
+    -- а устаревшие месяцы удаляет dq_retention.py
     
     BEGIN
         v_check_count := v_check_count + 1;
@@ -23,13 +26,13 @@ BEGIN
         SELECT COALESCE(SUM(purchase_amount), 0) INTO v_expected
         FROM s_sql_dds.t_sql_source_structured
         WHERE (start_dt IS NULL OR effective_from >= start_dt)
-          AND (end_dt IS NULL OR effective_to <= end_dt);
+          AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt);
         
         -- Фактическая сумма из витрины
         SELECT COALESCE(SUM(purchase_amount), 0) INTO v_actual
         FROM s_sql_dds.v_dm_task
         WHERE (start_dt IS NULL OR effective_from >= start_dt)
-          AND (end_dt IS NULL OR effective_to <= end_dt);
+          AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt);
         
         -- Проверяем разницу (допустима 1% погрешность)
         IF ABS(v_expected - v_actual) / NULLIF(v_expected, 0) <= 0.01 THEN
@@ -62,7 +65,7 @@ BEGIN
         INTO v_actual
         FROM s_sql_dds.v_dm_task
         WHERE (start_dt IS NULL OR effective_from >= start_dt)
-          AND (end_dt IS NULL OR effective_to <= end_dt);
+          AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt);
         
         -- Допустимо до 5% пропусков
         IF COALESCE(v_actual, 0) <= 5 THEN
@@ -94,7 +97,7 @@ BEGIN
         FROM s_sql_dds.v_dm_task
         WHERE effective_to < effective_from
           AND (start_dt IS NULL OR effective_from >= start_dt)
-          AND (end_dt IS NULL OR effective_to <= end_dt);
+          AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt);
         
         -- Должно быть 0 некорректных записей
         IF v_actual = 0 THEN
@@ -127,7 +130,7 @@ BEGIN
                    COUNT(*) as duplicate_count
             FROM s_sql_dds.v_dm_task
             WHERE (start_dt IS NULL OR effective_from >= start_dt)
-              AND (end_dt IS NULL OR effective_to <= end_dt)
+              AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt)
             GROUP BY fact_id, customer_id, effective_from
             HAVING COUNT(*) > 1
         )
@@ -163,7 +166,7 @@ BEGIN
         FROM s_sql_dds.v_dm_task
         WHERE (salary < 0 OR salary > 1000000)
           AND (start_dt IS NULL OR effective_from >= start_dt)
-          AND (end_dt IS NULL OR effective_to <= end_dt);
+          AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt);
         
         -- Должно быть 0 записей с невалидной зарплатой
         IF v_actual = 0 THEN
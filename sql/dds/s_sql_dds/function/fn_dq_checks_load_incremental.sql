@@ -0,0 +1,97 @@
+-- Инкрементальный вариант fn_dq_checks_load: сначала пересчитываются только
+-- изменившиеся месячные секции, затем вердикт по окну собирается из кэша
+-- t_dq_partition_metrics. Окно задается месяцами effective_from.
+CREATE OR REPLACE FUNCTION s_sql_dds.fn_dq_checks_load_incremental(
+    start_dt DATE DEFAULT NULL,
+    end_dt DATE DEFAULT NULL,
+    full_refresh BOOLEAN DEFAULT FALSE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_check_count INTEGER := 0;
+    v_passed_count INTEGER := 0;
+    v_failed_count INTEGER := 0;
+    v_refreshed INTEGER := 0;
+BEGIN
+    -- История результатов не удаляется: запуски различаются по run_id,
+    -- а устаревшие месяцы удаляет dq_retention.py
+    
+    BEGIN
+        v_refreshed := s_sql_dds.fn_dq_refresh_partition_metrics(full_refresh);
+        
+        WITH window_metrics AS (
+            SELECT 
+                COUNT(*) FILTER (WHERE table_name = 't_dm_task') AS partitions,
+                COALESCE(SUM(sum_purchase_amount) FILTER (WHERE table_name = 't_sql_source_structured'), 0) AS expected_sum,
+                COALESCE(SUM(sum_purchase_amount) FILTER (WHERE table_name = 't_dm_task'), 0) AS actual_sum,
+                SUM(null_customer_count) FILTER (WHERE table_name = 't_dm_task') * 100.0
+                    / NULLIF(SUM(row_count) FILTER (WHERE table_name = 't_dm_task'), 0) AS null_customer_pct,
+                COALESCE(SUM(invalid_date_count) FILTER (WHERE table_name = 't_dm_task'), 0) AS invalid_dates,
+                COALESCE(SUM(invalid_salary_count) FILTER (WHERE table_name = 't_dm_task'), 0) AS invalid_salaries,
+                COALESCE(SUM(duplicate_count) FILTER (WHERE table_name = 't_dm_task'), 0) AS duplicate_rows
+            FROM s_sql_dds.t_dq_partition_metrics
+            WHERE (start_dt IS NULL OR partition_month >= DATE_TRUNC('month', start_dt)::DATE)
+              AND (end_dt IS NULL OR partition_month <= end_dt)
+        ),
+        checks AS (
+            SELECT c.*, w.partitions
+            FROM window_metrics w
+            CROSS JOIN LATERAL (VALUES
+                ('correctness', NULL, 'Purchase amount sum comparison',
+                 w.expected_sum, w.actual_sum, 0.01,
+                 ABS(w.expected_sum - w.actual_sum) / NULLIF(w.expected_sum, 0) <= 0.01,
+                 'Sum difference within acceptable range', 'Sum difference exceeds threshold'),
+                ('completeness', 'customer_id', 'Null values percentage',
+                 NULL, w.null_customer_pct, 5,
+                 COALESCE(w.null_customer_pct, 0) <= 5,
+                 'Null values within acceptable range', 'Too many null values'),
+                ('consistency', NULL, 'Date range validation',
+                 NULL, w.invalid_dates, 0,
+                 w.invalid_dates = 0,
+                 'All date ranges are valid', 'Found invalid date ranges'),
+                ('uniqueness', NULL, 'Duplicate records check',
+                 NULL, w.duplicate_rows, 0,
+                 w.duplicate_rows = 0,
+                 'No duplicate records found', 'Found duplicate records'),
+                ('validity', 'salary', 'Salary range validation',
+                 NULL, w.invalid_salaries, 0,
+                 w.invalid_salaries = 0,
+                 'All salary values are valid', 'Found invalid salary values')
+            ) AS c(check_type, column_name, check_name, expected_value, actual_value,
+                   error_threshold, is_passed, passed_message, failed_message)
+        ),
+        inserted AS (
+            INSERT INTO s_sql_dds.t_dq_check_results 
+            (check_type, table_name, column_name, check_name, status, expected_value, actual_value, error_threshold, error_message)
+            SELECT check_type, 'v_dm_task', column_name, check_name,
+                   CASE WHEN COALESCE(is_passed, FALSE) THEN 'passed' ELSE 'failed' END,
+                   expected_value, actual_value, error_threshold,
+                   CONCAT(CASE WHEN COALESCE(is_passed, FALSE) THEN passed_message ELSE failed_message END,
+                          ' (', partitions, ' partitions, ', v_refreshed, ' refreshed)')
+            FROM checks
+            RETURNING status
+        )
+        SELECT COUNT(*),
+               COUNT(*) FILTER (WHERE status = 'passed'),
+               COUNT(*) FILTER (WHERE status <> 'passed')
+        INTO v_check_count, v_passed_count, v_failed_count
+        FROM inserted;
+    EXCEPTION WHEN OTHERS THEN
+        v_check_count := v_check_count + 1;
+        v_failed_count := v_failed_count + 1;
+        INSERT INTO s_sql_dds.t_dq_check_results 
+        (check_type, table_name, check_name, status, error_message)
+        VALUES ('incremental', 'v_dm_task', 'Incremental DQ check', 'error', 
+                'Error: ' || SQLERRM);
+    END;
+    
+    INSERT INTO s_sql_dds.t_dq_check_results 
+    (check_type, table_name, check_name, status, expected_value, actual_value, error_message)
+    VALUES ('summary', 'v_dm_task', 'Overall DQ check', 
+            CASE WHEN v_failed_count = 0 THEN 'passed' ELSE 'failed' END,
+            v_check_count, v_passed_count,
+            CONCAT('Total: ', v_check_count, ', Passed: ', v_passed_count, ', Failed: ', v_failed_count));
+    
+    RETURN v_check_count;
+END;
+$$ LANGUAGE plpgsql;
\ No newline at end of file
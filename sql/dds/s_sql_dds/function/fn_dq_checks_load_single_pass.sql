@@ -0,0 +1,102 @@
+-- Однопроходный вариант fn_dq_checks_load: все метрики фактовой таблицы считаются
+-- одним агрегатом с FILTER по v_dm_task, источник читается один раз для суммы,
+-- все результаты записываются одним INSERT. by_start - окно бэкфилла по effective_from.
+DROP FUNCTION IF EXISTS s_sql_dds.fn_dq_checks_load_single_pass(DATE, DATE);
+
+CREATE OR REPLACE FUNCTION s_sql_dds.fn_dq_checks_load_single_pass(
+    start_dt DATE DEFAULT NULL,
+    end_dt DATE DEFAULT NULL,
+    by_start BOOLEAN DEFAULT FALSE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_check_count INTEGER := 0;
+    v_passed_count INTEGER := 0;
+    v_failed_count INTEGER := 0;
+BEGIN
+    -- История результатов не удаляется: запуски различаются по run_id,
+    -- а устаревшие месяцы удаляет dq_retention.py
+    
+    BEGIN
+        WITH source_metrics AS (
+            -- Ожидаемая сумма из источника
+            SELECT COALESCE(SUM(purchase_amount), 0) AS expected_sum
+            FROM s_sql_dds.t_sql_source_structured
+            WHERE (start_dt IS NULL OR effective_from >= start_dt)
+              AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt)
+        ),
+        fact_metrics AS (
+            -- Все метрики витрины за один проход
+            SELECT 
+                COALESCE(SUM(purchase_amount), 0) AS actual_sum,
+                COUNT(*) FILTER (WHERE customer_id IS NULL) * 100.0 / NULLIF(COUNT(*), 0) AS null_customer_pct,
+                COUNT(*) FILTER (WHERE effective_to < effective_from) AS invalid_dates,
+                COUNT(*) FILTER (WHERE salary < 0 OR salary > 1000000) AS invalid_salaries,
+                -- Лишние строки с повторяющимся ключом (fact_id, customer_id, effective_from)
+                COUNT(*) - COUNT(DISTINCT (fact_id, customer_id, effective_from)) AS duplicate_rows
+            FROM s_sql_dds.v_dm_task
+            WHERE (start_dt IS NULL OR effective_from >= start_dt)
+              AND (end_dt IS NULL OR CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_dt)
+        ),
+        checks AS (
+            SELECT c.*
+            FROM source_metrics s
+            CROSS JOIN fact_metrics f
+            CROSS JOIN LATERAL (VALUES
+                ('correctness', NULL, 'Purchase amount sum comparison',
+                 s.expected_sum, f.actual_sum, 0.01,
+                 ABS(s.expected_sum - f.actual_sum) / NULLIF(s.expected_sum, 0) <= 0.01,
+                 'Sum difference within acceptable range', 'Sum difference exceeds threshold'),
+                ('completeness', 'customer_id', 'Null values percentage',
+                 NULL, f.null_customer_pct, 5,
+                 COALESCE(f.null_customer_pct, 0) <= 5,
+                 'Null values within acceptable range', 'Too many null values'),
+                ('consistency', NULL, 'Date range validation',
+                 NULL, f.invalid_dates, 0,
+                 f.invalid_dates = 0,
+                 'All date ranges are valid', 'Found invalid date ranges'),
+                ('uniqueness', NULL, 'Duplicate records check',
+                 NULL, f.duplicate_rows, 0,
+                 f.duplicate_rows = 0,
+                 'No duplicate records found', 'Found duplicate records'),
+                ('validity', 'salary', 'Salary range validation',
+                 NULL, f.invalid_salaries, 0,
+                 f.invalid_salaries = 0,
+                 'All salary values are valid', 'Found invalid salary values')
+            ) AS c(check_type, column_name, check_name, expected_value, actual_value,
+                   error_threshold, is_passed, passed_message, failed_message)
+        ),
+        inserted AS (
+            INSERT INTO s_sql_dds.t_dq_check_results 
+            (check_type, table_name, column_name, check_name, status, expected_value, actual_value, error_threshold, error_message)
+            SELECT check_type, 'v_dm_task', column_name, check_name,
+                   CASE WHEN COALESCE(is_passed, FALSE) THEN 'passed' ELSE 'failed' END,
+                   expected_value, actual_value, error_threshold,
+                   CASE WHEN COALESCE(is_passed, FALSE) THEN passed_message ELSE failed_message END
+            FROM checks
+            RETURNING status
+        )
+        SELECT COUNT(*),
+               COUNT(*) FILTER (WHERE status = 'passed'),
+               COUNT(*) FILTER (WHERE status <> 'passed')
+        INTO v_check_count, v_passed_count, v_failed_count
+        FROM inserted;
+    EXCEPTION WHEN OTHERS THEN
+        v_check_count := v_check_count + 1;
+        v_failed_count := v_failed_count + 1;
+        INSERT INTO s_sql_dds.t_dq_check_results 
+        (check_type, table_name, check_name, status, error_message)
+        VALUES ('single_pass', 'v_dm_task', 'Single-pass DQ scan', 'error', 
+                'Error: ' || SQLERRM);
+    END;
+    
+    INSERT INTO s_sql_dds.t_dq_check_results 
+    (check_type, table_name, check_name, status, expected_value, actual_value, error_message)
+    VALUES ('summary', 'v_dm_task', 'Overall DQ check', 
+            CASE WHEN v_failed_count = 0 THEN 'passed' ELSE 'failed' END,
+            v_check_count, v_passed_count,
+            CONCAT('Total: ', v_check_count, ', Passed: ', v_passed_count, ', Failed: ', v_failed_count));
+    
+    RETURN v_check_count;
+END;
+$$ LANGUAGE plpgsql;
\ No newline at end of file
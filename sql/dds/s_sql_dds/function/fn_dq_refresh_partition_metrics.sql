@@ -0,0 +1,111 @@
+-- Пересчитывает кэш t_dq_partition_metrics только для месяцев, в которые
+-- попали новые строки (id больше водяного знака). fn_etl_data_load удаляет и заново
+-- вставляет окно, поэтому перезагруженные месяцы тоже получают новые id.
+-- Месяц, из которого строки только удалили, так не обнаружить: для этого full_refresh.
+CREATE OR REPLACE FUNCTION s_sql_dds.fn_dq_refresh_partition_metrics(
+    full_refresh BOOLEAN DEFAULT FALSE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_watermark BIGINT;
+    v_max_id BIGINT;
+    v_months DATE[];
+    v_count INTEGER;
+    v_refreshed INTEGER := 0;
+BEGIN
+    IF full_refresh THEN
+        DELETE FROM s_sql_dds.t_dq_partition_metrics;
+        DELETE FROM s_sql_dds.t_dq_watermarks
+        WHERE table_name IN ('t_dm_task', 't_sql_source_structured');
+    END IF;
+    
+    -- Фактовая таблица
+    SELECT COALESCE(MAX(last_row_id), 0) INTO v_watermark
+    FROM s_sql_dds.t_dq_watermarks WHERE table_name = 't_dm_task';
+    
+    SELECT MAX(fact_id) INTO v_max_id FROM s_sql_dds.t_dm_task;
+    
+    SELECT ARRAY_AGG(DISTINCT DATE_TRUNC('month', effective_from)::DATE) INTO v_months
+    FROM s_sql_dds.t_dm_task
+    WHERE fact_id > v_watermark
+      AND fact_id <= v_max_id
+      AND effective_from IS NOT NULL;
+    
+    IF v_months IS NOT NULL THEN
+        DELETE FROM s_sql_dds.t_dq_partition_metrics
+        WHERE table_name = 't_dm_task' AND partition_month = ANY(v_months);
+        
+        INSERT INTO s_sql_dds.t_dq_partition_metrics (
+            table_name, partition_month, row_count, sum_purchase_amount,
+            null_customer_count, invalid_date_count, invalid_salary_count, duplicate_count
+        )
+        SELECT 
+            't_dm_task',
+            m.partition_month,
+            COUNT(*),
+            COALESCE(SUM(t.purchase_amount), 0),
+            COUNT(*) FILTER (WHERE t.customer_id IS NULL),
+            COUNT(*) FILTER (WHERE t.effective_to < t.effective_from),
+            COUNT(*) FILTER (WHERE t.salary < 0 OR t.salary > 1000000),
+            COUNT(*) - COUNT(DISTINCT (t.fact_id, t.customer_id, t.effective_from))
+        FROM UNNEST(v_months) AS m(partition_month)
+        JOIN s_sql_dds.t_dm_task t
+          ON t.effective_from >= m.partition_month
+         AND t.effective_from < m.partition_month + INTERVAL '1 month'
+        GROUP BY m.partition_month;
+        
+        GET DIAGNOSTICS v_count = ROW_COUNT;
+        v_refreshed := v_refreshed + v_count;
+    END IF;
+    
+    IF v_max_id IS NOT NULL THEN
+        INSERT INTO s_sql_dds.t_dq_watermarks (table_name, last_row_id, updated_at)
+        VALUES ('t_dm_task', v_max_id, CURRENT_TIMESTAMP)
+        ON CONFLICT (table_name) DO UPDATE
+        SET last_row_id = EXCLUDED.last_row_id, updated_at = EXCLUDED.updated_at;
+    END IF;
+    
+    -- Структурированный источник
+    SELECT COALESCE(MAX(last_row_id), 0) INTO v_watermark
+    FROM s_sql_dds.t_dq_watermarks WHERE table_name = 't_sql_source_structured';
+    
+    SELECT MAX(id) INTO v_max_id FROM s_sql_dds.t_sql_source_structured;
+    
+    SELECT ARRAY_AGG(DISTINCT DATE_TRUNC('month', effective_from)::DATE) INTO v_months
+    FROM s_sql_dds.t_sql_source_structured
+    WHERE id > v_watermark
+      AND id <= v_max_id
+      AND effective_from IS NOT NULL;
+    
+    IF v_months IS NOT NULL THEN
+        DELETE FROM s_sql_dds.t_dq_partition_metrics
+        WHERE table_name = 't_sql_source_structured' AND partition_month = ANY(v_months);
+        
+        INSERT INTO s_sql_dds.t_dq_partition_metrics (
+            table_name, partition_month, row_count, sum_purchase_amount
+        )
+        SELECT 
+            't_sql_source_structured',
+            m.partition_month,
+            COUNT(*),
+            COALESCE(SUM(s.purchase_amount), 0)
+        FROM UNNEST(v_months) AS m(partition_month)
+        JOIN s_sql_dds.t_sql_source_structured s
+          ON s.effective_from >= m.partition_month
+         AND s.effective_from < m.partition_month + INTERVAL '1 month'
+        GROUP BY m.partition_month;
+        
+        GET DIAGNOSTICS v_count = ROW_COUNT;
+        v_refreshed := v_refreshed + v_count;
+    END IF;
+    
+    IF v_max_id IS NOT NULL THEN
+        INSERT INTO s_sql_dds.t_dq_watermarks (table_name, last_row_id, updated_at)
+        VALUES ('t_sql_source_structured', v_max_id, CURRENT_TIMESTAMP)
+        ON CONFLICT (table_name) DO UPDATE
+        SET last_row_id = EXCLUDED.last_row_id, updated_at = EXCLUDED.updated_at;
+    END IF;
+    
+    RETURN v_refreshed;
+END;
+$$ LANGUAGE plpgsql;
\ No newline at end of file
@@ -0,0 +1,75 @@
+-- Открывает запуск проверок и запоминает его номер в сессии:
+-- все строки t_dq_check_results, вставленные в этой сессии, получат run_id по умолчанию
+CREATE OR REPLACE FUNCTION s_sql_dds.fn_dq_start_run(
+    p_mode VARCHAR DEFAULT NULL,
+    p_start_dt DATE DEFAULT NULL,
+    p_end_dt DATE DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_run_id INTEGER;
+BEGIN
+    -- Секция текущего месяца (и следующих) должна существовать до вставки результатов
+    PERFORM s_sql_dds.fn_dq_create_partitions();
+    
+    INSERT INTO s_sql_dds.t_dq_runs (mode, start_dt, end_dt)
+    VALUES (p_mode, p_start_dt, p_end_dt)
+    RETURNING run_id INTO v_run_id;
+    
+    PERFORM set_config('dq.run_id', v_run_id::TEXT, FALSE);
+    
+    RETURN v_run_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Закрывает запуск: итоги запуска и инкрементальное пополнение дневной сводки
+CREATE OR REPLACE FUNCTION s_sql_dds.fn_dq_finish_run(
+    p_run_id INTEGER
+)
+RETURNS VARCHAR AS $$
+DECLARE
+    v_status VARCHAR;
+BEGIN
+    UPDATE s_sql_dds.t_dq_runs r
+    SET finished_at = CLOCK_TIMESTAMP(),
+        total_checks = s.total_checks,
+        passed_checks = s.passed_checks,
+        failed_checks = s.failed_checks,
+        error_checks = s.error_checks,
+        status = CASE WHEN s.failed_checks = 0 AND s.error_checks = 0 THEN 'passed' ELSE 'failed' END
+    FROM (
+        SELECT 
+            COUNT(*) AS total_checks,
+            COUNT(*) FILTER (WHERE status = 'passed') AS passed_checks,
+            COUNT(*) FILTER (WHERE status = 'failed') AS failed_checks,
+            COUNT(*) FILTER (WHERE status = 'error') AS error_checks
+        FROM s_sql_dds.t_dq_check_results
+        WHERE run_id = p_run_id
+          AND check_type != 'summary'
+    ) s
+    WHERE r.run_id = p_run_id
+    RETURNING r.status INTO v_status;
+    
+    INSERT INTO s_sql_dds.t_dq_daily_rollup AS d
+        (check_date, check_type, total_checks, passed_checks, failed_checks, error_checks)
+    SELECT 
+        execution_date::DATE,
+        COALESCE(check_type, 'unknown'),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE status = 'passed'),
+        COUNT(*) FILTER (WHERE status = 'failed'),
+        COUNT(*) FILTER (WHERE status = 'error')
+    FROM s_sql_dds.t_dq_check_results
+    WHERE run_id = p_run_id
+    GROUP BY 1, 2
+    ON CONFLICT (check_date, check_type) DO UPDATE
+    SET total_checks = d.total_checks + EXCLUDED.total_checks,
+        passed_checks = d.passed_checks + EXCLUDED.passed_checks,
+        failed_checks = d.failed_checks + EXCLUDED.failed_checks,
+        error_checks = d.error_checks + EXCLUDED.error_checks;
+    
+    PERFORM set_config('dq.run_id', '', FALSE);
+    
+    RETURN v_status;
+END;
+$$ LANGUAGE plpgsql;
\ No newline at end of file
@@ -1,76 +1,32 @@
--- Создание схемы
-CREATE SCHEMA IF NOT EXISTS s_sql_dds;
+-- Очистка и трансформация t_sql_source_unstructured в t_sql_source_structured
+-- в окне дат; возвращает число загруженных строк.
+-- По умолчанию окно - строки, период которых целиком внутри [start_date, end_date];
+-- by_start - строки с очищенной effective_from в окне (окна бэкфилла, см. backfill.py):
+-- каждая строка попадает ровно в одно из соседних окон.
+-- from_id/to_id - только строки источника с id в (from_id, to_id] (микро-батчи soak.py):
+-- строки дописываются без удаления окна, водяной знак ведет вызывающий код
+DROP FUNCTION IF EXISTS s_sql_dds.fn_etl_data_load(DATE, DATE);
+DROP FUNCTION IF EXISTS s_sql_dds.fn_etl_data_load(DATE, DATE, BOOLEAN);
+-- Прежний отдельный инкрементальный вариант заменен параметрами from_id/to_id
+DROP FUNCTION IF EXISTS s_sql_dds.fn_etl_data_load_incremental(DATE, DATE);
 
--- Создание неструктурированной таблицы
-CREATE TABLE IF NOT EXISTS s_sql_dds.t_sql_source_unstructured (
-    id SERIAL PRIMARY KEY,
-    user_id VARCHAR(50),
-    user_name VARCHAR(100),
-    age INTEGER,
-    salary NUMERIC(15,2),
-    purchase_amount NUMERIC(15,2),
-    product_category VARCHAR(50),
-    region VARCHAR(50),
-    customer_status VARCHAR(20),
-    transaction_count INTEGER,
-    effective_from DATE,
-    effective_to DATE,
-    current_flag BOOLEAN,
-    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-
--- Создание структурированной таблицы
-CREATE TABLE IF NOT EXISTS s_sql_dds.t_sql_source_structured (
-    id SERIAL PRIMARY KEY,
-    user_id VARCHAR(50) NOT NULL,
-    user_name VARCHAR(100),
-    age INTEGER CHECK (age BETWEEN 18 AND 100),
-    salary NUMERIC(15,2) CHECK (salary >= 0),
-    purchase_amount NUMERIC(15,2) CHECK (purchase_amount >= 0 AND purchase_amount <= 100000),
-    product_category VARCHAR(50) CHECK (product_category IN ('Electronics', 'Clothing', 'Books', 'Home', 'Sports', 'Other')),
-    region VARCHAR(50),
-    customer_status VARCHAR(20),
-    transaction_count INTEGER CHECK (transaction_count >= 0),
-    effective_from DATE NOT NULL,
-    effective_to DATE NOT NULL,
-    current_flag BOOLEAN,
-    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT valid_date_range CHECK (effective_to >= effective_from)
-);
-
--- ⭐⭐ ДОБАВИТЬ: ТЕСТОВАЯ ТАБЛИЦА ДЛЯ АВТОТЕСТОВ ⭐⭐
-CREATE TABLE IF NOT EXISTS s_sql_dds.t_sql_source_structured_copy (
-    id SERIAL PRIMARY KEY,
-    user_id VARCHAR(50) NOT NULL,
-    user_name VARCHAR(100),
-    age INTEGER,
-    salary NUMERIC(15,2),
-    purchase_amount NUMERIC(15,2),
-    product_category VARCHAR(50),
-    region VARCHAR(50),
-    customer_status VARCHAR(20),
-    transaction_count INTEGER,
-    effective_from DATE,
-    effective_to DATE,
-    current_flag BOOLEAN,
-    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-
-CREATE INDEX IF NOT EXISTS idx_structured_user_id ON s_sql_dds.t_sql_source_structured(user_id);
-CREATE INDEX IF NOT EXISTS idx_structured_dates ON s_sql_dds.t_sql_source_structured(effective_from, effective_to);
-
--- Функция для ETL процесса
 CREATE OR REPLACE FUNCTION s_sql_dds.fn_etl_data_load(
     start_date DATE DEFAULT '2023-01-01',
-    end_date DATE DEFAULT '2023-12-31'
+    end_date DATE DEFAULT '2023-12-31',
+    by_start BOOLEAN DEFAULT FALSE,
+    from_id BIGINT DEFAULT NULL,
+    to_id BIGINT DEFAULT NULL
 )
 RETURNS INTEGER AS $$
 DECLARE
     processed_count INTEGER;
 BEGIN
-    -- Очистка целевой таблицы в указанном диапазоне дат
-    DELETE FROM s_sql_dds.t_sql_source_structured 
-    WHERE effective_from >= start_date AND effective_to <= end_date;
+    -- Очистка целевой таблицы в указанном диапазоне дат (кроме дозагрузки диапазона id)
+    IF from_id IS NULL AND to_id IS NULL THEN
+        DELETE FROM s_sql_dds.t_sql_source_structured 
+        WHERE effective_from >= start_date
+          AND CASE WHEN by_start THEN effective_from ELSE effective_to END <= end_date;
+    END IF;
     
     -- Вставка очищенных и трансформированных данных
     INSERT INTO s_sql_dds.t_sql_source_structured (
@@ -80,20 +36,20 @@ BEGIN
     SELECT 
         user_id,
         user_name,
-        -- Очистка возраста: замена NULL, ограничение диапазона
+        -- Очистка возраста
         CASE 
             WHEN age IS NULL THEN 25
             WHEN age < 18 THEN 18
             WHEN age > 100 THEN 100
             ELSE age
         END AS age,
-        -- Очистка зарплаты: замена отрицательных значений, ограничение аномалий
+        -- Очистка зарплаты
         CASE 
             WHEN salary < 0 THEN 0
             WHEN salary > 1000000 THEN 1000000
             ELSE ROUND(salary::NUMERIC, 2)
         END AS salary,
-        -- Очистка суммы покупки: замена отрицательных, ограничение выбросов
+        -- Очистка суммы покупки
         CASE 
             WHEN purchase_amount < 0 THEN 0
             WHEN purchase_amount > 100000 THEN 100000
@@ -118,10 +74,7 @@ BEGIN
             ELSE transaction_count
         END AS transaction_count,
         -- Корректировка дат
-        CASE 
-            WHEN effective_from < '2020-01-01' THEN '2023-01-01'::DATE
-            ELSE effective_from
-        END AS effective_from,
+        dates.cleansed_from AS effective_from,
         CASE 
             WHEN effective_to < effective_from THEN effective_from + INTERVAL '30 days'
             WHEN effective_to > '2024-12-31' THEN '2024-12-31'::DATE
@@ -129,8 +82,18 @@ BEGIN
         END AS effective_to,
         current_flag
     FROM s_sql_dds.t_sql_source_unstructured
-    WHERE effective_from >= start_date 
-        AND effective_to <= end_date
+    CROSS JOIN LATERAL (
+        SELECT CASE 
+            WHEN effective_from < '2020-01-01' THEN '2023-01-01'::DATE
+            ELSE effective_from
+        END AS cleansed_from
+    ) dates
+    -- Окно бэкфилла выбирается по очищенной effective_from, как и удаляется выше:
+    -- иначе строка с исходной датой до 2020 года дублировалась бы при повторе окна
+    WHERE CASE WHEN by_start THEN dates.cleansed_from ELSE effective_from END >= start_date
+        AND CASE WHEN by_start THEN dates.cleansed_from ELSE effective_to END <= end_date
+        AND (from_id IS NULL OR id > from_id)
+        AND (to_id IS NULL OR id <= to_id)
         AND user_id IS NOT NULL;
     
     -- Получение количества обработанных записей
@@ -140,7 +103,7 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- ⭐⭐ ДОБАВИТЬ: ТЕСТОВАЯ ФУНКЦИЯ ДЛЯ АВТОТЕСТОВ ⭐⭐
+-- Тестовая функция: копия структурированной таблицы в t_sql_source_structured_copy
 CREATE OR REPLACE FUNCTION s_sql_dds.fn_etl_data_load_test(
     start_date DATE DEFAULT '2023-01-01',
     end_date DATE DEFAULT '2023-12-31'
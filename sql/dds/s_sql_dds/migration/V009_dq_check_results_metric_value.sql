@@ -0,0 +1,4 @@
+-- Значение, с которым сравнивается порог проверки, отдельно от actual_value:
+-- для проверки суммы actual_value - сумма витрины, metric_value - относительная разница
+-- с источником (dq_runner.py). Изменение таблицы после V003, поэтому отдельная миграция
+ALTER TABLE s_sql_dds.t_dq_check_results ADD COLUMN IF NOT EXISTS metric_value NUMERIC;
\ No newline at end of file
@@ -0,0 +1,27 @@
+-- Батчи профилирования: один батч на загрузку окна [window_start, window_end]
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_profile_batches (
+    batch_id SERIAL PRIMARY KEY,
+    window_start DATE,
+    window_end DATE,
+    created_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Профили колонок за батч. hll и kll - объединяемые скетчи (см. sketches.py):
+-- статистика за период получается их объединением, без повторного чтения таблиц
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_column_profiles (
+    batch_id INTEGER NOT NULL REFERENCES s_sql_dds.t_profile_batches(batch_id) ON DELETE CASCADE,
+    table_name VARCHAR(100) NOT NULL,
+    column_name VARCHAR(100) NOT NULL,
+    is_numeric BOOLEAN NOT NULL,
+    row_count BIGINT,
+    null_count BIGINT,
+    min_value VARCHAR(100),
+    max_value VARCHAR(100),
+    distinct_estimate BIGINT,
+    hll BYTEA,
+    kll JSONB,
+    PRIMARY KEY (batch_id, table_name, column_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_column_profiles_column 
+ON s_sql_dds.t_column_profiles(table_name, column_name, batch_id);
\ No newline at end of file
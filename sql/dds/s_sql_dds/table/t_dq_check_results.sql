@@ -1,20 +1,141 @@
--- Таблица для хранения результатов проверок качества данных
-DROP TABLE IF EXISTS s_sql_dds.t_dq_check_results;
+-- Таблица для хранения результатов проверок качества данных.
+-- Секционирована по месяцам execution_date: устаревшие месяцы удаляются
+-- целиком (см. dq_retention.py), без массового DELETE
+DO $$
+BEGIN
+    -- Прежние версии создавали обычную таблицу: откладываем ее для переноса строк
+    IF EXISTS (
+        SELECT 1
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 's_sql_dds'
+          AND c.relname = 't_dq_check_results'
+          AND c.relkind = 'r'
+    ) THEN
+        ALTER TABLE s_sql_dds.t_dq_check_results RENAME TO t_dq_check_results_legacy;
+        ALTER TABLE s_sql_dds.t_dq_check_results_legacy
+            RENAME CONSTRAINT t_dq_check_results_pkey TO t_dq_check_results_legacy_pkey;
+        ALTER TABLE s_sql_dds.t_dq_check_results_legacy ALTER COLUMN check_id DROP DEFAULT;
+        ALTER TABLE s_sql_dds.t_dq_check_results_legacy ADD COLUMN IF NOT EXISTS duration_ms NUMERIC;
+        ALTER TABLE s_sql_dds.t_dq_check_results_legacy ADD COLUMN IF NOT EXISTS run_id INTEGER;
+        DROP SEQUENCE IF EXISTS s_sql_dds.t_dq_check_results_check_id_seq;
+        DROP INDEX IF EXISTS s_sql_dds.idx_dq_check_date;
+        DROP INDEX IF EXISTS s_sql_dds.idx_dq_check_status;
+        DROP INDEX IF EXISTS s_sql_dds.idx_dq_check_run;
+    END IF;
+END $$;
 
-CREATE TABLE s_sql_dds.t_dq_check_results (
-    check_id SERIAL PRIMARY KEY,
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_dq_check_results (
+    check_id SERIAL,
     check_type VARCHAR(50),
     table_name VARCHAR(100),
     column_name VARCHAR(100),
     check_name VARCHAR(200),
-    execution_date TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP,
+    execution_date TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP,
     status VARCHAR(20),
     expected_value NUMERIC,
     actual_value NUMERIC,
     error_threshold NUMERIC,
-    error_message VARCHAR(500)
-);
+    error_message VARCHAR(500),
+    duration_ms NUMERIC,
+    -- Номер запуска подставляется из сессии (см. fn_dq_start_run), поэтому
+    -- plpgsql-функции проверок не нужно передавать его в каждый INSERT
+    run_id INTEGER DEFAULT NULLIF(current_setting('dq.run_id', TRUE), '')::INTEGER,
+    PRIMARY KEY (check_id, execution_date)
+) PARTITION BY RANGE (execution_date);
 
--- Индексы для быстрого поиска
-CREATE INDEX idx_dq_check_date ON s_sql_dds.t_dq_check_results(execution_date);
-CREATE INDEX idx_dq_check_status ON s_sql_dds.t_dq_check_results(status);
\ No newline at end of file
+-- Строки вне созданных месяцев не теряются, а попадают сюда
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_dq_check_results_default
+    PARTITION OF s_sql_dds.t_dq_check_results DEFAULT;
+
+-- Индексы для быстрого поиска (создаются на каждой секции)
+CREATE INDEX IF NOT EXISTS idx_dq_check_date ON s_sql_dds.t_dq_check_results(execution_date);
+CREATE INDEX IF NOT EXISTS idx_dq_check_status ON s_sql_dds.t_dq_check_results(status);
+CREATE INDEX IF NOT EXISTS idx_dq_check_run ON s_sql_dds.t_dq_check_results(run_id);
+
+-- Создает месячные секции с p_from_dt на p_months месяцев вперед.
+-- Уже попавшие в DEFAULT строки этого месяца переносятся в новую секцию
+CREATE OR REPLACE FUNCTION s_sql_dds.fn_dq_create_partitions(
+    p_from_dt DATE DEFAULT CURRENT_DATE,
+    p_months INTEGER DEFAULT 2
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_month DATE;
+    v_partition VARCHAR;
+    v_created INTEGER := 0;
+BEGIN
+    FOR i IN 0..p_months LOOP
+        v_month := (DATE_TRUNC('month', p_from_dt) + MAKE_INTERVAL(months => i))::DATE;
+        v_partition := 't_dq_check_results_p' || TO_CHAR(v_month, 'YYYY_MM');
+        
+        CONTINUE WHEN EXISTS (
+            SELECT 1
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 's_sql_dds'
+              AND c.relname = v_partition
+        );
+        
+        EXECUTE format(
+            'CREATE TABLE s_sql_dds.%I (LIKE s_sql_dds.t_dq_check_results INCLUDING DEFAULTS)',
+            v_partition
+        );
+        EXECUTE format(
+            'WITH moved AS (
+                DELETE FROM s_sql_dds.t_dq_check_results_default
+                WHERE execution_date >= %L AND execution_date < %L
+                RETURNING *
+            )
+            INSERT INTO s_sql_dds.%I SELECT * FROM moved',
+            v_month, (v_month + INTERVAL '1 month')::DATE, v_partition
+        );
+        EXECUTE format(
+            'ALTER TABLE s_sql_dds.t_dq_check_results ATTACH PARTITION s_sql_dds.%I
+             FOR VALUES FROM (%L) TO (%L)',
+            v_partition, v_month, (v_month + INTERVAL '1 month')::DATE
+        );
+        
+        v_created := v_created + 1;
+    END LOOP;
+    
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Переносим строки из обычной таблицы прежних версий
+DO $$
+DECLARE
+    v_first_dt DATE;
+    v_months INTEGER;
+BEGIN
+    IF to_regclass('s_sql_dds.t_dq_check_results_legacy') IS NOT NULL THEN
+        SELECT MIN(execution_date)::DATE INTO v_first_dt
+        FROM s_sql_dds.t_dq_check_results_legacy;
+        
+        IF v_first_dt IS NOT NULL THEN
+            v_months := (EXTRACT(YEAR FROM AGE(DATE_TRUNC('month', CURRENT_DATE), DATE_TRUNC('month', v_first_dt))) * 12
+                       + EXTRACT(MONTH FROM AGE(DATE_TRUNC('month', CURRENT_DATE), DATE_TRUNC('month', v_first_dt))))::INTEGER;
+            PERFORM s_sql_dds.fn_dq_create_partitions(v_first_dt, v_months);
+        END IF;
+        
+        INSERT INTO s_sql_dds.t_dq_check_results (
+            check_id, check_type, table_name, column_name, check_name, execution_date, status,
+            expected_value, actual_value, error_threshold, error_message, duration_ms, run_id
+        )
+        SELECT check_id, check_type, table_name, column_name, check_name,
+               COALESCE(execution_date, CURRENT_TIMESTAMP), status,
+               expected_value, actual_value, error_threshold, error_message, duration_ms, run_id
+        FROM s_sql_dds.t_dq_check_results_legacy;
+        
+        PERFORM setval(
+            pg_get_serial_sequence('s_sql_dds.t_dq_check_results', 'check_id'),
+            COALESCE((SELECT MAX(check_id) FROM s_sql_dds.t_dq_check_results), 0) + 1,
+            FALSE
+        );
+        
+        DROP TABLE s_sql_dds.t_dq_check_results_legacy;
+    END IF;
+END $$;
+
+SELECT s_sql_dds.fn_dq_create_partitions();
\ No newline at end of file
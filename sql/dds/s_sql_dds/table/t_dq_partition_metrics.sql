@@ -0,0 +1,24 @@
+-- Кэш метрик качества данных по месячным секциям effective_from.
+-- Все метрики аддитивны, поэтому метрики окна получаются суммированием секций.
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_dq_partition_metrics (
+    table_name VARCHAR(100) NOT NULL,
+    partition_month DATE NOT NULL,
+    row_count BIGINT NOT NULL DEFAULT 0,
+    sum_purchase_amount NUMERIC NOT NULL DEFAULT 0,
+    null_customer_count BIGINT,
+    invalid_date_count BIGINT,
+    invalid_salary_count BIGINT,
+    duplicate_count BIGINT,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (table_name, partition_month)
+);
+
+-- Водяные знаки: до какого id строки таблицы уже учтены в кэше
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_dq_watermarks (
+    table_name VARCHAR(100) PRIMARY KEY,
+    last_row_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Пересчет секции читает только свой месяц
+CREATE INDEX IF NOT EXISTS idx_dm_task_effective_from ON s_sql_dds.t_dm_task(effective_from);
\ No newline at end of file
@@ -0,0 +1,41 @@
+-- Запуски проверок качества данных
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_dq_runs (
+    run_id SERIAL PRIMARY KEY,
+    mode VARCHAR(50),
+    start_dt DATE,
+    end_dt DATE,
+    started_at TIMESTAMP DEFAULT CLOCK_TIMESTAMP(),
+    finished_at TIMESTAMP,
+    status VARCHAR(20) DEFAULT 'running',
+    total_checks INTEGER,
+    passed_checks INTEGER,
+    failed_checks INTEGER,
+    error_checks INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_dq_runs_started ON s_sql_dds.t_dq_runs(started_at);
+
+-- Дневная сводка по типам проверок, пополняется в fn_dq_finish_run
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_dq_daily_rollup (
+    check_date DATE NOT NULL,
+    check_type VARCHAR(50) NOT NULL,
+    total_checks INTEGER NOT NULL DEFAULT 0,
+    passed_checks INTEGER NOT NULL DEFAULT 0,
+    failed_checks INTEGER NOT NULL DEFAULT 0,
+    error_checks INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (check_date, check_type)
+);
+
+-- Первичное заполнение сводки результатами, накопленными до появления запусков
+INSERT INTO s_sql_dds.t_dq_daily_rollup (check_date, check_type, total_checks, passed_checks, failed_checks, error_checks)
+SELECT 
+    execution_date::DATE,
+    COALESCE(check_type, 'unknown'),
+    COUNT(*),
+    COUNT(*) FILTER (WHERE status = 'passed'),
+    COUNT(*) FILTER (WHERE status = 'failed'),
+    COUNT(*) FILTER (WHERE status = 'error')
+FROM s_sql_dds.t_dq_check_results
+WHERE NOT EXISTS (SELECT 1 FROM s_sql_dds.t_dq_daily_rollup)
+GROUP BY 1, 2
+ON CONFLICT (check_date, check_type) DO NOTHING;
\ No newline at end of file
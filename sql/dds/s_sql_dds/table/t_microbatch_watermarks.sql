@@ -0,0 +1,7 @@
+-- Водяные знаки режима микро-батчей (soak.py): до какого id строки источника
+-- этапа уже обработаны. cleanse - t_sql_source_unstructured, dm_load - t_sql_source_structured
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_microbatch_watermarks (
+    stage VARCHAR(50) PRIMARY KEY,
+    last_row_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
\ No newline at end of file
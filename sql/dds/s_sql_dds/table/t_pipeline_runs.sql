@@ -0,0 +1,24 @@
+-- Запуски пайплайна и их параметры: незавершенный запуск с теми же параметрами
+-- продолжается с первого невыполненного этапа (см. checkpoint.py)
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_pipeline_runs (
+    run_id SERIAL PRIMARY KEY,
+    params_hash VARCHAR(64) NOT NULL,
+    params JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    started_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP(6)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_params 
+ON s_sql_dds.t_pipeline_runs(params_hash, run_id);
+
+-- Выполненные единицы работы: unit = '' - этап целиком, иначе чанк внутри этапа.
+-- Чанк отмечается в той же транзакции, что и его данные
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_pipeline_checkpoints (
+    run_id INTEGER NOT NULL REFERENCES s_sql_dds.t_pipeline_runs(run_id) ON DELETE CASCADE,
+    stage VARCHAR(50) NOT NULL,
+    unit VARCHAR(100) NOT NULL DEFAULT '',
+    details JSONB,
+    completed_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (run_id, stage, unit)
+);
\ No newline at end of file
@@ -0,0 +1,21 @@
+-- Планы тяжелых запросов пайплайна в режиме захвата планов (см. plan_capture.py):
+-- форма плана (plan_hash) и счетчики буферов сравниваются с предыдущим захватом
+-- того же запроса, чтобы заметить смену плана или рост чтений относительно строк
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_plan_captures (
+    capture_id SERIAL PRIMARY KEY,
+    run_id INTEGER,
+    source VARCHAR(50) NOT NULL,
+    statement_key VARCHAR(100) NOT NULL,
+    query_text TEXT,
+    plan JSONB NOT NULL,
+    plan_hash VARCHAR(64) NOT NULL,
+    actual_rows BIGINT,
+    shared_hit_blocks BIGINT,
+    shared_read_blocks BIGINT,
+    duration_ms NUMERIC(12,3),
+    regression VARCHAR(500),
+    captured_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_plan_captures_statement 
+ON s_sql_dds.t_plan_captures(statement_key, capture_id);
\ No newline at end of file
@@ -0,0 +1,12 @@
+-- Примененные миграции схемы (schema_migrations.py): версионированные миграции
+-- (name = V001..., применяются один раз) и повторяемые файлы функций и представлений
+-- (name = путь файла, version IS NULL, применяются заново при изменении checksum)
+CREATE SCHEMA IF NOT EXISTS s_sql_dds;
+
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_schema_version (
+    name VARCHAR(200) PRIMARY KEY,
+    version INTEGER,
+    description VARCHAR(200),
+    checksum VARCHAR(64) NOT NULL,
+    applied_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP
+);
\ No newline at end of file
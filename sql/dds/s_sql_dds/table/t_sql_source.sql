@@ -0,0 +1,56 @@
+-- Схема и таблицы источника: сырые данные, очищенные данные и тестовая копия
+CREATE SCHEMA IF NOT EXISTS s_sql_dds;
+
+-- Неструктурированная таблица: данные как сгенерированы
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_sql_source_unstructured (
+    id SERIAL PRIMARY KEY,
+    user_id VARCHAR(50),
+    user_name VARCHAR(100),
+    age INTEGER,
+    salary NUMERIC(15,2),
+    purchase_amount NUMERIC(15,2),
+    product_category VARCHAR(50),
+    region VARCHAR(50),
+    customer_status VARCHAR(20),
+    transaction_count INTEGER,
+    effective_from DATE,
+    effective_to DATE,
+    current_flag BOOLEAN,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Структурированная таблица: результат fn_etl_data_load
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_sql_source_structured (
+    id SERIAL PRIMARY KEY,
+    user_id VARCHAR(50) NOT NULL,
+    user_name VARCHAR(100),
+    age INTEGER,
+    salary NUMERIC(15,2),
+    purchase_amount NUMERIC(15,2),
+    product_category VARCHAR(50),
+    region VARCHAR(50),
+    customer_status VARCHAR(20),
+    transaction_count INTEGER,
+    effective_from DATE,
+    effective_to DATE,
+    current_flag BOOLEAN,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Тестовая таблица для автотестов (fn_etl_data_load_test)
+CREATE TABLE IF NOT EXISTS s_sql_dds.t_sql_source_structured_copy (
+    id SERIAL PRIMARY KEY,
+    user_id VARCHAR(50) NOT NULL,
+    user_name VARCHAR(100),
+    age INTEGER,
+    salary NUMERIC(15,2),
+    purchase_amount NUMERIC(15,2),
+    product_category VARCHAR(50),
+    region VARCHAR(50),
+    customer_status VARCHAR(20),
+    transaction_count INTEGER,
+    effective_from DATE,
+    effective_to DATE,
+    current_flag BOOLEAN,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
\ No newline at end of file
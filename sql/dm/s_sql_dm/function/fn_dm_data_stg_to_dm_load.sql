@@ -13,6 +13,14 @@ BEGIN
     WHERE (p_start_dt IS NULL OR effective_from >= p_start_dt)
       AND (p_end_dt IS NULL OR effective_to <= p_end_dt);
     
+    -- Факты staging, у которых изменился effective_from: прежняя версия лежит вне окна,
+    -- и PRIMARY KEY (fact_id, effective_from) не помешал бы вставить факт второй раз
+    DELETE t FROM t_dm_task t
+    JOIN t_dm_stg_task s ON s.fact_id = t.fact_id
+    WHERE t.effective_from <> s.effective_from
+      AND (p_start_dt IS NULL OR s.effective_from >= p_start_dt)
+      AND (p_end_dt IS NULL OR s.effective_to <= p_end_dt);
+    
     -- Очистка данных за период в целевой таблице
     DELETE FROM t_dm_task 
     WHERE (p_start_dt IS NULL OR effective_from >= p_start_dt)
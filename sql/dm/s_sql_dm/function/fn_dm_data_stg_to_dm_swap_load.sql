@@ -0,0 +1,153 @@
+DELIMITER //
+
+CREATE PROCEDURE fn_dm_data_stg_to_dm_swap_load(
+    IN p_start_dt DATE,
+    IN p_end_dt DATE
+)
+BEGIN
+    DECLARE v_done INT DEFAULT 0;
+    DECLARE v_partition VARCHAR(64);
+    DECLARE v_description VARCHAR(64);
+    DECLARE v_lower_bound DATE DEFAULT NULL;
+    DECLARE v_upper_bound DATE;
+    DECLARE v_partitions INT DEFAULT 0;
+    DECLARE v_loaded INT DEFAULT 0;
+    
+    DECLARE c_partitions CURSOR FOR
+        SELECT partition_name, partition_description
+        FROM tmp_dm_task_partitions
+        ORDER BY ordinal_position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = 1;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        -- Блокировка сессионная: при ошибке снимаем ее сами, подключение вернется в пул
+        DO RELEASE_LOCK('t_dm_task_swap_load');
+        RESIGNAL;
+    END;
+    
+    -- Имена t_dm_task_swap и t_dm_task_shadow общие, поэтому одновременные загрузки
+    -- (другой запуск, бэкфилл) выполняются по очереди
+    IF COALESCE(GET_LOCK('t_dm_task_swap_load', 600), 0) <> 1 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Timed out waiting for another t_dm_task swap load';
+    END IF;
+    
+    IF p_start_dt IS NULL AND p_end_dt IS NULL THEN
+        
+        -- Полная перезагрузка: собираем теневую таблицу и подменяем целевую одним RENAME
+        DROP TABLE IF EXISTS t_dm_task_shadow;
+        CREATE TABLE t_dm_task_shadow LIKE t_dm_task;
+        
+        INSERT INTO t_dm_task_shadow (
+            fact_id, customer_id, product_id, region_id, status_id,
+            age, salary, purchase_amount, transaction_count,
+            effective_from, effective_to, current_flag, created_dt
+        )
+        SELECT 
+            fact_id, customer_id, product_id, region_id, status_id,
+            age, salary, purchase_amount, transaction_count,
+            effective_from, effective_to, current_flag, created_dt
+        FROM t_dm_stg_task;
+        SET v_loaded = ROW_COUNT();
+        
+        RENAME TABLE t_dm_task TO t_dm_task_old, t_dm_task_shadow TO t_dm_task;
+        DROP TABLE t_dm_task_old;
+        
+        SELECT CONCAT('Loaded ', v_loaded, ' records via full table swap') AS result;
+        
+    ELSE
+        
+        -- Список секций фиксируем заранее: дальше по ходу цикла таблица меняется через DDL
+        DROP TEMPORARY TABLE IF EXISTS tmp_dm_task_partitions;
+        CREATE TEMPORARY TABLE tmp_dm_task_partitions AS
+        SELECT PARTITION_NAME AS partition_name,
+               TRIM(BOTH '''' FROM PARTITION_DESCRIPTION) AS partition_description,
+               PARTITION_ORDINAL_POSITION AS ordinal_position
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = 't_dm_task';
+        
+        -- load_staging_to_target (migrate_to_mysql.py) переключает такую таблицу на delete_insert
+        IF EXISTS (SELECT 1 FROM tmp_dm_task_partitions WHERE partition_name IS NULL) THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 't_dm_task is not partitioned by effective_from';
+        END IF;
+        
+        -- Факты staging, у которых изменился effective_from: прежняя версия лежит вне окна,
+        -- и PRIMARY KEY (fact_id, effective_from) не помешал бы вставить факт второй раз
+        DELETE t FROM t_dm_task t
+        JOIN t_dm_stg_task s ON s.fact_id = t.fact_id
+        WHERE t.effective_from <> s.effective_from
+          AND (p_start_dt IS NULL OR s.effective_from >= p_start_dt)
+          AND (p_end_dt IS NULL OR s.effective_to <= p_end_dt);
+        
+        SET @p_start_dt = p_start_dt;
+        SET @p_end_dt = p_end_dt;
+        
+        OPEN c_partitions;
+        partition_loop: LOOP
+            FETCH c_partitions INTO v_partition, v_description;
+            IF v_done = 1 THEN
+                LEAVE partition_loop;
+            END IF;
+            
+            SET v_upper_bound = IF(v_description = 'MAXVALUE', NULL, CAST(v_description AS DATE));
+            
+            -- Секция [v_lower_bound, v_upper_bound) пересекается с окном загрузки
+            IF (p_start_dt IS NULL OR v_upper_bound IS NULL OR v_upper_bound > p_start_dt)
+               AND (p_end_dt IS NULL OR v_lower_bound IS NULL OR v_lower_bound <= p_end_dt) THEN
+                
+                -- Новое содержимое секции собирается в отдельной несекционированной таблице
+                DROP TABLE IF EXISTS t_dm_task_swap;
+                CREATE TABLE t_dm_task_swap LIKE t_dm_task;
+                ALTER TABLE t_dm_task_swap REMOVE PARTITIONING;
+                
+                -- Строки секции вне окна переносятся как есть
+                SET @sql = CONCAT(
+                    'INSERT INTO t_dm_task_swap SELECT * FROM t_dm_task PARTITION (', v_partition, ') ',
+                    'WHERE NOT COALESCE((? IS NULL OR effective_from >= ?) AND (? IS NULL OR effective_to <= ?), FALSE)'
+                );
+                PREPARE stmt FROM @sql;
+                EXECUTE stmt USING @p_start_dt, @p_start_dt, @p_end_dt, @p_end_dt;
+                DEALLOCATE PREPARE stmt;
+                
+                -- Строки окна из staging, попадающие в эту секцию
+                INSERT INTO t_dm_task_swap (
+                    fact_id, customer_id, product_id, region_id, status_id,
+                    age, salary, purchase_amount, transaction_count,
+                    effective_from, effective_to, current_flag, created_dt
+                )
+                SELECT 
+                    fact_id, customer_id, product_id, region_id, status_id,
+                    age, salary, purchase_amount, transaction_count,
+                    effective_from, effective_to, current_flag, created_dt
+                FROM t_dm_stg_task
+                WHERE (p_start_dt IS NULL OR effective_from >= p_start_dt)
+                  AND (p_end_dt IS NULL OR effective_to <= p_end_dt)
+                  AND (v_lower_bound IS NULL OR effective_from >= v_lower_bound)
+                  AND (v_upper_bound IS NULL OR effective_from < v_upper_bound);
+                SET v_loaded = v_loaded + ROW_COUNT();
+                
+                -- Атомарная подмена секции: читатели видят либо старые, либо новые данные
+                SET @sql = CONCAT('ALTER TABLE t_dm_task EXCHANGE PARTITION ', v_partition, ' WITH TABLE t_dm_task_swap');
+                PREPARE stmt FROM @sql;
+                EXECUTE stmt;
+                DEALLOCATE PREPARE stmt;
+                
+                DROP TABLE t_dm_task_swap;
+                SET v_partitions = v_partitions + 1;
+            END IF;
+            
+            SET v_lower_bound = v_upper_bound;
+        END LOOP;
+        CLOSE c_partitions;
+        
+        DROP TEMPORARY TABLE IF EXISTS tmp_dm_task_partitions;
+        
+        SELECT CONCAT('Loaded ', v_loaded, ' records via ', v_partitions, ' partition swaps') AS result;
+        
+    END IF;
+    
+    DO RELEASE_LOCK('t_dm_task_swap_load');
+    
+END //
+
+DELIMITER ;
\ No newline at end of file
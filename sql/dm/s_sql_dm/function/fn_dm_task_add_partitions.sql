@@ -0,0 +1,42 @@
+DELIMITER //
+
+-- Добавляет месячные секции t_dm_task до p_until включительно, разрезая p_future
+CREATE PROCEDURE fn_dm_task_add_partitions(
+    IN p_until DATE
+)
+BEGIN
+    DECLARE v_last_bound DATE;
+    DECLARE v_next_bound DATE;
+    DECLARE v_partitions TEXT DEFAULT '';
+    
+    SELECT MAX(CAST(TRIM(BOTH '''' FROM PARTITION_DESCRIPTION) AS DATE)) INTO v_last_bound
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE()
+      AND TABLE_NAME = 't_dm_task'
+      AND PARTITION_DESCRIPTION <> 'MAXVALUE';
+    
+    WHILE v_last_bound <= p_until DO
+        SET v_next_bound = DATE_ADD(v_last_bound, INTERVAL 1 MONTH);
+        SET v_partitions = CONCAT(
+            v_partitions,
+            'PARTITION p', DATE_FORMAT(v_last_bound, '%Y_%m'),
+            ' VALUES LESS THAN (''', v_next_bound, '''), '
+        );
+        SET v_last_bound = v_next_bound;
+    END WHILE;
+    
+    IF v_partitions <> '' THEN
+        SET @sql = CONCAT(
+            'ALTER TABLE t_dm_task REORGANIZE PARTITION p_future INTO (',
+            v_partitions, 'PARTITION p_future VALUES LESS THAN (MAXVALUE))'
+        );
+        PREPARE stmt FROM @sql;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+    
+    SELECT CONCAT('Partitions ensured until ', p_until) AS result;
+    
+END //
+
+DELIMITER ;
\ No newline at end of file
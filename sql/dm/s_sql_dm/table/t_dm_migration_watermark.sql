@@ -0,0 +1,6 @@
+-- Водяные знаки дельта-миграции PostgreSQL -> MySQL
+CREATE TABLE IF NOT EXISTS t_dm_migration_watermark (
+    target_table VARCHAR(64) PRIMARY KEY,
+    last_fact_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
\ No newline at end of file
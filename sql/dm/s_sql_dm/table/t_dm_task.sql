@@ -1,6 +1,11 @@
 -- Целевая таблица в MySQL
+-- Секционирована по месяцам effective_from: загрузка окна подменяет секции
+-- через EXCHANGE PARTITION (см. fn_dm_data_stg_to_dm_swap_load).
+-- Ключ секционирования обязан входить в первичный ключ и в любой уникальный индекс,
+-- поэтому уникальность fact_id не задается индексом: загрузки сначала удаляют версию
+-- факта с другим effective_from (upsert_target_rows в migrate_to_mysql.py, процедуры загрузки).
 CREATE TABLE IF NOT EXISTS t_dm_task (
-    fact_id BIGINT PRIMARY KEY,
+    fact_id BIGINT NOT NULL,
     customer_id INT,
     product_id INT,
     region_id INT,
@@ -9,10 +14,51 @@ CREATE TABLE IF NOT EXISTS t_dm_task (
     salary DECIMAL(15,2),
     purchase_amount DECIMAL(15,2),
     transaction_count INT,
-    effective_from DATE,
+    effective_from DATE NOT NULL,
     effective_to DATE,
     current_flag BOOLEAN,
     created_dt DATE,
+    PRIMARY KEY (fact_id, effective_from),
     INDEX idx_transaction_date (effective_from),
     INDEX idx_customer (customer_id)
+)
+PARTITION BY RANGE COLUMNS (effective_from) (
+    PARTITION p_before VALUES LESS THAN ('2023-01-01'),
+    PARTITION p2023_01 VALUES LESS THAN ('2023-02-01'),
+    PARTITION p2023_02 VALUES LESS THAN ('2023-03-01'),
+    PARTITION p2023_03 VALUES LESS THAN ('2023-04-01'),
+    PARTITION p2023_04 VALUES LESS THAN ('2023-05-01'),
+    PARTITION p2023_05 VALUES LESS THAN ('2023-06-01'),
+    PARTITION p2023_06 VALUES LESS THAN ('2023-07-01'),
+    PARTITION p2023_07 VALUES LESS THAN ('2023-08-01'),
+    PARTITION p2023_08 VALUES LESS THAN ('2023-09-01'),
+    PARTITION p2023_09 VALUES LESS THAN ('2023-10-01'),
+    PARTITION p2023_10 VALUES LESS THAN ('2023-11-01'),
+    PARTITION p2023_11 VALUES LESS THAN ('2023-12-01'),
+    PARTITION p2023_12 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p2024_01 VALUES LESS THAN ('2024-02-01'),
+    PARTITION p2024_02 VALUES LESS THAN ('2024-03-01'),
+    PARTITION p2024_03 VALUES LESS THAN ('2024-04-01'),
+    PARTITION p2024_04 VALUES LESS THAN ('2024-05-01'),
+    PARTITION p2024_05 VALUES LESS THAN ('2024-06-01'),
+    PARTITION p2024_06 VALUES LESS THAN ('2024-07-01'),
+    PARTITION p2024_07 VALUES LESS THAN ('2024-08-01'),
+    PARTITION p2024_08 VALUES LESS THAN ('2024-09-01'),
+    PARTITION p2024_09 VALUES LESS THAN ('2024-10-01'),
+    PARTITION p2024_10 VALUES LESS THAN ('2024-11-01'),
+    PARTITION p2024_11 VALUES LESS THAN ('2024-12-01'),
+    PARTITION p2024_12 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025_01 VALUES LESS THAN ('2025-02-01'),
+    PARTITION p2025_02 VALUES LESS THAN ('2025-03-01'),
+    PARTITION p2025_03 VALUES LESS THAN ('2025-04-01'),
+    PARTITION p2025_04 VALUES LESS THAN ('2025-05-01'),
+    PARTITION p2025_05 VALUES LESS THAN ('2025-06-01'),
+    PARTITION p2025_06 VALUES LESS THAN ('2025-07-01'),
+    PARTITION p2025_07 VALUES LESS THAN ('2025-08-01'),
+    PARTITION p2025_08 VALUES LESS THAN ('2025-09-01'),
+    PARTITION p2025_09 VALUES LESS THAN ('2025-10-01'),
+    PARTITION p2025_10 VALUES LESS THAN ('2025-11-01'),
+    PARTITION p2025_11 VALUES LESS THAN ('2025-12-01'),
+    PARTITION p2025_12 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
 );
\ No newline at end of file
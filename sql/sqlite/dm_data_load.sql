@@ -0,0 +1,54 @@
+-- Загрузка справочников и фактов: аналог s_sql_dds.fn_dm_data_load для SQLite.
+-- Параметры :start_dt и :end_dt (NULL - без ограничения), шаги отмечены комментарием step
+-- step: dim_customer
+INSERT OR IGNORE INTO t_dim_customer (customer_name)
+SELECT DISTINCT user_name
+FROM t_sql_source_structured
+WHERE (:start_dt IS NULL OR effective_from >= :start_dt)
+  AND (:end_dt IS NULL OR effective_to <= :end_dt);
+
+-- step: dim_product
+INSERT OR IGNORE INTO t_dim_product (product_category)
+SELECT DISTINCT product_category
+FROM t_sql_source_structured
+WHERE (:start_dt IS NULL OR effective_from >= :start_dt)
+  AND (:end_dt IS NULL OR effective_to <= :end_dt);
+
+-- step: dim_region
+INSERT OR IGNORE INTO t_dim_region (region_name)
+SELECT DISTINCT region
+FROM t_sql_source_structured
+WHERE (:start_dt IS NULL OR effective_from >= :start_dt)
+  AND (:end_dt IS NULL OR effective_to <= :end_dt);
+
+-- step: dim_status
+INSERT OR IGNORE INTO t_dim_status (status_name)
+SELECT DISTINCT customer_status
+FROM t_sql_source_structured
+WHERE (:start_dt IS NULL OR effective_from >= :start_dt)
+  AND (:end_dt IS NULL OR effective_to <= :end_dt);
+
+-- step: fact_insert
+INSERT INTO t_dm_task (
+    customer_id, product_id, region_id, status_id, age, salary, purchase_amount,
+    transaction_count, effective_from, effective_to, current_flag
+)
+SELECT
+    c.customer_id,
+    p.product_id,
+    r.region_id,
+    st.status_id,
+    src.age,
+    src.salary,
+    src.purchase_amount,
+    src.transaction_count,
+    src.effective_from,
+    src.effective_to,
+    src.current_flag
+FROM t_sql_source_structured src
+LEFT JOIN t_dim_customer c ON src.user_name = c.customer_name
+LEFT JOIN t_dim_product p ON src.product_category = p.product_category
+LEFT JOIN t_dim_region r ON src.region = r.region_name
+LEFT JOIN t_dim_status st ON src.customer_status = st.status_name
+WHERE (:start_dt IS NULL OR src.effective_from >= :start_dt)
+  AND (:end_dt IS NULL OR src.effective_to <= :end_dt);
\ No newline at end of file
@@ -0,0 +1,102 @@
+-- Проверки качества витрины: аналог s_sql_dds.fn_dq_checks_load для SQLite.
+-- Параметры :run_id, :start_dt и :end_dt; каждая проверка - отдельный шаг step,
+-- ошибка выполнения шага записывается результатом со статусом error (см. sqlite_backend.py)
+-- step: Purchase amount sum comparison
+INSERT INTO t_dq_check_results
+(run_id, check_type, table_name, check_name, status, expected_value, actual_value, error_threshold, error_message)
+SELECT
+    :run_id, 'correctness', 'v_dm_task', 'Purchase amount sum comparison',
+    CASE WHEN ABS(expected - actual) / NULLIF(expected, 0) <= 0.01 THEN 'passed' ELSE 'failed' END,
+    expected, actual, 0.01,
+    CASE WHEN ABS(expected - actual) / NULLIF(expected, 0) <= 0.01
+         THEN 'Sum difference within acceptable range'
+         ELSE 'Sum difference exceeds threshold' END
+FROM (
+    SELECT
+        (SELECT COALESCE(SUM(purchase_amount), 0)
+         FROM t_sql_source_structured
+         WHERE (:start_dt IS NULL OR effective_from >= :start_dt)
+           AND (:end_dt IS NULL OR effective_to <= :end_dt)) AS expected,
+        (SELECT COALESCE(SUM(purchase_amount), 0)
+         FROM v_dm_task
+         WHERE (:start_dt IS NULL OR effective_from >= :start_dt)
+           AND (:end_dt IS NULL OR effective_to <= :end_dt)) AS actual
+) sums;
+
+-- step: Null values percentage
+INSERT INTO t_dq_check_results
+(run_id, check_type, table_name, column_name, check_name, status, actual_value, error_threshold, error_message)
+SELECT
+    :run_id, 'completeness', 'v_dm_task', 'customer_id', 'Null values percentage',
+    CASE WHEN COALESCE(null_pct, 0) <= 5 THEN 'passed' ELSE 'failed' END,
+    null_pct, 5,
+    CASE WHEN COALESCE(null_pct, 0) <= 5 THEN 'Null values within acceptable range' ELSE 'Too many null values' END
+FROM (
+    SELECT SUM(CASE WHEN customer_id IS NULL THEN 1 ELSE 0 END) * 100.0 / NULLIF(COUNT(*), 0) AS null_pct
+    FROM v_dm_task
+    WHERE (:start_dt IS NULL OR effective_from >= :start_dt)
+      AND (:end_dt IS NULL OR effective_to <= :end_dt)
+) nulls;
+
+-- step: Date range validation
+INSERT INTO t_dq_check_results
+(run_id, check_type, table_name, check_name, status, actual_value, error_threshold, error_message)
+SELECT
+    :run_id, 'consistency', 'v_dm_task', 'Date range validation',
+    CASE WHEN invalid = 0 THEN 'passed' ELSE 'failed' END,
+    invalid, 0,
+    CASE WHEN invalid = 0 THEN 'All date ranges are valid' ELSE 'Found invalid date ranges' END
+FROM (
+    SELECT COUNT(*) AS invalid
+    FROM v_dm_task
+    WHERE effective_to < effective_from
+      AND (:start_dt IS NULL OR effective_from >= :start_dt)
+      AND (:end_dt IS NULL OR effective_to <= :end_dt)
+) dates;
+
+-- step: Duplicate records check
+INSERT INTO t_dq_check_results
+(run_id, check_type, table_name, check_name, status, actual_value, error_threshold, error_message)
+SELECT
+    :run_id, 'uniqueness', 'v_dm_task', 'Duplicate records check',
+    CASE WHEN duplicates = 0 THEN 'passed' ELSE 'failed' END,
+    duplicates, 0,
+    CASE WHEN duplicates = 0 THEN 'No duplicate records found' ELSE 'Found duplicate records' END
+FROM (
+    SELECT COUNT(*) AS duplicates
+    FROM (
+        SELECT fact_id, customer_id, effective_from
+        FROM v_dm_task
+        WHERE (:start_dt IS NULL OR effective_from >= :start_dt)
+          AND (:end_dt IS NULL OR effective_to <= :end_dt)
+        GROUP BY fact_id, customer_id, effective_from
+        HAVING COUNT(*) > 1
+    ) groups
+) dups;
+
+-- step: Salary range validation
+INSERT INTO t_dq_check_results
+(run_id, check_type, table_name, column_name, check_name, status, actual_value, error_threshold, error_message)
+SELECT
+    :run_id, 'validity', 'v_dm_task', 'salary', 'Salary range validation',
+    CASE WHEN invalid = 0 THEN 'passed' ELSE 'failed' END,
+    invalid, 0,
+    CASE WHEN invalid = 0 THEN 'All salary values are valid' ELSE 'Found invalid salary values' END
+FROM (
+    SELECT COUNT(*) AS invalid
+    FROM v_dm_task
+    WHERE (salary < 0 OR salary > 1000000)
+      AND (:start_dt IS NULL OR effective_from >= :start_dt)
+      AND (:end_dt IS NULL OR effective_to <= :end_dt)
+) salaries;
+
+-- step: Overall DQ check
+INSERT INTO t_dq_check_results
+(run_id, check_type, table_name, check_name, status, expected_value, actual_value, error_message)
+SELECT
+    :run_id, 'summary', 'v_dm_task', 'Overall DQ check',
+    CASE WHEN SUM(status != 'passed') = 0 THEN 'passed' ELSE 'failed' END,
+    COUNT(*), SUM(status = 'passed'),
+    'Total: ' || COUNT(*) || ', Passed: ' || SUM(status = 'passed') || ', Failed: ' || SUM(status != 'passed')
+FROM t_dq_check_results
+WHERE run_id = :run_id;
\ No newline at end of file
@@ -0,0 +1,142 @@
+-- Схема встроенного бэкенда SQLite (см. sqlite_backend.py): те же таблицы, что
+-- s_sql_dds в PostgreSQL, без схемы и с типами SQLite. Даты хранятся строками ISO
+CREATE TABLE IF NOT EXISTS t_sql_source_unstructured (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    user_name TEXT,
+    age INTEGER,
+    salary REAL,
+    purchase_amount REAL,
+    product_category TEXT,
+    region TEXT,
+    customer_status TEXT,
+    transaction_count INTEGER,
+    effective_from TEXT,
+    effective_to TEXT,
+    current_flag INTEGER,
+    loaded_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS t_sql_source_structured (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    user_name TEXT,
+    age INTEGER,
+    salary REAL,
+    purchase_amount REAL,
+    product_category TEXT,
+    region TEXT,
+    customer_status TEXT,
+    transaction_count INTEGER,
+    effective_from TEXT,
+    effective_to TEXT,
+    current_flag INTEGER,
+    processed_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS t_dim_customer (
+    customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_name TEXT UNIQUE NOT NULL,
+    created_dt TEXT DEFAULT CURRENT_DATE
+);
+
+CREATE TABLE IF NOT EXISTS t_dim_product (
+    product_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_category TEXT UNIQUE NOT NULL,
+    created_dt TEXT DEFAULT CURRENT_DATE
+);
+
+CREATE TABLE IF NOT EXISTS t_dim_region (
+    region_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    region_name TEXT UNIQUE NOT NULL,
+    created_dt TEXT DEFAULT CURRENT_DATE
+);
+
+CREATE TABLE IF NOT EXISTS t_dim_status (
+    status_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status_name TEXT UNIQUE NOT NULL,
+    created_dt TEXT DEFAULT CURRENT_DATE
+);
+
+CREATE TABLE IF NOT EXISTS t_dm_task (
+    fact_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER REFERENCES t_dim_customer(customer_id),
+    product_id INTEGER REFERENCES t_dim_product(product_id),
+    region_id INTEGER REFERENCES t_dim_region(region_id),
+    status_id INTEGER REFERENCES t_dim_status(status_id),
+    age INTEGER,
+    salary REAL,
+    purchase_amount REAL,
+    transaction_count INTEGER,
+    effective_from TEXT,
+    effective_to TEXT,
+    current_flag INTEGER,
+    created_dt TEXT DEFAULT CURRENT_DATE
+);
+
+CREATE VIEW IF NOT EXISTS v_dm_task AS
+SELECT
+    fact_id,
+    customer_id,
+    product_id,
+    region_id,
+    status_id,
+    age,
+    salary,
+    purchase_amount,
+    transaction_count,
+    effective_from,
+    effective_to,
+    current_flag,
+    created_dt
+FROM t_dm_task;
+
+CREATE TABLE IF NOT EXISTS t_dq_runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mode TEXT,
+    start_dt TEXT,
+    end_dt TEXT,
+    started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    finished_at TEXT,
+    status TEXT DEFAULT 'running',
+    total_checks INTEGER,
+    passed_checks INTEGER,
+    failed_checks INTEGER,
+    error_checks INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS t_dq_check_results (
+    check_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER REFERENCES t_dq_runs(run_id),
+    check_type TEXT,
+    table_name TEXT,
+    column_name TEXT,
+    check_name TEXT,
+    execution_date TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    status TEXT,
+    expected_value REAL,
+    actual_value REAL,
+    error_threshold REAL,
+    error_message TEXT,
+    duration_ms REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_dq_check_run ON t_dq_check_results(run_id);
+
+-- Замена целевой таблицы MySQL: база dwh подключается через ATTACH
+CREATE TABLE IF NOT EXISTS dwh.t_dm_task (
+    fact_id INTEGER NOT NULL,
+    customer_id INTEGER,
+    product_id INTEGER,
+    region_id INTEGER,
+    status_id INTEGER,
+    age INTEGER,
+    salary REAL,
+    purchase_amount REAL,
+    transaction_count INTEGER,
+    effective_from TEXT NOT NULL,
+    effective_to TEXT,
+    current_flag INTEGER,
+    created_dt TEXT,
+    PRIMARY KEY (fact_id, effective_from)
+);
\ No newline at end of file
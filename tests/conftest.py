@@ -0,0 +1,14 @@
+import sys
+import pytest
+
+# Метрики тестов пишутся во временный каталог, а не в metrics/ рабочей копии
+METRICS_MODULES = ('metrics', 'memory_profile', 'soak')
+
+@pytest.fixture(autouse=True)
+def metrics_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / 'metrics')
+    monkeypatch.setenv('METRICS_DIR', path)
+    for name in METRICS_MODULES:
+        if name in sys.modules:
+            monkeypatch.setattr(sys.modules[name], 'METRICS_DIR', path)
+    return path
\ No newline at end of file
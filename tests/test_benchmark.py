@@ -0,0 +1,55 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data-pipeline', 'src'))
+
+import benchmark
+from benchmark import compare_results, summarize
+
+class TestBenchmark:
+    
+    def test_benchmark_regression_threshold(self):
+        #Регрессия - рост медианы выше порога и выше шума; пропущенные этапы не сравниваются
+        baseline = {'100k': {
+            'load': summarize([{'rows': 100000, 'duration_s': 30.0, 'memory_bytes': 10 ** 6}]),
+            'dq': summarize([{'rows': 58000, 'duration_s': 0.01, 'memory_bytes': 0}]),
+            'migrate': {'skipped': True},
+        }}
+        current = {'100k': {
+            'load': summarize([{'rows': 100000, 'duration_s': d, 'memory_bytes': 10 ** 6} for d in (33.0, 40.0, 34.0)]),
+            'dq': summarize([{'rows': 58000, 'duration_s': 0.03, 'memory_bytes': 0}]),
+            'migrate': summarize([{'rows': 58000, 'duration_s': 5.0, 'memory_bytes': None}]),
+        }}
+        assert current['100k']['load']['duration_s'] == 34.0
+        assert compare_results(current, baseline, threshold=0.2) == []
+        regressions = compare_results(current, baseline, threshold=0.1)
+        assert [(item['stage'], item['metric']) for item in regressions] == [('load', 'duration_s')]
+    
+    def test_refuses_database_not_dedicated_to_benchmark(self, monkeypatch):
+        #Замеры очищают таблицы: запуск только на базе бенчмарка, SQLite в памяти или с явным флагом
+        monkeypatch.setitem(benchmark.PG_CONFIG, 'database', 'etl_db')
+        monkeypatch.setattr(benchmark, 'SQLITE_PATH', 'etl_local.db')
+        for backend in ('postgres', 'sqlite'):
+            with pytest.raises(RuntimeError, match='--i-know-this-truncates'):
+                benchmark.run_benchmarks(sizes=['1k'], backend=backend)
+            benchmark.check_target_database(backend, allow_truncate=True)
+        
+        monkeypatch.setitem(benchmark.PG_CONFIG, 'database', benchmark.BENCHMARK_DATABASE)
+        monkeypatch.setattr(benchmark, 'SQLITE_PATH', ':memory:')
+        benchmark.check_target_database('postgres')
+        benchmark.check_target_database('sqlite')
+    
+    def test_migrate_skipped_unless_mysql_dedicated_to_benchmark(self, monkeypatch, tmp_path):
+        #Этап migrate перезаписывает витрину MySQL: на базе не для бенчмарка он пропускается даже с флагом
+        sizes = []
+        monkeypatch.setattr(benchmark, 'check_target_database', lambda backend, allow_truncate: None)
+        monkeypatch.setattr(benchmark, 'backend_function', lambda backend, name: lambda *args, **kwargs: None)
+        monkeypatch.setattr(benchmark, 'run_size', lambda rows, skip_mysql, backend: sizes.append(skip_mysql) or {
+            stage: {'skipped': True} for stage in benchmark.STAGES})
+        monkeypatch.setattr(benchmark, 'BENCHMARK_DIR', str(tmp_path))
+        monkeypatch.setitem(benchmark.MYSQL_CONFIG, 'database', 'dwh_db')
+        benchmark.run_benchmarks(sizes=['1k'], allow_truncate=True)
+        monkeypatch.setitem(benchmark.MYSQL_CONFIG, 'database', benchmark.BENCHMARK_MYSQL_DATABASE)
+        benchmark.run_benchmarks(sizes=['1k'])
+        assert sizes == [True, False]
\ No newline at end of file
@@ -0,0 +1,290 @@
+import os
+import sys
+import pytest
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data-pipeline', 'src'))
+
+from datetime import date
+from dq_sampling import wilson_interval, approximate_verdict
+from dq_retention import retention_cutoff, expired_partitions
+from chunk_dq import BatchDQReport, DataQualityError
+from plan_capture import plan_hash, plan_stats, detect_regression, parse_auto_explain_notice, statement_key
+import plan_capture
+from db_pool import get_pg_connection, release_pg_connection
+from etl import etl
+from fill_dm_table import fill_dm_table, reset_dm_facts
+from run_data_quality_checks import run_data_quality_checks, DQ_FUNCTIONS
+import dq_runner
+
+class TestApproximateDQ:
+    
+    def test_wilson_interval_contains_estimate(self):
+        #Оценка лежит внутри интервала, интервал сужается с ростом выборки
+        estimate, lower, upper = wilson_interval(50, 1000)
+        assert lower < estimate < upper
+        assert abs(estimate - 5.0) < 1e-9
+        _, wide_lower, wide_upper = wilson_interval(5, 100)
+        assert wide_upper - wide_lower > upper - lower
+    
+    def test_wilson_interval_edges(self):
+        #Пустая выборка не дает оценки, нулевая доля дает интервал от нуля
+        assert wilson_interval(0, 0) == (None, None, None)
+        estimate, lower, upper = wilson_interval(0, 500)
+        assert estimate == 0 and lower == 0 and upper > 0
+    
+    def test_approximate_verdict(self):
+        #Падение только когда интервал целиком выше порога
+        assert approximate_verdict(6.0, 8.0, 5) == 'failed'
+        assert approximate_verdict(1.0, 4.0, 5) == 'passed'
+        assert approximate_verdict(4.0, 6.0, 5) == 'borderline'
+    
+    def test_approximate_mode_from_run_data_quality_checks(self):
+        #Режим approximate доступен из run_data_quality_checks, в том числе для окна бэкфилла
+        from dq_sampling import APPROX_CHECKS
+        etl(rows=300, seed=11)
+        reset_dm_facts()
+        fill_dm_table()
+        results = run_data_quality_checks('2023-01-01', '2023-06-30', mode='approximate', by_start=True)
+        assert [result['check']['name'] for result in results] == [check['name'] for check in APPROX_CHECKS]
+        
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT status, total_checks FROM s_sql_dds.t_dq_runs
+            WHERE run_id = (SELECT MAX(run_id) FROM s_sql_dds.t_dq_runs WHERE mode = 'approximate')
+        """)
+        status, total = cur.fetchone()
+        release_pg_connection(conn)
+        assert status != 'running' and total == len(APPROX_CHECKS)
+
+class TestDQRetention:
+    
+    def test_retention_cutoff(self):
+        #Граница хранения корректно переходит через год
+        assert retention_cutoff(date(2026, 3, 15), 6) == date(2025, 9, 1)
+        assert retention_cutoff(date(2026, 3, 15), 0) == date(2026, 3, 1)
+    
+    def test_expired_partitions(self):
+        #Удаляются только месячные секции раньше границы, DEFAULT не трогаем
+        names = [
+            't_dq_check_results_default',
+            't_dq_check_results_p2025_08',
+            't_dq_check_results_p2025_09',
+            't_dq_check_results_p2026_03',
+        ]
+        assert expired_partitions(names, date(2026, 3, 15), 6) == ['t_dq_check_results_p2025_08']
+
+class TestChunkDQ:
+    
+    def make_chunk(self, rows, negative_salary=0):
+        chunk = pd.DataFrame({
+            'user_id': [f'user_{i:04d}' for i in range(rows)],
+            'age': [30] * rows,
+            'salary': [50000.0] * rows,
+            'product_category': ['Books'] * rows,
+            'effective_from': [date(2023, 1, 1)] * rows,
+            'effective_to': [date(2023, 6, 1)] * rows,
+        })
+        chunk.loc[:negative_salary - 1, 'salary'] = -100.0
+        return chunk
+    
+    def test_clean_batch_accumulates(self):
+        #Чистые чанки накапливаются в отчете без прерывания
+        report = BatchDQReport(min_rows=100)
+        report.add_chunk(self.make_chunk(100, negative_salary=5))
+        report.add_chunk(self.make_chunk(100))
+        assert report.rows == 200 and report.chunks == 2
+        assert report.rate('Negative salary') == 2.5
+        assert all(result['status'] == 'passed' for result in report.to_results())
+    
+    def test_batch_report_saved_without_metric_value(self):
+        #Отчет батча без отдельной метрики пишется с пустым metric_value
+        class Cursor:
+            def __init__(self):
+                self.params = []
+            def execute(self, query, params=None):
+                self.params.append(params)
+        
+        report = BatchDQReport(min_rows=100)
+        report.add_chunk(self.make_chunk(100))
+        cursor = Cursor()
+        dq_runner.save_results(cursor, report.to_results())
+        assert len(cursor.params) == len(report.rules) + 1
+        assert all(params[7] is None for params in cursor.params[:-1])
+    
+    def test_bad_batch_aborts_early(self):
+        #Превышение порога прерывает загрузку на первом же чанке после min_rows
+        report = BatchDQReport(min_rows=100)
+        with pytest.raises(DataQualityError) as error:
+            report.add_chunk(self.make_chunk(100, negative_salary=50))
+        assert error.value.report.chunks == 1
+        assert 'Negative salary' in str(error.value)
+
+class TestPlanRegression:
+    
+    def make_capture(self, scan, rows, hit, read=0):
+        plan = {
+            'Node Type': 'Aggregate', 'Actual Rows': 1, 'Actual Loops': 1,
+            'Shared Hit Blocks': hit, 'Shared Read Blocks': read,
+            'Plans': [dict(scan, **{'Actual Rows': rows, 'Actual Loops': 1, 'Parent Relationship': 'Outer'})],
+        }
+        return dict(plan_stats(plan), plan=plan, plan_hash=plan_hash(plan))
+    
+    def test_plan_shape_change(self):
+        #Index Scan сменился на Seq Scan - регрессия с названием таблицы
+        index_scan = {'Node Type': 'Index Scan', 'Relation Name': 't_dm_task', 'Index Name': 'idx_dm_task_dates'}
+        seq_scan = {'Node Type': 'Seq Scan', 'Relation Name': 't_dm_task'}
+        previous = self.make_capture(index_scan, 1000, 50)
+        current = self.make_capture(seq_scan, 1000, 60)
+        assert detect_regression(previous, current) == 'plan changed: Seq Scan on t_dm_task'
+        assert detect_regression(None, current) is None
+    
+    def test_buffers_grow_faster_than_rows(self):
+        #Рост буферов пропорционально строкам - норма, непропорциональный - регрессия
+        scan = {'Node Type': 'Seq Scan', 'Relation Name': 't_dm_task'}
+        previous = self.make_capture(scan, 1000, 200)
+        assert detect_regression(previous, self.make_capture(scan, 2000, 300, 100)) is None
+        regression = detect_regression(previous, self.make_capture(scan, 1000, 300, 300))
+        assert regression.startswith('buffers per row grew 3.0x')
+    
+    def test_parse_auto_explain_notice(self):
+        notice = ('NOTICE:  duration: 1.250 ms  plan:\n'
+                  '{"Query Text": "SELECT 1", "Plan": {"Node Type": "Result", "Actual Rows": 1}}\n')
+        parsed = parse_auto_explain_notice(notice)
+        assert parsed['duration_ms'] == 1.25
+        assert parsed['plan']['Node Type'] == 'Result'
+        assert parse_auto_explain_notice('NOTICE:  relation already exists') is None
+    
+    def test_statement_key_ignores_literals(self):
+        #Тот же запрос с другим окном дат и границами fact_id получает тот же ключ
+        query = ("SELECT * FROM s_sql_dds.v_dm_task WHERE effective_from >= '{}' "
+                 "AND fact_id > {} AND status_id IN ({})")
+        assert (statement_key(query.format('2023-01-01', 100, '1, 2'))
+                == statement_key(query.format('2023-02-01', 5000, '3')))
+        assert statement_key(query.format('2023-01-01', 100, '1')) != statement_key('SELECT 1')
+    
+    def test_fallback_explain_only_without_auto_explain(self, monkeypatch):
+        #EXPLAIN ANALYZE повторяет запросы этапа, поэтому выполняется только без auto_explain
+        class Connection:
+            notices = []
+        
+        explained = []
+        monkeypatch.setitem(plan_capture._capture, 'enabled', True)
+        monkeypatch.setattr(plan_capture, '_disable_auto_explain', lambda conn, client_min_messages: None)
+        monkeypatch.setattr(plan_capture, 'save_captures', lambda source, captures: None)
+        monkeypatch.setattr(plan_capture, 'explain_statements',
+                            lambda conn, source, params: explained.append(source) or [])
+        for available in (True, False):
+            monkeypatch.setattr(plan_capture, '_enable_auto_explain', lambda conn: 'notice' if available else None)
+            with plan_capture.capture_plans(Connection(), 'dq.single_pass'):
+                pass
+        assert explained == ['dq.single_pass']
+    
+    def test_capture_keeps_stage_transaction(self, monkeypatch):
+        #Захват планов не фиксирует и не откатывает транзакцию этапа: упавшие проверки
+        #не оставляют запуск в статусе running, успешный запуск получает свои результаты
+        etl(rows=300, seed=11)
+        reset_dm_facts()
+        fill_dm_table()
+        monkeypatch.setitem(plan_capture._capture, 'enabled', True)
+        monkeypatch.setitem(plan_capture._capture, 'auto_explain', None)
+        
+        def runs():
+            conn = get_pg_connection()
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FILTER (WHERE status = 'running'), MAX(run_id) FROM s_sql_dds.t_dq_runs")
+            result = cur.fetchone()
+            release_pg_connection(conn)
+            return result
+        
+        before, _ = runs()
+        with monkeypatch.context() as patch:
+            patch.setitem(DQ_FUNCTIONS, 'per_check', 's_sql_dds.fn_missing')
+            with pytest.raises(Exception):
+                run_data_quality_checks('2023-01-01', '2023-12-31')
+        running, last_run = runs()
+        assert running == before
+        
+        monkeypatch.setitem(plan_capture._capture, 'auto_explain', None)
+        run_data_quality_checks('2023-01-01', '2023-12-31')
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT run_id, status, total_checks FROM s_sql_dds.t_dq_runs WHERE run_id > %s", (last_run,))
+        (_, status, total), = cur.fetchall()
+        release_pg_connection(conn)
+        assert status != 'running' and total > 0
+    
+    def test_fallback_statements_follow_dq_functions(self):
+        #Запасной запрос однопроходного режима считает дубликаты так же, как его функция
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        path = os.path.join(root, 'sql', 'dds', 's_sql_dds', 'function', 'fn_dq_checks_load_single_pass.sql')
+        duplicates = 'COUNT(*) - COUNT(DISTINCT (fact_id, customer_id, effective_from))'
+        assert duplicates in open(path, encoding='utf-8').read()
+        assert duplicates in plan_capture.EXPLAIN_STATEMENTS['dq.single_pass']['fact_metrics']
+        assert 'HAVING COUNT(*) > 1' in plan_capture.EXPLAIN_STATEMENTS['dq']['duplicates']
+
+class TestDQRunner:
+    
+    def test_parallel_checks_keep_raw_sum(self):
+        #Режим parallel из run_data_quality_checks: в actual_value сумма витрины, разница - в metric_value;
+        #упавшая проверка дает строку error и не мешает остальным
+        etl(rows=300, seed=11)
+        reset_dm_facts()
+        fill_dm_table()
+        broken = dict(dq_runner.DQ_CHECKS[0], name='Broken check', metric_sql='SELECT 1 / 0')
+        checks = dq_runner.DQ_CHECKS + [broken]
+        
+        results = run_data_quality_checks('2023-01-01', '2023-12-31', mode='parallel')
+        assert {result['check']['name'] for result in results} == {check['name'] for check in dq_runner.DQ_CHECKS}
+        results = dq_runner.run_dq_checks_parallel('2023-01-01', '2023-12-31', checks=checks)
+        by_name = {result['check']['name']: result for result in results}
+        assert by_name['Broken check']['status'] == 'error'
+        assert all(by_name[check['name']]['status'] == 'passed' for check in dq_runner.DQ_CHECKS)
+        
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT COALESCE(SUM(purchase_amount), 0) FROM s_sql_dds.v_dm_task
+            WHERE effective_from >= '2023-01-01' AND effective_to <= '2023-12-31'
+        """)
+        dm_sum = cur.fetchone()[0]
+        cur.execute("""
+            SELECT actual_value, expected_value, metric_value FROM s_sql_dds.t_dq_check_results
+            WHERE run_id = (SELECT MAX(run_id) FROM s_sql_dds.t_dq_runs WHERE mode = 'parallel')
+              AND check_name = 'Purchase amount sum comparison'
+        """)
+        actual, expected, metric = cur.fetchone()
+        release_pg_connection(conn)
+        assert actual == dm_sum > 0
+        assert metric == abs(expected - actual) / expected <= 0.01
+    
+    def test_dashboard_recent_checks_skip_drift_and_running_runs(self, capsys):
+        #Последние проверки на дашборде берутся из завершенного запуска проверок, а не из дрейфа или незавершенного
+        from dq_dashboard import generate_dq_dashboard
+        etl(rows=300, seed=11)
+        reset_dm_facts()
+        fill_dm_table()
+        run_data_quality_checks('2023-01-01', '2023-12-31', mode='parallel')
+        
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        run_ids = []
+        for mode, status in (('drift', 'completed'), ('parallel', 'running')):
+            cur.execute("INSERT INTO s_sql_dds.t_dq_runs (mode, status) VALUES (%s, %s) RETURNING run_id", (mode, status))
+            run_ids.append(cur.fetchone()[0])
+            cur.execute("""
+                INSERT INTO s_sql_dds.t_dq_check_results (run_id, check_type, check_name, status, execution_date)
+                VALUES (%s, 'drift', %s, 'failed', CURRENT_TIMESTAMP)
+            """, (run_ids[-1], f'Not a recent check ({mode})'))
+        conn.commit()
+        try:
+            generate_dq_dashboard()
+            output = capsys.readouterr().out
+        finally:
+            cur.execute("DELETE FROM s_sql_dds.t_dq_check_results WHERE run_id = ANY(%s)", (run_ids,))
+            cur.execute("DELETE FROM s_sql_dds.t_dq_runs WHERE run_id = ANY(%s)", (run_ids,))
+            conn.commit()
+            release_pg_connection(conn)
+        assert 'Purchase amount sum comparison' in output
+        assert 'Not a recent check' not in output
\ No newline at end of file
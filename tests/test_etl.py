@@ -1,6 +1,22 @@
 import pytest
 import psycopg2
 import os
+import sys
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data-pipeline', 'src'))
+
+from get_dataset import get_dataset
+from db_pool import get_pg_connection, release_pg_connection
+from etl import etl
+from schema_migrations import apply_migrations, migration_plan
+from backfill import run_backfill
+from fill_dm_table import fill_dm_table, reset_dm_facts
+from run_data_quality_checks import run_data_quality_checks
+from checkpoint import start_pipeline_run, finish_pipeline_run
+from migrate_to_mysql import window_fingerprint
+from column_profiling import profile_batch, window_profiles
+import sqlite_backend
 
 # Адаптивный конфиг - работает везде
 DB_CONFIG = {
@@ -102,40 +118,414 @@ class TestETLPipeline:
         except Exception as e:
             pytest.fail(f"Test ETL function failed: {e}")
     
-    def test_data_quality(self):
-        #Тест качества данных в структурированной таблице
+    def test_dataset_seed_reproducible(self):
+        #С одинаковым seed данные генерируются одинаково (нужно для продолжения запуска)
+        first = get_dataset(rows=200, seed=7)
+        second = get_dataset(rows=200, seed=7)
+        assert first.equals(second)
+        assert not first.equals(get_dataset(rows=200, seed=8))
+
+    def test_pool_resets_session(self):
+        #Подключение возвращается в пул без настроек сессии предыдущего этапа
+        conn = get_pg_connection('dq')
+        pid = conn.get_backend_pid()
+        cur = conn.cursor()
+        cur.execute("SELECT set_config('dq.run_id', '42', FALSE), current_setting('work_mem')")
+        assert cur.fetchone()[1] == '128MB'
+        release_pg_connection(conn)
+        
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT current_setting('dq.run_id', TRUE), current_setting('work_mem')")
+        run_id, work_mem = cur.fetchone()
+        assert conn.get_backend_pid() == pid
+        release_pg_connection(conn)
+        assert not run_id
+        assert work_mem != '128MB'
+    
+    def test_mysql_pool_bounds_active_connections(self, monkeypatch):
+        #Выданных подключений MySQL не больше MYSQL_POOL_MAX, следующее ждет возврата
+        import threading
+        import db_pool
+        
+        class MySQLStub:
+            def cursor(self):
+                return self
+            def execute(self, query, params=None):
+                pass
+            def rollback(self):
+                pass
+            def close(self):
+                pass
+        
+        monkeypatch.setattr(db_pool, 'connect_mysql', MySQLStub)
+        monkeypatch.setattr(db_pool, '_mysql_slots', threading.BoundedSemaphore(2))
+        held = [db_pool.get_mysql_connection(), db_pool.get_mysql_connection()]
+        got = []
+        worker = threading.Thread(target=lambda: got.append(db_pool.get_mysql_connection()), daemon=True)
+        worker.start()
+        worker.join(0.5)
+        assert not got
+        db_pool.release_mysql_connection(held.pop())
+        worker.join(5)
+        assert len(got) == 1
+        for conn in held + got:
+            db_pool.release_mysql_connection(conn)
+        db_pool.close_all()
+        assert len(db_pool._last_used) == 0
+    
+    def test_schema_migrations_idempotent(self):
+        #На актуальной базе миграции не применяются повторно, все версии записаны
+        apply_migrations()
+        assert apply_migrations() == []
+        
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT name, checksum FROM s_sql_dds.t_schema_version")
+        applied = dict(cur.fetchall())
+        release_pg_connection(conn)
+        for name, version, description, files, checksum in migration_plan():
+            assert applied[name] == checksum
+    
+    def test_etl_process_integration(self):
+        #Интеграционный тест всего ETL процесса
         try:
+            etl(rows=300, seed=11)
+            
             conn = psycopg2.connect(**DB_CONFIG)
             cur = conn.cursor()
-            
-            # Проверяем, что нет отрицательных зарплат
-            cur.execute("SELECT COUNT(*) FROM s_sql_dds.t_sql_source_structured WHERE salary < 0;")
-            negative_salaries = cur.fetchone()[0]
-            assert negative_salaries == 0, f"Found {negative_salaries} records with negative salary"
-            
-            # Проверяем, что возраст в допустимом диапазоне
-            cur.execute("SELECT COUNT(*) FROM s_sql_dds.t_sql_source_structured WHERE age < 18 OR age > 100;")
-            invalid_ages = cur.fetchone()[0]
-            assert invalid_ages == 0, f"Found {invalid_ages} records with invalid age"
-            
-            # Проверяем, что даты корректны
-            cur.execute("SELECT COUNT(*) FROM s_sql_dds.t_sql_source_structured WHERE effective_to < effective_from;")
-            invalid_dates = cur.fetchone()[0]
-            assert invalid_dates == 0, f"Found {invalid_dates} records with invalid date range"
-            
+            cur.execute("SELECT COUNT(*) FROM s_sql_dds.t_sql_source_unstructured;")
+            raw_count = cur.fetchone()[0]
+            cur.execute("""
+                SELECT COUNT(*) FROM s_sql_dds.t_sql_source_structured
+                WHERE effective_from >= '2023-01-01' AND effective_to <= '2023-12-31';
+            """)
+            structured_count = cur.fetchone()[0]
             cur.close()
             conn.close()
-            print("Data quality test PASSED")
+            
+            assert raw_count == len(get_dataset(rows=300, seed=11))
+            assert 0 < structured_count <= raw_count
+            print("Integration test PASSED")
             
         except Exception as e:
-            pytest.fail(f"Data quality test failed: {e}")
+            pytest.fail(f"Integration test failed: {e}")
+    
+    def test_backfill_windows_partition_rows(self):
+        #Окна бэкфилла по effective_from: каждая строка ровно в одном окне, повторный бэкфилл не дублирует факты
+        etl(rows=300, seed=11)
+        for _ in range(2):
+            run_backfill('2023-01-01', '2023-12-31', concurrency=3, skip=['dq', 'migrate'], resume=False)
+        
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        counts = []
+        for table, condition in (('t_sql_source_unstructured', 'AND user_id IS NOT NULL'),
+                                 ('t_sql_source_structured', ''), ('t_dm_task', '')):
+            cur.execute(f"SELECT COUNT(*) FROM s_sql_dds.{table} "
+                        f"WHERE effective_from BETWEEN '2023-01-01' AND '2023-12-31' {condition}")
+            counts.append(cur.fetchone()[0])
+        release_pg_connection(conn)
+        assert counts[0] > 0
+        assert counts == [counts[0]] * 3
+    
+    def test_backfill_window_rerun_with_corrected_date(self):
+        #Дата до 2020 года очищается в 2023-01-01: строка попадает только в окно очищенной даты и не дублируется при повторе
+        etl(rows=300, seed=11)
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO s_sql_dds.t_sql_source_unstructured
+            (user_id, user_name, age, salary, purchase_amount, product_category, region,
+             customer_status, transaction_count, effective_from, effective_to, current_flag)
+            VALUES ('backfill', 'Backfill User', 30, 1000, 100, 'Books', 'North', 'active', 1,
+                    '2019-06-01', '2023-02-01', TRUE)
+        """)
+        for start_dt, end_dt in (('2023-01-01', '2023-01-31'), ('2019-06-01', '2019-06-30'), ('2019-06-01', '2019-06-30')):
+            cur.execute("SELECT s_sql_dds.fn_etl_data_load(%s, %s, TRUE)", (start_dt, end_dt))
+        cur.execute("SELECT effective_from FROM s_sql_dds.t_sql_source_structured WHERE user_id = 'backfill'")
+        rows = cur.fetchall()
+        conn.rollback()
+        release_pg_connection(conn)
+        assert [row[0].isoformat() for row in rows] == ['2023-01-01']
+    
+    def test_columnar_export_streams_parts(self, tmp_path, monkeypatch):
+        #Без pyarrow каждая пачка пишется отдельным .npz, месяц не копится в памяти
+        import numpy as np
+        import export_to_columnar as columnar
+        monkeypatch.setattr(columnar, 'pa', None)
+        etl(rows=300, seed=11)
+        fill_dm_table()
+        exported = columnar.export_to_columnar('2023-01-01', '2023-12-31', output_dir=str(tmp_path), batch_size=10)
+        
+        parts = sorted((tmp_path / 'v_dm_task').glob('effective_month=*/part-*.npz'))
+        sizes = [len(np.load(part)['fact_id']) for part in parts]
+        assert sum(sizes) == exported > 0
+        assert max(sizes) <= 10
+        assert any(part.name.endswith('-00001.npz') for part in parts)
+    
+    def test_columnar_export_keeps_rest_of_partial_month(self, tmp_path, monkeypatch):
+        #Окно с середины месяца не стирает остальные данные месяца, повтор окна не дублирует части
+        import numpy as np
+        import export_to_columnar as columnar
+        monkeypatch.setattr(columnar, 'pa', None)
+        etl(rows=300, seed=11)
+        fill_dm_table()
+        columnar.export_to_columnar(output_dir=str(tmp_path), batch_size=1000)
+        march = tmp_path / 'v_dm_task' / 'effective_month=2023-03'
+        whole = np.load(march / 'part-00000.npz')['effective_from']
+        assert (whole < np.datetime64('2023-03-15')).any()
+        
+        for _ in range(2):
+            columnar.export_to_columnar('2023-03-15', output_dir=str(tmp_path), batch_size=1000)
+        names = sorted(part.name for part in march.iterdir())
+        assert names == ['part-00000.npz', 'part-2023-03-15_max-00000.npz']
+        assert len(np.load(march / 'part-00000.npz')['effective_from']) == len(whole)
+        window = np.load(march / names[1])['effective_from']
+        assert (window >= np.datetime64('2023-03-15')).all()
+        # Месяцы, попавшие в окно целиком, перезаписываются как раньше
+        assert [part.name for part in (tmp_path / 'v_dm_task' / 'effective_month=2023-04').iterdir()] == ['part-00000.npz']
+    
+    def test_profiles_cover_load_window_once(self):
+        #Батч профилирует только строки окна; повторный профиль окна не удваивает статистику периода
+        etl(rows=300, seed=11)
+        for start_dt, end_dt in (('2023-01-01', '2023-06-30'), ('2023-07-01', '2023-12-31'),
+                                 ('2023-01-01', '2023-06-30')):
+            profile_batch(start_dt, end_dt, tables=['t_sql_source_structured'])
+        
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT COUNT(*) FILTER (WHERE effective_from <= '2023-06-30'), COUNT(*)
+            FROM s_sql_dds.t_sql_source_structured
+            WHERE effective_from BETWEEN '2023-01-01' AND '2023-12-31'
+        """)
+        first_half, year = cur.fetchone()
+        release_pg_connection(conn)
+        assert window_profiles('t_sql_source_structured', '2023-01-01', '2023-06-30')['age'].row_count == first_half
+        assert window_profiles('t_sql_source_structured', '2023-01-01', '2023-12-31')['age'].row_count == year
+    
+    def test_run_resumed_only_on_request(self):
+        #Обычный запуск открывает новый run, продолжение - только с resume; отпечаток окна меняется с данными
+        params = {'command': 'test_resume', 'rows': 10}
+        first_run, _ = start_pipeline_run(params)
+        finish_pipeline_run(first_run, 'partial')
+        second_run, _ = start_pipeline_run(params)
+        finish_pipeline_run(second_run, 'partial')
+        assert second_run != first_run
+        assert start_pipeline_run(params, resume=True)[0] == second_run
+        finish_pipeline_run(second_run, 'success')
+        
+        etl(rows=300, seed=11)
+        fill_dm_table()
+        conn = get_pg_connection()
+        before = window_fingerprint(conn.cursor(), '2023-01-01', '2023-12-31')
+        release_pg_connection(conn)
+        reset_dm_facts()
+        fill_dm_table()
+        conn = get_pg_connection()
+        after = window_fingerprint(conn.cursor(), '2023-01-01', '2023-12-31')
+        release_pg_connection(conn)
+        assert before != after
+    
+    def test_bulk_load_matches_row_load(self):
+        #Вставка чанка одним запросом дает те же строки, что и построчная
+        from load_data_to_db import load_data_to_db
+        df = get_dataset(rows=300, seed=11)
+        loaded = []
+        for bulk in (False, True):
+            assert load_data_to_db(df, chunk_size=64, bulk=bulk) == len(df)
+            conn = get_pg_connection()
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT user_id, user_name, age, salary, purchase_amount, product_category, region,
+                       customer_status, transaction_count, effective_from, effective_to, current_flag
+                FROM s_sql_dds.t_sql_source_unstructured ORDER BY id
+            """)
+            loaded.append(cur.fetchall())
+            release_pg_connection(conn)
+        assert loaded[0] == loaded[1]
+    
+    def test_microbatch_processes_only_new_rows(self):
+        #Микро-батч очищает и загружает в витрину только строки после водяного знака, без отчета в t_dq_runs
+        from load_data_to_db import load_data_to_db
+        from soak import reset_watermarks, run_incremental
+        etl(rows=300, seed=11)
+        fill_dm_table()
+        reset_watermarks()
+        
+        def counts():
+            conn = get_pg_connection()
+            cur = conn.cursor()
+            result = []
+            for table in ('t_sql_source_structured', 't_dm_task', 't_dq_runs'):
+                cur.execute(f"SELECT COUNT(*) FROM s_sql_dds.{table}")
+                result.append(cur.fetchone()[0])
+            release_pg_connection(conn)
+            return result
+        
+        before = counts()
+        df = get_dataset(rows=300, seed=11)
+        assert load_data_to_db(df, append=True, bulk=True) == len(df)
+        cleansed = run_incremental('cleanse', 'transform')
+        assert run_incremental('cleanse', 'transform') == 0
+        loaded = run_incremental('dm_load', 'dm_load')
+        assert run_incremental('dm_load', 'dm_load') == 0
+        after = counts()
+        assert 0 < cleansed <= len(df)
+        assert after[0] - before[0] == cleansed
+        assert after[1] - before[1] == loaded == cleansed
+        assert after[2] == before[2]
+    
+    def test_sharded_migration_with_shards_at_pool_size(self, monkeypatch):
+        #Шардов столько же, сколько подключений в пуле: контрольные точки пишутся без второго подключения
+        import threading
+        import time
+        import migrate_to_mysql
+        from config import PG_POOL_MAX
+        from checkpoint import completed_units
+        
+        class MySQLStub:
+            def cursor(self):
+                return self
+            def execute(self, query, params=None):
+                pass
+            def commit(self):
+                pass
+            def rollback(self):
+                pass
+        
+        def copy_range(pg_conn, mysql_conn, lo, hi, start_dt=None, end_dt=None):
+            time.sleep(0.05)
+            return hi - lo + 1
+        
+        monkeypatch.setattr(migrate_to_mysql, 'copy_fact_range', copy_range)
+        monkeypatch.setattr(migrate_to_mysql, 'get_mysql_connection', lambda stage=None: MySQLStub())
+        monkeypatch.setattr(migrate_to_mysql, 'release_mysql_connection', lambda conn: None)
+        monkeypatch.setattr(migrate_to_mysql, 'load_staging_to_target', lambda *args: None)
+        etl(rows=300, seed=11)
+        fill_dm_table()
+        run_id, _ = start_pipeline_run({'command': 'test_shards'})
+        
+        worker = threading.Thread(target=migrate_to_mysql.migrate_to_mysql_sharded, daemon=True,
+                                  kwargs={'shards': PG_POOL_MAX, 'run_id': run_id})
+        worker.start()
+        worker.join(timeout=60)
+        assert not worker.is_alive()
+        units = completed_units(run_id, 'migrate')
+        finish_pipeline_run(run_id, 'success')
+        assert len([unit for unit in units if unit.startswith('shard:')]) == PG_POOL_MAX
 
-    def test_etl_process_integration(self):
-        #Интеграционный тест всего ETL процесса
+class TestBackendParity:
+    
+    # Одинаковые запросы к обоим бэкендам; схема PostgreSQL подставляется в {schema}
+    STRUCTURED_QUERY = """
+        SELECT user_id, user_name, age, salary, purchase_amount, product_category, region,
+               customer_status, transaction_count, effective_from, effective_to
+        FROM {schema}t_sql_source_structured
+        WHERE effective_from >= '2023-01-01' AND effective_to <= '2023-12-31'
+    """
+    FACTS_QUERY = """
+        SELECT c.customer_name, p.product_category, r.region_name, st.status_name,
+               f.age, f.salary, f.purchase_amount, f.transaction_count, f.effective_from, f.effective_to
+        FROM {schema}t_dm_task f
+        LEFT JOIN {schema}t_dim_customer c ON f.customer_id = c.customer_id
+        LEFT JOIN {schema}t_dim_product p ON f.product_id = p.product_id
+        LEFT JOIN {schema}t_dim_region r ON f.region_id = r.region_id
+        LEFT JOIN {schema}t_dim_status st ON f.status_id = st.status_id
+        WHERE f.effective_from >= '2023-01-01' AND f.effective_to <= '2023-12-31'
+    """
+    DQ_QUERY = """
+        SELECT check_name, status, actual_value
+        FROM {schema}t_dq_check_results
+        WHERE run_id = {run_id} AND check_type != 'summary'
+    """
+    
+    def normalize(self, rows):
+        # NUMERIC/REAL -> округленное число, DATE/TEXT -> строка ISO
+        def value(item):
+            if isinstance(item, (int, float, Decimal)) and not isinstance(item, bool):
+                return round(float(item), 2)
+            return None if item is None else str(item)
+        return sorted((tuple(value(item) for item in row) for row in rows), key=str)
+    
+    def test_same_dataset_same_results(self, monkeypatch):
+        #Правила очистки, витрины и DQ в SQLite повторяют SQL PostgreSQL: одинаковый набор - одинаковый результат
+        etl(rows=300, seed=11)
+        reset_dm_facts()
+        fill_dm_table('2023-01-01', '2023-12-31')
+        run_data_quality_checks('2023-01-01', '2023-12-31')
+        conn = get_pg_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT MAX(run_id) FROM s_sql_dds.t_dq_runs")
+        pg_run_id = cur.fetchone()[0]
+        postgres = []
+        for query in (self.STRUCTURED_QUERY, self.FACTS_QUERY, self.DQ_QUERY):
+            cur.execute(query.format(schema='s_sql_dds.', run_id=pg_run_id))
+            postgres.append(self.normalize(cur.fetchall()))
+        release_pg_connection(conn)
+        
+        monkeypatch.setattr(sqlite_backend, 'SQLITE_PATH', ':memory:')
         try:
-            # Это заглушка для локального тестирования
-            assert True  # Заглушка
-            print("Integration test PASSED")
+            sqlite_backend.etl(rows=300, seed=11)
+            sqlite_backend.fill_dm_table('2023-01-01', '2023-12-31')
+            sqlite_run_id = sqlite_backend.run_data_quality_checks('2023-01-01', '2023-12-31')
+            conn = sqlite_backend.connect()
+            sqlite = [self.normalize(conn.execute(query.format(schema='', run_id=sqlite_run_id)).fetchall())
+                      for query in (self.STRUCTURED_QUERY, self.FACTS_QUERY, self.DQ_QUERY)]
+            conn.close()
+        finally:
+            sqlite_backend.close_all()
+        
+        assert all(postgres)
+        for name, pg_rows, sqlite_rows in zip(('structured', 'facts', 'dq'), postgres, sqlite):
+            assert pg_rows == sqlite_rows, name
+
+class TestSQLiteBackend:
+    
+    def test_pipeline_end_to_end_in_memory(self, monkeypatch):
+        #Полный проход на встроенной SQLite: очистка, витрина, DQ и перенос в dwh без серверов
+        monkeypatch.setattr(sqlite_backend, 'SQLITE_PATH', ':memory:')
+        try:
+            sqlite_backend.etl(rows=300, seed=11)
+            steps = sqlite_backend.fill_dm_table()
+            dq_run_id = sqlite_backend.run_data_quality_checks()
+            migrated = sqlite_backend.migrate()
             
-        except Exception as e:
-            pytest.fail(f"Integration test failed: {e}")
\ No newline at end of file
+            conn = sqlite_backend.connect()
+            raw_count = conn.execute("SELECT COUNT(*) FROM t_sql_source_unstructured").fetchone()[0]
+            structured_count = conn.execute("SELECT COUNT(*) FROM t_sql_source_structured").fetchone()[0]
+            fact_count = conn.execute("SELECT COUNT(*) FROM t_dm_task").fetchone()[0]
+            dwh_count = conn.execute("SELECT COUNT(*) FROM dwh.t_dm_task").fetchone()[0]
+            statuses = dict(conn.execute(
+                "SELECT check_name, status FROM t_dq_check_results WHERE run_id = ?", (dq_run_id,)
+            ).fetchall())
+            conn.close()
+            
+            assert raw_count == len(get_dataset(rows=300, seed=11))
+            assert 0 < structured_count <= raw_count
+            assert steps['fact_insert'] == fact_count > 0
+            assert migrated == dwh_count == fact_count
+            assert 'error' not in statuses.values()
+            assert statuses['Overall DQ check'] == 'passed'
+        finally:
+            sqlite_backend.close_all()
+    
+    def test_cleansing_rules(self, monkeypatch):
+        #Очищенные строки без отрицательных зарплат, с допустимым возрастом и порядком дат
+        monkeypatch.setattr(sqlite_backend, 'SQLITE_PATH', ':memory:')
+        try:
+            sqlite_backend.etl(rows=300, seed=11)
+            conn = sqlite_backend.connect()
+            negative_salaries, invalid_ages, invalid_dates, total = conn.execute("""
+                SELECT SUM(salary < 0), SUM(age < 18 OR age > 100), SUM(effective_to < effective_from), COUNT(*)
+                FROM t_sql_source_structured
+            """).fetchone()
+            conn.close()
+        finally:
+            sqlite_backend.close_all()
+        
+        assert total > 0
+        assert negative_salaries == 0, f"Found {negative_salaries} records with negative salary"
+        assert invalid_ages == 0, f"Found {invalid_ages} records with invalid age"
+        assert invalid_dates == 0, f"Found {invalid_dates} records with invalid date range"
\ No newline at end of file
@@ -0,0 +1,40 @@
+import os
+import sys
+import tracemalloc
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data-pipeline', 'src'))
+
+import memory_profile
+
+@pytest.fixture
+def memory_reports(monkeypatch):
+    # Отчеты этапов копятся в глобальном списке модуля: у каждого теста свой
+    reports = []
+    monkeypatch.setattr(memory_profile, '_reports', reports)
+    memory_profile.start_memory_profiling()
+    yield reports
+    tracemalloc.stop()
+
+class TestMemoryProfile:
+    
+    def test_peak_allocation_site_reported(self, tmp_path, memory_reports):
+        #Пик этапа и место выделения попадают в отчет, даже если память освобождена к концу этапа
+        def stage_func():
+            data = [{'value': i} for i in range(100000)]
+            # Снимок в пике: без него выделение, освобожденное быстрее интервала опроса, не попадет в отчет
+            memory_profile.mark_peak()
+            return len(data)
+        
+        assert memory_profile.profiled('generate', stage_func)() == 100000
+        path = memory_profile.write_memory_report(str(tmp_path / 'memory.txt'))
+        
+        [report] = memory_reports
+        assert report['peak_traced_bytes'] > 5 * 1024 * 1024
+        assert report['retained_bytes'] < report['peak_traced_bytes'] / 10
+        assert report['top_sites'][0]['site'].startswith('test_memory_profile.py')
+        assert 'Stage generate' in open(path, encoding='utf-8').read()
+    
+    def test_no_report_without_profiled_stages(self, memory_reports):
+        #Без профилированных этапов отчет не пишется
+        assert memory_profile.write_memory_report() is None
\ No newline at end of file
@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data-pipeline', 'src'))
+
+import metrics
+
+class TestStageMetrics:
+    
+    def test_spans_written_to_jsonl_and_textfile(self, metrics_dir):
+        #Вложенный спан получает parent_id, последние значения попадают в textfile
+        with metrics.span('etl') as outer:
+            with metrics.span('etl.load') as inner:
+                inner.set(rows=500, bytes=4096)
+            metrics.record_span('etl.fact_insert', 0.5, rows=100)
+        
+        records = [json.loads(line) for line in open(os.path.join(metrics_dir, metrics.JSONL_FILE)).read().splitlines()]
+        by_name = {record['name']: record for record in records}
+        assert by_name['etl.load']['parent_id'] == outer.span_id
+        assert by_name['etl.fact_insert']['parent_id'] == outer.span_id
+        assert by_name['etl']['parent_id'] is None
+        assert by_name['etl.fact_insert']['rows_per_s'] == 200
+        
+        textfile = open(os.path.join(metrics_dir, metrics.PROM_FILE)).read()
+        assert 'etl_span_rows{span="etl.load"} 500' in textfile
+        assert 'etl_span_bytes{span="etl.load"} 4096' in textfile
+        assert 'etl_span_success{span="etl"} 1' in textfile
+    
+    def test_failed_span_marked(self, metrics_dir):
+        #Исключение внутри спана фиксируется статусом error и пробрасывается дальше
+        with pytest.raises(RuntimeError):
+            with metrics.span('migrate'):
+                raise RuntimeError("MySQL is down")
+        
+        assert 'etl_span_success{span="migrate"} 0' in open(os.path.join(metrics_dir, metrics.PROM_FILE)).read()
+    
+    def test_worker_thread_span_keeps_parent(self, metrics_dir):
+        #Стек спанов у потока свой: спан рабочего потока получает родителя только явно
+        from concurrent.futures import ThreadPoolExecutor
+        
+        def shard(parent):
+            with metrics.span('migrate.shard', parent=parent):
+                metrics.record_span('migrate.shard.copy', 0.1, rows=10)
+        
+        with metrics.span('migrate') as outer:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                list(pool.map(shard, [metrics.current_span(), None]))
+        
+        records = [json.loads(line) for line in open(os.path.join(metrics_dir, metrics.JSONL_FILE))]
+        shards = [record for record in records if record['name'] == 'migrate.shard']
+        assert sorted(record['parent_id'] or '' for record in shards) == ['', outer.span_id]
+        by_parent = {record['parent_id'] for record in records if record['name'] == 'migrate.shard.copy'}
+        assert by_parent == {record['span_id'] for record in shards}
\ No newline at end of file
@@ -0,0 +1,129 @@
+import os
+import sys
+import types
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data-pipeline', 'src'))
+
+from migrate_to_mysql import split_fact_id_ranges, upsert_target_rows, load_staging_to_target, UPSERT_TARGET_QUERY
+from verify_mysql_migration import compare_checksums, find_mismatched_ranges
+import sinks
+import metrics
+
+class TestMigrationHelpers:
+    
+    def test_split_fact_id_ranges_covers_interval(self):
+        #Диапазоны шардов не пересекаются и покрывают весь отрезок fact_id
+        ranges = split_fact_id_ranges(1, 1000, 4)
+        assert ranges == [(1, 250), (251, 500), (501, 750), (751, 1000)]
+    
+    def test_split_fact_id_ranges_uneven(self):
+        #Последний шард может быть короче остальных
+        ranges = split_fact_id_ranges(10, 20, 3)
+        assert ranges[0][0] == 10 and ranges[-1][1] == 20
+        assert sum(hi - lo + 1 for lo, hi in ranges) == 11
+        for (_, prev_hi), (next_lo, _) in zip(ranges, ranges[1:]):
+            assert next_lo == prev_hi + 1
+    
+    def test_split_fact_id_ranges_small_or_empty(self):
+        #Шардов не больше, чем значений fact_id; пустое окно - нет шардов
+        assert split_fact_id_ranges(5, 6, 8) == [(5, 5), (6, 6)]
+        assert split_fact_id_ranges(None, None, 4) == []
+    
+    def test_compare_checksums(self):
+        #Несовпадают чанки с другой суммой, другим числом строк или только на одной стороне
+        pg = {0: (10, 111), 1: (10, 222), 2: (10, 333), 3: (5, 444)}
+        mysql = {0: (10, 111), 1: (10, 999), 2: (9, 333), 4: (1, 555)}
+        assert compare_checksums(pg, mysql) == [1, 2, 3, 4]
+        assert compare_checksums(pg, dict(pg)) == []
+    
+    def test_mismatched_ranges_checked_within_window(self):
+        #Каждый запрос контрольных сумм, включая уточнение чанка, ограничен окном миграции
+        class Cursor:
+            def __init__(self, checksum):
+                self.checksum = checksum
+                self.params = []
+            def execute(self, query, params):
+                self.params.append(params)
+            def fetchall(self):
+                chunk_size, lo = self.params[-1][:2]
+                return [(lo // chunk_size, 1, self.checksum)]
+        
+        pg_cursor, mysql_cursor = Cursor(1), Cursor(2)
+        ranges = find_mismatched_ranges(pg_cursor, mysql_cursor, 1000, 0, 999, 100,
+                                        start_dt='2023-01-01', end_dt='2023-01-31')
+        assert ranges == [(0, 99)]
+        assert len(pg_cursor.params) == len(mysql_cursor.params) == 2
+        for params in pg_cursor.params + mysql_cursor.params:
+            assert params[3:] == ('2023-01-01', '2023-01-01', '2023-01-31', '2023-01-31')
+    
+    def test_upsert_replaces_fact_with_moved_effective_from(self):
+        #Перед upsert удаляется версия факта с другим effective_from: PK (fact_id, effective_from) ее не заменит
+        class Cursor:
+            def __init__(self):
+                self.calls = []
+            def execute(self, query, params=None):
+                self.calls.append(('execute', query, params))
+            def executemany(self, query, rows):
+                self.calls.append(('executemany', query, rows))
+        
+        rows = [(7,) + (None,) * 8 + ('2023-02-01',) + (None,) * 3,
+                (9,) + (None,) * 8 + ('2023-03-15',) + (None,) * 3]
+        cursor = Cursor()
+        upsert_target_rows(cursor, rows)
+        (kind, delete_query, params), upsert = cursor.calls
+        assert kind == 'execute' and 'DELETE FROM t_dm_task' in delete_query
+        assert params == [7, 9, 7, '2023-02-01', 9, '2023-03-15']
+        assert delete_query.count('%s') == len(params)
+        assert upsert == ('executemany', UPSERT_TARGET_QUERY, rows)
+        
+        cursor = Cursor()
+        upsert_target_rows(cursor, [])
+        assert cursor.calls == []
+    
+    def test_swap_falls_back_on_unpartitioned_target(self):
+        #t_dm_task, созданная до секционирования: окно загружается через delete_insert, полная подмена - через swap
+        class Cursor:
+            def __init__(self, partitions):
+                self.partitions = partitions
+                self.calls = []
+            def execute(self, query, params=None):
+                self.calls.append(query)
+            def fetchone(self):
+                if 'PARTITIONS' in self.calls[-1]:
+                    return (self.partitions,)
+                return ('done',) if self.calls[-1].startswith('CALL') else (10,)
+        
+        class Connection:
+            def __init__(self, partitions):
+                self.cursor_ = Cursor(partitions)
+            def cursor(self):
+                return self.cursor_
+            def commit(self):
+                pass
+        
+        for partitions, window, procedure in ((0, ('2023-01-01', '2023-01-31'), 'fn_dm_data_stg_to_dm_load'),
+                                              (25, ('2023-01-01', '2023-01-31'), 'fn_dm_data_stg_to_dm_swap_load'),
+                                              (0, (None, None), 'fn_dm_data_stg_to_dm_swap_load')):
+            conn = Connection(partitions)
+            load_staging_to_target(conn, *window, load_strategy='swap')
+            assert [call for call in conn.cursor_.calls if call.startswith('CALL')] == [f"CALL {procedure}(%s, %s)"]
+    
+    def test_sink_retried_with_span(self, monkeypatch):
+        #Любой приемник, включая mysql, запускается через run_sink с общими повторами и спаном migrate.sink
+        calls = []
+        def flaky_sink(start_dt, end_dt, **options):
+            calls.append(options)
+            if len(calls) == 1:
+                raise RuntimeError("Lost connection to MySQL server")
+            return 42
+        module = types.ModuleType('flaky_sink')
+        module.flaky_sink = flaky_sink
+        monkeypatch.setitem(sys.modules, 'flaky_sink', module)
+        monkeypatch.setitem(sinks.SINKS, 'flaky', ('flaky_sink', 'flaky_sink'))
+        monkeypatch.setattr(sinks.time, 'sleep', lambda seconds: None)
+        
+        assert sinks.run_sink('flaky', '2023-01-01', '2023-01-31', shards=4) == 42
+        assert calls == [{'shards': 4}, {'shards': 4}]
+        assert metrics._latest['migrate.sink']['rows'] == 42
+        assert metrics._latest['migrate.sink']['attrs'] == {'sink': 'flaky', 'attempt': 2}
+        assert sinks.SINKS['mysql'] == ('migrate_to_mysql', 'mysql_sink')
\ No newline at end of file
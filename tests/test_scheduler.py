@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data-pipeline', 'src'))
+
+from scheduler import stage, select_stages, run_stages
+import soak
+import main
+import backfill
+
+class TestStageScheduler:
+    
+    def build(self, calls, fail=(), barrier=None):
+        def make(name):
+            def func():
+                if name in fail:
+                    raise RuntimeError(f"{name} failed")
+                calls.append(('start', name))
+                # dq и migrate ждут друг друга: последовательный запуск не дойдет до конца
+                if barrier is not None and name in ('dq', 'migrate'):
+                    barrier.wait()
+                calls.append(('end', name))
+            return func
+        
+        stages = [
+            stage('etl', make('etl')),
+            stage('dm_load', make('dm_load'), depends_on=['etl']),
+            stage('dq', make('dq'), depends_on=['dm_load']),
+            stage('migrate', make('migrate'), depends_on=['dm_load'], critical=False),
+            stage('verify', make('verify'), depends_on=['migrate'], default=False),
+        ]
+        return {item['name']: item for item in stages}
+    
+    def test_independent_stages_run_in_parallel(self):
+        #dq и migrate после dm_load выполняются одновременно
+        calls = []
+        statuses = run_stages(self.build(calls, barrier=threading.Barrier(2, timeout=10)))
+        assert calls[:4] == [('start', 'etl'), ('end', 'etl'), ('start', 'dm_load'), ('end', 'dm_load')]
+        # Оба этапа стартовали раньше, чем любой из них завершился
+        assert {event for event, _ in calls[4:6]} == {'start'}
+        assert statuses['dq'] == statuses['migrate'] == 'success'
+        assert statuses['verify'] == 'skipped'
+    
+    def test_selection_and_skip(self):
+        #skip исключает этап вместе с зависимыми, only запускает только указанные
+        stages = self.build([])
+        assert select_stages(stages, skip=['migrate'], include=['verify']) == ['etl', 'dm_load', 'dq']
+        assert select_stages(stages, only=['dq']) == ['dq']
+        with pytest.raises(ValueError):
+            select_stages(stages, only=['unknown'])
+    
+    def test_failures(self):
+        #Ошибка некритичного этапа - предупреждение, критичного - исключение
+        statuses = run_stages(self.build([], fail=['migrate']), include=['verify'])
+        assert statuses['migrate'] == 'warning'
+        assert statuses['verify'] == 'upstream_failed'
+        with pytest.raises(RuntimeError):
+            run_stages(self.build([], fail=['dm_load']))
+
+class TestSoakStats:
+    
+    def test_backlog_lag_and_verdict(self):
+        #Задержка считается от плановой отправки батча; растущее отставание - ступень не устойчива
+        stats = soak.SoakStats(rate=100, batch_interval=1.0)
+        stats.started = time.time() - 10
+        for batch_no in range(3):
+            stats.batch_loaded(stats.due_at(batch_no), 100)
+        stats.record_stage('ingest', 3.0)
+        
+        batches = stats.take_pending(time.time())
+        stats.batches_done(batches, stats.started + 2.5)
+        snapshot = stats.snapshot()
+        
+        assert snapshot['processed_rows'] == 300
+        assert snapshot['max_lag_s'] == 2.5
+        # По расписанию к 10-й секунде отправлено 10 батчей, загружено 3
+        assert snapshot['ingest_behind_batches'] == 7
+        assert snapshot['backlog_rows'] == 700
+        assert soak.verdict(snapshot) == {'sustainable': False, 'bottleneck': 'ingest'}
+
+class TestBackfill:
+    
+    def test_windows_cover_range_without_overlap(self):
+        #Окна идут встык без пересечений и покрывают весь диапазон
+        windows = backfill.split_windows('2023-01-15', '2023-03-10')
+        assert [backfill.window_label(window) for window in windows] == [
+            '2023-01-15..2023-01-31', '2023-02-01..2023-02-28', '2023-03-01..2023-03-10']
+        windows = backfill.split_windows('2023-01-01', '2023-01-20', window='7')
+        assert windows[0][0].isoformat() == '2023-01-01' and windows[-1][1].isoformat() == '2023-01-20'
+        assert all((next_window[0] - window[1]).days == 1 for window, next_window in zip(windows, windows[1:]))
+        with pytest.raises(ValueError):
+            backfill.split_windows('2023-02-01', '2023-01-01')
+    
+    def test_failed_step_retried_and_window_isolated(self, monkeypatch):
+        #Упавший шаг повторяется; окно, не выполненное после всех попыток, не останавливает остальные.
+        #Контрольные точки заменены заглушками - тесту не нужна база
+        calls = []
+        marked = []
+        finished = []
+        lock = threading.Lock()
+        def run_window_step(step, start_dt, end_dt, dq_mode='per_check'):
+            with lock:
+                calls.append((step, start_dt.month))
+                attempts = calls.count((step, start_dt.month))
+            if start_dt.month == 1 and step == 'transform' and attempts == 1:
+                raise RuntimeError("deadlock detected")
+            if start_dt.month == 2 and step == 'dm':
+                raise RuntimeError("dm failed")
+            return 10
+        monkeypatch.setattr(backfill, 'run_window_step', run_window_step)
+        monkeypatch.setattr(backfill.time, 'sleep', lambda seconds: None)
+        monkeypatch.setattr(backfill, 'start_pipeline_run', lambda params, resume=False: (1, False))
+        monkeypatch.setattr(backfill, 'completed_units', lambda run_id, stage: {})
+        monkeypatch.setattr(backfill, 'mark_done', lambda run_id, stage, unit, details: marked.append((stage, unit)))
+        monkeypatch.setattr(backfill, 'finish_pipeline_run', lambda run_id, status: finished.append(status))
+        
+        with pytest.raises(RuntimeError, match='2023-02-01..2023-02-28'):
+            backfill.run_backfill('2023-01-01', '2023-03-31', concurrency=3, retries=2,
+                                  skip=['dq', 'migrate'], resume=False)
+        assert calls.count(('transform', 1)) == 2
+        assert calls.count(('dm', 2)) == 2
+        assert ('dm', 3) in calls
+        assert ('backfill.dm', '2023-01-01..2023-01-31') in marked
+        assert ('backfill.dm', '2023-02-01..2023-02-28') not in marked
+        assert finished == ['failed']
+
+class TestCommandLine:
+    
+    def test_legacy_flags_run_whole_pipeline(self):
+        #Вызов без подкоманды - подкоманда all, старые флаги остаются псевдонимами
+        options = main.parse_options(['--skip-mysql', '--only=etl,dm_load', '--profile-memory', '--rows=500'])
+        assert options['skip'] == ['migrate']
+        assert options['only'] == ['etl', 'dm_load']
+        assert options['profile_memory'] == 'tracemalloc'
+        assert options['rows'] == 500
+        # Для другого приемника --skip-mysql пропускает только сверку с MySQL
+        assert main.parse_options(['--skip-mysql', '--sink=columnar'])['skip'] == ['verify']
+        assert main.parse_options(['all', '--with=verify', '--profile'])['include'] == ['verify', 'profile']
+    
+    def test_sqlite_rejects_migration_flags(self, capsys):
+        #Бэкенд sqlite переносит витрину в свою базу dwh: флаги приемника и MySQL - ошибка разбора
+        for argv in (['--backend=sqlite', '--sink=columnar'], ['migrate', '--backend=sqlite', '--mysql-shards=4'],
+                     ['all', '--backend=sqlite', '--mysql-delta']):
+            with pytest.raises(SystemExit):
+                main.parse_args(argv)
+        assert '--mysql-delta not supported with --backend=sqlite' in capsys.readouterr().err
+        assert main.parse_options(['--backend=sqlite', '--rows=500'])['backend'] == 'sqlite'
+    
+    def test_mysql_delta_rejects_window_and_shards(self, capsys):
+        #Дельта переносит все факты выше водяного знака: окно, шарды и подмена секций - ошибка разбора
+        for argv in (['migrate', '--mysql-delta', '--start-date=2023-01-01'], ['migrate', '--mysql-delta', '--mysql-swap'],
+                     ['all', '--mysql-delta', '--mysql-shards=4', '--end-date=2023-12-31']):
+            with pytest.raises(SystemExit):
+                main.parse_args(argv)
+        assert '--mysql-delta cannot be combined with --end-date, --mysql-shards' in capsys.readouterr().err
+        assert main.parse_options(['--mysql-delta'])['mysql_delta']
+    
+    def test_subcommand_imports_only_what_it_needs(self):
+        #Подкоманда dq проходит весь разбор и вызов этапа, не импортируя pandas и pymysql;
+        #сам этап заменен заглушкой, чтобы не нужна была база
+        code = ("import sys, types, main\n"
+                "calls = []\n"
+                "stub = types.ModuleType('run_data_quality_checks')\n"
+                "stub.run_data_quality_checks = lambda *args, **kwargs: calls.append((args, kwargs))\n"
+                "sys.modules['run_data_quality_checks'] = stub\n"
+                "main.main(['dq', '--start-date=2023-01-01'])\n"
+                "assert calls == [(('2023-01-01', None), {'mode': 'per_check'})], calls\n"
+                "print(sorted({'pandas', 'numpy', 'pymysql'} & set(sys.modules)))")
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(main.__file__))
+        assert result.stdout.strip() == '[]', result.stderr
\ No newline at end of file
@@ -0,0 +1,67 @@
+import os
+import sys
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data-pipeline', 'src'))
+
+from datetime import date
+from sketches import HyperLogLog, KLLSketch, ColumnProfile, ks_distance, compare_profiles
+from column_profiling import non_overlapping_batches
+
+class TestSketches:
+    
+    def test_hll_merge_matches_union(self):
+        #Объединение скетчей оценивает число уникальных в объединении множеств
+        left, right = HyperLogLog(), HyperLogLog()
+        for i in range(30000):
+            left.add(i)
+        for i in range(20000, 50000):
+            right.add(i)
+        merged = HyperLogLog.from_bytes(left.to_bytes()).merge(right)
+        assert abs(merged.count() - 50000) / 50000 < 0.05
+        assert abs(left.count() - 30000) / 30000 < 0.05
+    
+    def test_kll_quantiles_after_merge(self):
+        #Квантили объединенного скетча близки к точным
+        rng = random.Random(7)
+        values = [rng.uniform(0, 1000) for _ in range(20000)]
+        left, right = KLLSketch(), KLLSketch()
+        for value in values[:10000]:
+            left.add(value)
+        for value in values[10000:]:
+            right.add(value)
+        merged = KLLSketch.from_dict(left.to_dict()).merge(right)
+        values.sort()
+        assert merged.count == 20000
+        for q in (0.1, 0.5, 0.9):
+            assert abs(merged.quantile(q) - values[int(q * len(values))]) < 20
+    
+    def test_drift_detected_on_shift(self):
+        #Сдвиг распределения дает большую статистику КС, одинаковые данные - нулевую
+        rng = random.Random(3)
+        baseline, same, shifted = ColumnProfile(numeric=True), ColumnProfile(numeric=True), ColumnProfile(numeric=True)
+        for _ in range(5000):
+            value = rng.gauss(50000, 10000)
+            baseline.add(value)
+            same.add(value)
+            shifted.add(value * 1.3)
+        shifted.add(None)
+        assert ks_distance(baseline.kll, same.kll) == 0
+        drift = compare_profiles(shifted, baseline)
+        assert drift['ks_distance'] > 0.3
+        assert drift['median_shift'] > 0.25
+        assert drift['null_rate_delta'] > 0
+
+class TestColumnProfiling:
+    
+    def test_overlapping_batches_counted_once(self):
+        #Из батчей с пересекающимися окнами берется последний, соседние окна объединяются
+        batches = [
+            (1, date(2023, 1, 1), date(2023, 1, 31)),
+            (2, date(2023, 2, 1), date(2023, 2, 28)),
+            (3, date(2023, 1, 1), date(2023, 1, 31)),
+            (4, date(2023, 1, 15), date(2023, 2, 15)),
+        ]
+        assert non_overlapping_batches(batches) == [4]
+        assert non_overlapping_batches(batches[:3]) == [2, 3]
+        assert non_overlapping_batches([(5, None, None)] + batches[:2]) == [5]
\ No newline at end of file